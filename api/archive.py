@@ -0,0 +1,108 @@
+"""Перенос завершенных проверок КНД в архивную таблицу.
+
+Записи со статусом «Завершено», которые не менялись дольше срока
+хранения, пачками копируются в ``KndArchive`` и удаляются из ``Knd``,
+поэтому список, сверка с порталом и проверки на дубликаты работают
+с небольшой рабочей таблицей. Каждая пачка переносится в отдельной
+транзакции: прерванный перенос можно просто запустить снова. Запись,
+номер или ссылка которой уже есть в архиве, остается в ``Knd`` и
+попадает в отчет как пропущенная.
+
+Настройки берутся из ``settings.KND_ARCHIVE``:
+
+- RETENTION_DAYS: сколько дней завершенная проверка остается в Knd;
+- BATCH_SIZE: сколько записей переносится за одну транзакцию.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.conditional import bump_generation
+from api.refresh import FINISHED_STATUS
+from api.utils.logging_config import logger
+from knd.models import Knd, KndArchive
+
+DEFAULT_ARCHIVE_SETTINGS = {
+    'RETENTION_DAYS': 30,
+    'BATCH_SIZE': 500,
+}
+
+# Поля, которые копируются из Knd в архив
+ARCHIVE_FIELDS = (
+    'id', 'created', 'updated', 'inspector_id', 'url_knd', 'number_knd',
+    'status_knm', 'reg_data', 'start_data', 'end_data', 'adress',
+    'departure_time',
+)
+
+
+def archive_settings():
+    return {**DEFAULT_ARCHIVE_SETTINGS, **getattr(settings, 'KND_ARCHIVE', {})}
+
+
+def archivable_queryset(retention_days=None):
+    """Завершенные проверки, не менявшиеся дольше срока хранения."""
+    if retention_days is None:
+        retention_days = archive_settings()['RETENTION_DAYS']
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    return Knd.objects.filter(status_knm=FINISHED_STATUS, updated__lt=cutoff)
+
+
+def _archive_batch(pks):
+    """Переносит пачку и возвращает id записей, попавших в архив."""
+    rows = Knd.objects.filter(pk__in=pks).values(*ARCHIVE_FIELDS)
+    entries = [KndArchive(knd_id=row.pop('id'), **row) for row in rows]
+    # Строки, конфликтующие с архивом по номеру или ссылке, не вставляются;
+    # удаляются только те записи, копия которых действительно в архиве
+    KndArchive.objects.bulk_create(entries, ignore_conflicts=True)
+    archived = list(KndArchive.objects.filter(
+        knd_id__in=pks).values_list('knd_id', flat=True))
+    Knd.objects.filter(pk__in=archived).delete()
+    return archived
+
+
+def archive_finished(retention_days=None, batch_size=None, dry_run=False):
+    """Переносит завершенные проверки в архив и возвращает отчет."""
+    config = archive_settings()
+    batch_size = batch_size or config['BATCH_SIZE']
+    queryset = archivable_queryset(retention_days)
+    started = time.monotonic()
+
+    if dry_run:
+        return {'candidates': queryset.count(), 'archived': 0, 'batches': 0}
+
+    archived = batches = 0
+    skipped = []
+    last_pk = 0
+    while True:
+        pks = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+            'pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        with transaction.atomic():
+            moved = _archive_batch(pks)
+        archived += len(moved)
+        skipped.extend(sorted(set(pks) - set(moved)))
+        batches += 1
+        last_pk = pks[-1]
+
+    if archived:
+        bump_generation()
+    elapsed = time.monotonic() - started
+    logger.info(
+        '%s: перенесено в архив %d записей за %d пачек.',
+        archive_finished.__name__, archived, batches,
+        extra={'duration_ms': round(elapsed * 1000, 1)}
+    )
+    if skipped:
+        logger.warning(
+            '%s: номер или ссылка уже в архиве, записи оставлены: %s',
+            archive_finished.__name__, ', '.join(map(str, skipped)))
+    return {
+        'archived': archived,
+        'skipped': skipped,
+        'batches': batches,
+        'elapsed_sec': round(elapsed, 2),
+    }
@@ -0,0 +1,133 @@
+"""Асинхронные представления загрузки QR-кода и обновления статуса КНД.
+
+Работают под ASGI (``apikndproject.asgi``): пока страница КНМ
+загружается, рабочий процесс обслуживает другие запросы, поэтому
+один процесс держит много медленных загрузок одновременно.
+"""
+import asyncio
+import os
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api.serializers import KndSerializer
+from api.services import (
+    KndConflict, create_knd, diff_knm, ensure_new_url, save_diff
+)
+from api.utils.erknm import get_knm_data_async
+from api.utils.logging_config import logger
+from api.utils.portal_guard import PortalUnavailable
+from api.utils.upload_dedup import get_upload_dedup
+from api.utils.one_qrcod_in_url_decode import decode_qr_code_bytes
+from knd.models import Knd
+
+ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif']
+
+
+@sync_to_async
+def _authenticate(request):
+    """Аутентифицирует запрос теми же классами, что и представления DRF."""
+    drf_request = Request(request, authenticators=[
+        auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = drf_request.user
+    except exceptions.APIException:
+        return None
+    return user if user.is_authenticated else None
+
+
+@sync_to_async
+def _serialize(instance):
+    return KndSerializer(instance).data
+
+
+def _error(message, code):
+    return JsonResponse({"error": message}, status=code)
+
+
+def _portal_unavailable(exc):
+    response = JsonResponse(
+        {"error": exc.message, "code": "portal_unavailable"},
+        status=exc.status_code)
+    if exc.retry_after:
+        response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+@csrf_exempt
+async def upload_qrcod_async(request):
+    """Асинхронная версия ``KndViewSet.upload_qrcod``."""
+    if request.method != 'POST':
+        return _error("Метод не поддерживается",
+                      status.HTTP_405_METHOD_NOT_ALLOWED)
+    user = await _authenticate(request)
+    if user is None:
+        return _error("Требуется авторизация", status.HTTP_401_UNAUTHORIZED)
+
+    file = request.FILES.get('file')
+    if not file:
+        return _error("Файл не предоставлен", status.HTTP_400_BAD_REQUEST)
+    if os.path.splitext(file.name)[1].lower() not in ALLOWED_EXTENSIONS:
+        return _error("Недопустимый формат файла", status.HTTP_400_BAD_REQUEST)
+
+    dedup = get_upload_dedup()
+    knd_id = None
+    try:
+        url, keys, knd_id = await asyncio.to_thread(
+            dedup.resolve, file.read(), decode_qr_code_bytes)
+        await sync_to_async(ensure_new_url)(url)
+        result_knd = await get_knm_data_async(url)
+        knd_instance = await sync_to_async(create_knd)(url, result_knd, user)
+        if keys:
+            dedup.remember(keys, url, knd_instance.pk)
+        return JsonResponse(
+            await _serialize(knd_instance), status=status.HTTP_201_CREATED)
+    except KndConflict as e:
+        # Архивной записи больше нет в Knd, ее id в кэше устарел
+        if knd_id and not e.archived:
+            return JsonResponse(
+                {"error": e.message, "knd_id": knd_id}, status=e.status_code)
+        return _error(e.message, e.status_code)
+    except PortalUnavailable as e:
+        return _portal_unavailable(e)
+    except Exception as e:
+        return _error(
+            f"{upload_qrcod_async.__name__}: Ошибка обработки данных: {str(e)}",
+            status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@csrf_exempt
+async def refresh_knd_async(request, pk):
+    """Асинхронно сверяет одну проверку с порталом ЕРКНМ."""
+    if request.method != 'POST':
+        return _error("Метод не поддерживается",
+                      status.HTTP_405_METHOD_NOT_ALLOWED)
+    user = await _authenticate(request)
+    if user is None:
+        return _error("Требуется авторизация", status.HTTP_401_UNAUTHORIZED)
+    try:
+        knd = await Knd.objects.select_related('inspector').aget(pk=pk)
+    except Knd.DoesNotExist:
+        return _error("Проверка не найдена", status.HTTP_404_NOT_FOUND)
+
+    force = request.GET.get('force') in ('1', 'true')
+    try:
+        content = await get_knm_data_async(knd.url_knd, force=force)
+    except PortalUnavailable as e:
+        return _portal_unavailable(e)
+    except Exception as e:
+        return _error(
+            f"{refresh_knd_async.__name__}: Ошибка обработки данных: {str(e)}",
+            status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    diff = diff_knm(knd, content)
+    if diff:
+        logger.debug('Изменены поля: %s', ', '.join(diff),
+                     extra={'knm_number': knd.number_knd})
+        await sync_to_async(save_diff)(knd, diff)
+    return JsonResponse({**await _serialize(knd), 'changes': diff})
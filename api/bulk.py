@@ -0,0 +1,210 @@
+"""Пакетная загрузка множества изображений и QR-кодов за один запрос.
+
+Изображения (в том числе из ZIP-архивов) распознаются параллельно в пуле
+процессов, ссылки дедуплицируются, существующие записи проверяются
+одним запросом ``IN``, страницы КНМ загружаются параллельно, а новые
+записи создаются одним ``bulk_create``.
+"""
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from api.refresh import FINISHED_STATUS, scrape_many
+from api.services import ARCHIVED_MESSAGE, build_knd_data
+from api.utils.logging_config import logger
+from api.utils.metrics import CONFLICTS
+from api.utils.one_qrcod_in_url_decode import decode_all_qr_codes_bytes
+from knd.models import Knd, KndArchive
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+# Статусы, которые в одиночной загрузке были бы ответом 409
+CONFLICT_STATUSES = ('exists', 'archived', 'finished')
+
+DEFAULT_BULK_SETTINGS = {
+    'DECODE_PROCESSES': 2,
+    'MAX_FILES': 200,
+    'MAX_FILE_SIZE': 20 * 1024 * 1024,
+}
+
+
+class BulkUploadError(Exception):
+    """Запрос пакетной загрузки некорректен целиком."""
+    pass
+
+
+def bulk_settings():
+    return {**DEFAULT_BULK_SETTINGS, **getattr(settings, 'KND_BULK_UPLOAD', {})}
+
+
+_decode_pool = None
+_decode_pool_lock = threading.Lock()
+
+
+def get_decode_pool():
+    """Общий для процесса пул процессов распознавания QR-кодов."""
+    global _decode_pool
+    if _decode_pool is None:
+        with _decode_pool_lock:
+            if _decode_pool is None:
+                _decode_pool = ProcessPoolExecutor(
+                    max_workers=bulk_settings()['DECODE_PROCESSES'])
+    return _decode_pool
+
+
+def collect_images(files):
+    """Разворачивает загруженные файлы и ZIP-архивы в пары (имя, байты)."""
+    config = bulk_settings()
+    images = []
+
+    def check_limit():
+        if len(images) > config['MAX_FILES']:
+            raise BulkUploadError(
+                f"Слишком много файлов, максимум {config['MAX_FILES']}")
+
+    for upload in files:
+        extension = os.path.splitext(upload.name)[1].lower()
+        if extension == '.zip':
+            try:
+                with zipfile.ZipFile(upload) as archive:
+                    for info in archive.infolist():
+                        name = f'{upload.name}/{info.filename}'
+                        if (info.is_dir() or not info.filename.lower()
+                                .endswith(IMAGE_EXTENSIONS)):
+                            continue
+                        check_limit()
+                        if info.file_size > config['MAX_FILE_SIZE']:
+                            images.append((name, None))
+                            continue
+                        images.append((name, archive.read(info)))
+            except zipfile.BadZipFile:
+                images.append((upload.name, None))
+        elif extension in IMAGE_EXTENSIONS:
+            images.append((upload.name, upload.read()))
+        else:
+            images.append((upload.name, None))
+        check_limit()
+    return images
+
+
+def decode_images(images):
+    """Распознает QR-коды всех изображений в пуле процессов.
+
+    Returns:
+        list: для каждого изображения список ссылок или исключение.
+    """
+    pool = get_decode_pool()
+    futures = [
+        pool.submit(decode_all_qr_codes_bytes, data) if data else None
+        for _, data in images
+    ]
+    results = []
+    for future in futures:
+        if future is None:
+            results.append(ValueError("Недопустимый или слишком большой файл"))
+            continue
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _create_all(instances):
+    """Создает записи одним запросом, а при гонке — по одной."""
+    try:
+        with transaction.atomic():
+            return Knd.objects.bulk_create(instances), []
+    except IntegrityError:
+        logger.info(
+            '%s: Конфликт при bulk_create, создаем записи по одной.',
+            _create_all.__name__)
+    created, conflicts = [], []
+    for instance in instances:
+        try:
+            with transaction.atomic():
+                instance.save(force_insert=True)
+            created.append(instance)
+        except IntegrityError:
+            instance.pk = None
+            conflicts.append(instance)
+    return created, conflicts
+
+
+def bulk_upload(files, inspector):
+    """Обрабатывает пакет изображений и возвращает результат по каждой ссылке."""
+    images = collect_images(files)
+    decoded = decode_images(images)
+
+    items = []
+    sources = {}
+    for (name, _), urls in zip(images, decoded):
+        if isinstance(urls, Exception):
+            items.append({'source': name, 'status': 'error', 'error': str(urls)})
+            continue
+        for url in urls:
+            if url in sources:
+                items.append({'source': name, 'url': url, 'status': 'duplicate'})
+                continue
+            sources[url] = {'source': name, 'url': url}
+            items.append(sources[url])
+
+    existing = dict(Knd.objects.filter(
+        url_knd__in=list(sources)).values_list('url_knd', 'id'))
+    archived = set(KndArchive.objects.filter(
+        url_knd__in=list(sources)).values_list('url_knd', flat=True))
+    for url, item in sources.items():
+        if url in existing:
+            item.update(status='exists', id=existing[url])
+        elif url in archived:
+            item.update(status='archived', error=ARCHIVED_MESSAGE)
+
+    pending = [url for url, item in sources.items() if 'status' not in item]
+    scraped = scrape_many(pending)
+
+    candidates = {}
+    for url in pending:
+        item = sources[url]
+        content = scraped[url]
+        if isinstance(content, Exception):
+            item.update(status='error', error=str(content))
+        elif content.get('Статус КНМ') == FINISHED_STATUS:
+            item.update(status='finished', error="Проверка завершена")
+        else:
+            candidates[url] = build_knd_data(url, content, inspector)
+
+    numbers = [data['number_knd'] for data in candidates.values()
+               if data['number_knd']]
+    existing_numbers = dict(Knd.objects.filter(
+        number_knd__in=numbers).values_list('number_knd', 'id'))
+    archived_numbers = set(KndArchive.objects.filter(
+        number_knd__in=numbers).values_list('number_knd', flat=True))
+    instances = []
+    seen_numbers = set()
+    for url, data in candidates.items():
+        number = data['number_knd']
+        if number in existing_numbers:
+            sources[url].update(status='exists', id=existing_numbers[number])
+        elif number in archived_numbers:
+            sources[url].update(status='archived', error=ARCHIVED_MESSAGE)
+        elif number and number in seen_numbers:
+            sources[url].update(status='duplicate')
+        else:
+            seen_numbers.add(number)
+            instances.append(Knd(**data))
+
+    created, conflicts = _create_all(instances)
+    for instance in created:
+        sources[instance.url_knd].update(status='created', id=instance.pk)
+    for instance in conflicts:
+        sources[instance.url_knd].update(
+            status='exists', error="Запись с таким номером КНМ уже существует")
+    conflict_count = sum(
+        item['status'] in CONFLICT_STATUSES for item in sources.values())
+    if conflict_count:
+        CONFLICTS.inc(conflict_count)
+    return items
@@ -0,0 +1,112 @@
+"""Лента изменений статусов проверок КНД.
+
+Каждая смена ``status_knm`` записывается в ``KndStatusChange`` в той же
+транзакции, что и само обновление. Клиент читает ленту по курсору (id
+последнего полученного изменения) и платит только за новые записи.
+При ``wait`` > 0 запрос блокируется до появления изменений или
+истечения таймаута (long-polling): изменения в этом процессе будят
+ожидающих сразу после фиксации транзакции, изменения из других
+процессов замечаются опросом раз в ``POLL_INTERVAL`` секунд.
+
+Id выдаются при вставке, а видны записи после фиксации, поэтому
+транзакция с меньшим id может зафиксироваться позже соседней. Чтобы
+курсор не перескочил такую запись, лента отдается только до первой
+записи моложе ``SAFETY_WINDOW`` секунд; она и все следующие придут
+в одном из следующих запросов.
+
+Ожидание занимает рабочий поток на все время ``wait``. Под WSGI с
+синхронными обработчиками это поток gunicorn, поэтому ``MAX_WAIT``
+небольшой; для долгих ожиданий и большого числа клиентов нужен ASGI
+или обработчики с потоками (``--threads``).
+
+Настройки берутся из ``settings.KND_CHANGE_FEED``:
+
+- PAGE_SIZE / MAX_PAGE_SIZE: размер страницы ленты;
+- MAX_WAIT: предельное время ожидания long-polling, секунды;
+- POLL_INTERVAL: период опроса базы при ожидании, секунды;
+- SAFETY_WINDOW: сколько секунд новые записи придерживаются, чтобы
+  зафиксировались транзакции с меньшими id.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from knd.models import KndStatusChange
+
+DEFAULT_CHANGE_FEED_SETTINGS = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 500,
+    'MAX_WAIT': 10,
+    'POLL_INTERVAL': 1.0,
+    'SAFETY_WINDOW': 2.0,
+}
+
+_condition = threading.Condition()
+_version = 0
+
+
+def change_feed_settings():
+    return {**DEFAULT_CHANGE_FEED_SETTINGS,
+            **getattr(settings, 'KND_CHANGE_FEED', {})}
+
+
+def _notify():
+    global _version
+    with _condition:
+        _version += 1
+        _condition.notify_all()
+
+
+def record_status_changes(changes):
+    """Записывает переходы статуса [(knd, old_status, new_status), ...].
+
+    Вызывается внутри транзакции обновления проверки; ожидающие ленту
+    клиенты будятся только после ее фиксации.
+    """
+    rows = [
+        KndStatusChange(
+            knd=knd,
+            number_knd=knd.number_knd,
+            old_status=old_status or '',
+            new_status=new_status or '',
+        )
+        for knd, old_status, new_status in changes
+    ]
+    if rows:
+        KndStatusChange.objects.bulk_create(rows)
+        transaction.on_commit(_notify)
+    return rows
+
+
+def changes_since(since, limit):
+    """Изменения после курсора без записей моложе ``SAFETY_WINDOW``."""
+    window = change_feed_settings()['SAFETY_WINDOW']
+    changes = list(
+        KndStatusChange.objects.filter(pk__gt=since).order_by('pk')[:limit])
+    if not window:
+        return changes
+    cutoff = timezone.now() - timedelta(seconds=window)
+    for index, change in enumerate(changes):
+        if change.created > cutoff:
+            return changes[:index]
+    return changes
+
+
+def wait_for_changes(since, limit, wait=0):
+    """Изменения после курсора ``since``, ожидая их не дольше ``wait`` секунд."""
+    config = change_feed_settings()
+    deadline = time.monotonic() + min(wait, config['MAX_WAIT'])
+    while True:
+        seen = _version
+        changes = changes_since(since, limit)
+        remaining = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            return changes
+        with _condition:
+            _condition.wait_for(
+                lambda: _version != seen,
+                timeout=min(remaining, config['POLL_INTERVAL']))
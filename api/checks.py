@@ -0,0 +1,19 @@
+"""Системные проверки настроек приложения api."""
+from django.core.checks import Warning, register
+
+from api.conditional import is_process_local, list_cache_settings
+
+
+@register()
+def check_list_cache(app_configs, **kwargs):
+    config = list_cache_settings()
+    if not config['ENABLED'] or not is_process_local(config['ALIAS']):
+        return []
+    return [Warning(
+        f"Кэш страниц списка КНД использует кэш '{config['ALIAS']}' в памяти "
+        'процесса: при нескольких рабочих процессах будут отдаваться '
+        'устаревшие страницы.',
+        hint='Укажите в KND_LIST_CACHE общий кэш (например, ERKNM_CACHE_DIR) '
+             'или выключите его: KND_LIST_CACHE=false.',
+        id='api.W001',
+    )]
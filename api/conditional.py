@@ -0,0 +1,160 @@
+"""Условные GET-запросы и кэш страниц списка проверок КНД.
+
+Валидаторы ответа строятся из поля ``updated``: для карточки — время
+изменения записи, для списка — ``max(updated)`` отфильтрованной выборки
+(по индексам ``updated`` и ``inspector, updated``) и поколение кэша,
+которое учитывает удаление записей. Если клиент прислал совпадающий
+``If-None-Match`` или ``If-Modified-Since``, ответ 304 отдается без
+чтения и сериализации строк.
+
+Сериализованные страницы списка кэшируются отдельно для каждого
+инспектора. Ключ включает ETag выборки и поколение кэша, которое
+увеличивается сигналами ``post_save``/``post_delete`` модели Knd,
+поэтому устаревшая страница никогда не отдается. Кэш должен быть
+общим для всех рабочих процессов (например, файловый ``ERKNM_CACHE_DIR``):
+в кэше в памяти процесса поколение у каждого процесса свое, и после
+изменения в другом процессе отдавалась бы устаревшая страница. Поэтому
+по умолчанию кэш страниц выключен, а для кэша в памяти процесса
+выдается предупреждение ``api.W001`` (см. ``api.checks``).
+
+Настройки берутся из ``settings.KND_LIST_CACHE``:
+
+- ENABLED: кэш страниц списка включен;
+- ALIAS: псевдоним кэша Django;
+- TTL: время жизни страницы, секунды.
+"""
+import calendar
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+DEFAULT_LIST_CACHE_SETTINGS = {
+    'ENABLED': False,
+    'ALIAS': 'default',
+    'TTL': 300,
+}
+
+GENERATION_KEY = 'knd-list:generation'
+STATS_KEYS = ('hit', 'miss')
+
+
+def list_cache_settings():
+    return {**DEFAULT_LIST_CACHE_SETTINGS,
+            **getattr(settings, 'KND_LIST_CACHE', {})}
+
+
+def _cache():
+    return caches[list_cache_settings()['ALIAS']]
+
+
+def is_process_local(alias):
+    """Кэш с этим псевдонимом живет в памяти одного процесса."""
+    backend = settings.CACHES[alias]['BACKEND']
+    return backend.endswith(('LocMemCache', 'DummyCache'))
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(
+        ':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def _timestamp(value):
+    return None if value is None else calendar.timegm(value.timetuple())
+
+
+def detail_validators(queryset, pk):
+    """ETag и Last-Modified карточки или (None, None), если записи нет."""
+    try:
+        updated = queryset.filter(pk=pk).values_list(
+            'updated', flat=True).first()
+    except (TypeError, ValueError):
+        # Некорректный id: ответ 404 сформирует get_object()
+        return None, None
+    if updated is None:
+        return None, None
+    return make_etag('knd', pk, updated.isoformat()), _timestamp(updated)
+
+
+def list_validators(queryset, request):
+    """ETag и Last-Modified страницы списка одним агрегирующим запросом.
+
+    В ETag входят пользователь и строка запроса: от них зависят фильтры,
+    курсор и набор полей. Удаление записи не меняет ``max(updated)``,
+    поэтому в ETag входит и поколение кэша; COUNT по выборке не нужен.
+    """
+    last = queryset.order_by().aggregate(last=Max('updated'))['last']
+    etag = make_etag(
+        'knd-list', request.user.pk, request.get_full_path(),
+        last.isoformat() if last else '', _generation())
+    return etag, _timestamp(last)
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304, если валидаторы клиента совпадают, иначе None."""
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Ответ зависит от токена, поэтому только приватный кэш клиента
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _generation():
+    return _cache().get_or_set(GENERATION_KEY, 0, None)
+
+
+def bump_generation():
+    """Делает недоступными все закэшированные страницы списка."""
+    cache = _cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 1, None)
+
+
+def page_key(user_id, etag):
+    return f'knd-list:{_generation()}:{user_id}:{etag.strip(chr(34))}'
+
+
+def get_page(user_id, etag):
+    if not list_cache_settings()['ENABLED']:
+        return None
+    data = _cache().get(page_key(user_id, etag))
+    record('miss' if data is None else 'hit')
+    return data
+
+
+def store_page(user_id, etag, data):
+    config = list_cache_settings()
+    if config['ENABLED']:
+        _cache().set(page_key(user_id, etag), data, config['TTL'])
+
+
+def record(event):
+    cache = _cache()
+    key = f'knd-list:stats:{event}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def list_cache_stats():
+    values = _cache().get_many([f'knd-list:stats:{event}' for event in STATS_KEYS])
+    stats = {event: values.get(f'knd-list:stats:{event}', 0) for event in STATS_KEYS}
+    total = sum(stats.values())
+    stats['hit_rate'] = round(stats['hit'] / total, 3) if total else None
+    stats['generation'] = _generation()
+    return stats
@@ -0,0 +1,107 @@
+"""Потоковая выгрузка проверок КНД в CSV и XLSX.
+
+Строки читаются из базы через ``values_list().iterator(chunk_size)``,
+без создания экземпляров модели, и сразу отдаются клиенту, поэтому
+память рабочего процесса не зависит от размера выгрузки.
+
+XLSX формируется библиотекой openpyxl в режиме write-only во временный
+файл на диске. Библиотека необязательна: без нее доступен только CSV.
+"""
+import csv
+import tempfile
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+# Сколько строк читать из базы за один запрос курсора
+CHUNK_SIZE = 2000
+
+# Сколько строк CSV отдавать клиенту одним фрагментом
+LINES_PER_CHUNK = 500
+
+# Поле (или путь через связь) и заголовок столбца
+EXPORT_COLUMNS = [
+    ('id', 'ID'),
+    ('number_knd', 'Номер КНМ'),
+    ('status_knm', 'Статус КНМ'),
+    ('inspector__username', 'Инспектор'),
+    ('url_knd', 'Ссылка на проверку'),
+    ('reg_data', 'Дата регистрации'),
+    ('start_data', 'Начало КНМ'),
+    ('end_data', 'Окончание КНМ'),
+    ('departure_time', 'Время выезда'),
+    ('adress', 'Адрес'),
+    ('created', 'Создано'),
+]
+
+DATETIME_FORMAT = '%d.%m.%Y %H:%M'
+DATE_FORMAT = '%d.%m.%Y'
+
+
+class ExportError(Exception):
+    """Выгрузка в запрошенном формате недоступна."""
+    pass
+
+
+def xlsx_available():
+    return Workbook is not None
+
+
+def export_rows(queryset):
+    """Строки выгрузки кортежами значений в порядке EXPORT_COLUMNS."""
+    fields = [field for field, _ in EXPORT_COLUMNS]
+    return queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'hour'):
+        return value.strftime(DATETIME_FORMAT)
+    if hasattr(value, 'day'):
+        return value.strftime(DATE_FORMAT)
+    return value
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    """Генератор фрагментов CSV по ``LINES_PER_CHUNK`` строк.
+
+    Первой идет BOM, чтобы Excel распознал UTF-8.
+    """
+    writer = csv.writer(_Echo(), delimiter=';')
+    lines = ['\ufeff' + writer.writerow([title for _, title in EXPORT_COLUMNS])]
+    for row in export_rows(queryset):
+        lines.append(writer.writerow([_cell(value) for value in row]))
+        if len(lines) >= LINES_PER_CHUNK:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def build_xlsx(queryset):
+    """Записывает выгрузку во временный файл XLSX и возвращает его.
+
+    Файл удаляется при закрытии, открыт на чтение с начала.
+    """
+    if not xlsx_available():
+        raise ExportError('Выгрузка в XLSX недоступна: не установлен openpyxl.')
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('КНД')
+    sheet.append([title for _, title in EXPORT_COLUMNS])
+    for row in export_rows(queryset):
+        # Даты в ячейках остаются датами, чтобы по ним работали фильтры
+        sheet.append(['' if value is None else value for value in row])
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,50 @@
+"""Фильтрация списка проверок КНД по параметрам запроса.
+
+Поддерживаемые параметры:
+
+- ``status_knm``: статус или несколько через запятую;
+- ``inspector``: id инспектора или ``me``;
+- ``start_data_after``/``start_data_before``: диапазон даты начала;
+- ``end_data_after``/``end_data_before``: диапазон даты окончания.
+
+Даты передаются в формате YYYY-MM-DD, границы включаются.
+"""
+from datetime import date
+
+from rest_framework.exceptions import ValidationError
+
+DATE_FILTERS = {
+    'start_data_after': 'start_data__gte',
+    'start_data_before': 'start_data__lte',
+    'end_data_after': 'end_data__gte',
+    'end_data_before': 'end_data__lte',
+}
+
+
+def _parse_date(name, value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: 'Ожидается дата в формате YYYY-MM-DD.'})
+
+
+def filter_knd_queryset(queryset, params, user=None):
+    """Применяет к queryset фильтры из параметров запроса."""
+    statuses = params.get('status_knm')
+    if statuses is not None:
+        queryset = queryset.filter(status_knm__in=statuses.split(','))
+
+    inspector = params.get('inspector')
+    if inspector:
+        if inspector == 'me' and user is not None:
+            queryset = queryset.filter(inspector=user)
+        elif inspector.isdigit():
+            queryset = queryset.filter(inspector_id=int(inspector))
+        else:
+            raise ValidationError({'inspector': 'Ожидается id или "me".'})
+
+    for name, lookup in DATE_FILTERS.items():
+        value = params.get(name)
+        if value:
+            queryset = queryset.filter(**{lookup: _parse_date(name, value)})
+    return queryset
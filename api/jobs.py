@@ -0,0 +1,79 @@
+"""Локальная очередь фоновой обработки QR-кодов.
+
+Очередь хранится в таблице QrJob основной базы данных, поэтому внешний
+брокер не нужен. Обработчики запускаются командой ``run_qr_workers`` и
+захватывают задания атомарным условным UPDATE, так что несколько
+процессов не возьмут одно задание дважды.
+"""
+import time
+
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api.services import KndConflict, create_knd, ensure_new_url
+from api.utils.one_qrcod_in_url_decode import decode_qr_code
+from api.utils.erknm import get_knm_data
+from api.utils.logging_config import logger
+from api.utils.portal_guard import PortalUnavailable
+from knd.models import QrJob
+
+
+def enqueue_qr_job(file_path, inspector):
+    """Ставит сохраненный файл с QR-кодом в очередь обработки."""
+    return QrJob.objects.create(file_path=file_path, inspector=inspector)
+
+
+def claim_next_job():
+    """Захватывает самое старое задание из очереди или возвращает None."""
+    candidates = QrJob.objects.filter(
+        status=QrJob.QUEUED).values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        # update() не заполняет auto_now, время изменения задается явно
+        claimed = QrJob.objects.filter(pk=pk, status=QrJob.QUEUED).update(
+            status=QrJob.DECODING, updated=timezone.now())
+        if claimed:
+            return QrJob.objects.get(pk=pk)
+    return None
+
+
+def _set_status(job, status, **fields):
+    job.status = status
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=['status', 'updated', *fields])
+
+
+def process_job(job):
+    """Распознает QR-код, парсит страницу КНМ и создает запись КНД."""
+    try:
+        result_url = decode_qr_code(default_storage.path(job.file_path))
+        _set_status(job, QrJob.SCRAPING, url_knd=result_url['url'])
+        ensure_new_url(result_url['url'])
+        result_knd = get_knm_data(result_url['url'])
+        knd_instance = create_knd(result_url['url'], result_knd, job.inspector)
+        _set_status(job, QrJob.DONE, knd=knd_instance)
+    except (KndConflict, PortalUnavailable) as e:
+        _set_status(job, QrJob.FAILED, error=e.message,
+                    error_code=e.status_code)
+    except Exception as e:
+        logger.warning('%s: Задание %s: %s', process_job.__name__, job.pk, e,
+                       extra={'job_id': job.pk})
+        _set_status(job, QrJob.FAILED,
+                    error=f'Ошибка обработки данных: {str(e)}', error_code=500)
+
+
+def run_worker(poll_interval=1.0, stop_event=None):
+    """Цикл обработчика: забирает задания, пока не будет установлен stop_event."""
+    # Соединения родительского процесса нельзя использовать после fork
+    close_old_connections()
+    logger.info('%s: Обработчик очереди QR-кодов запущен.', run_worker.__name__)
+    while stop_event is None or not stop_event.is_set():
+        job = claim_next_job()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        logger.debug('%s: Взято задание %s.', run_worker.__name__, job.pk,
+                     extra={'job_id': job.pk})
+        process_job(job)
+        close_old_connections()
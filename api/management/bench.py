@@ -0,0 +1,36 @@
+"""Общие помощники команд замеров и проверок производительности."""
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+# Изображение с QR-кодом ссылки на КНМ из сохраненных тестовых данных
+SAMPLE_QR = Path(settings.MEDIA_ROOT) / 'test' / '66250926600018705336.png'
+
+# Ссылка на КНМ, страница которой сохранена в FIXTURES_DIR
+FIXTURE_URL = (
+    'https://proverki.gov.ru/portal/public-knm/link-only/'
+    '77c98f91-f64b-4aac-a260-7bdc3a915b29'
+)
+
+
+class Rollback(Exception):
+    """Прерывает транзакцию замера, чтобы откатить созданные данные."""
+    pass
+
+
+@contextmanager
+def rolled_back(keep=False):
+    """Транзакция, которая откатывается по выходе из блока, если не keep."""
+    try:
+        with transaction.atomic():
+            yield
+            if not keep:
+                raise Rollback
+    except Rollback:
+        pass
+
+
+def to_ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
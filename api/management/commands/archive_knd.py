@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.archive import archive_finished
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит завершенные проверки КНД, не менявшиеся дольше срока '
+        'хранения, в архивную таблицу. Например, раз в сутки по cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days', type=int,
+            help='Сколько дней завершенная проверка остается в рабочей таблице.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Сколько записей переносить за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать записи для переноса.'
+        )
+
+    def handle(self, *args, **options):
+        report = archive_finished(
+            retention_days=options['retention_days'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,57 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.utils.browser_pool import get_browser_pool
+from api.utils.parser_erknm_headless import (
+    VERIFIABLE_DATA, extract_fields, safe_extract
+)
+from api.utils.stub_portal import FIXTURES_DIR
+
+FIXTURES = ('knm_page.html', 'knm_page_partial.html')
+
+
+def extract_legacy(page):
+    """Прежнее извлечение: шесть последовательных ожиданий локаторов."""
+    return {field: safe_extract(page, selector)
+            for field, selector in VERIFIABLE_DATA.items()}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает извлечение полей КНМ шестью локаторами и одним '
+        'проходом page.evaluate на сохраненных HTML-страницах, '
+        'загруженных через page.set_content.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        pool = get_browser_pool()
+        for fixture in FIXTURES:
+            html = (FIXTURES_DIR / fixture).read_text(encoding='utf-8')
+            for name, extractor in (('locators', extract_legacy),
+                                    ('evaluate', extract_fields)):
+                with pool.lease() as lease:
+                    timings, result = lease.run(
+                        lambda page: self._measure(
+                            page, html, extractor, options['iterations']))
+                missing = sum(value == 'Не найдено' for value in result.values())
+                self.stdout.write(
+                    f'{fixture:22} {name:9} '
+                    f'медиана {statistics.median(timings) * 1000:9.2f} ms, '
+                    f'не найдено полей: {missing}'
+                )
+
+    @staticmethod
+    def _measure(page, html, extractor, iterations):
+        page.set_content(html)
+        result = extractor(page)
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            result = extractor(page)
+            timings.append(time.perf_counter() - started)
+        return timings, result
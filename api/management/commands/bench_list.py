@@ -0,0 +1,103 @@
+import time
+import uuid
+from base64 import b64encode
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.conditional import list_cache_settings
+from api.management.bench import rolled_back, to_ms
+from api.utils.metrics import percentile
+from knd.models import Knd
+
+STATUSES = ['', 'Ожидает проведения', 'Ожидает завершения', 'Завершено']
+
+
+def encode_cursor(position):
+    """Курсор DRF CursorPagination, указывающий на позицию position."""
+    return b64encode(urlencode({'p': position}).encode('ascii')).decode('ascii')
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет таблицу Knd (по умолчанию 100 000 записей во временной '
+        'транзакции) и измеряет p95 задержки первой и глубокой страниц '
+        'списка /api/v1/knd/. Кэш страниц списка на время замера '
+        'выключается, чтобы измерялись запросы к базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=100_000)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--keep', action='store_true',
+                            help='Не откатывать созданные записи.')
+
+    def handle(self, *args, **options):
+        no_cache = {**list_cache_settings(), 'ENABLED': False}
+        with rolled_back(keep=options['keep']), override_settings(
+                KND_LIST_CACHE=no_cache):
+            self._run(options)
+
+    def _run(self, options):
+        user = get_user_model().objects.create_user(
+            username=f'bench-list-{uuid.uuid4().hex[:8]}')
+        self._seed(user, options['records'])
+
+        deep_index = options['records'] * 9 // 10
+        deep_created = Knd.objects.order_by('created', 'number_knd').values_list(
+            'created', flat=True)[deep_index]
+        page_size = options['page_size']
+        scenarios = {
+            'first': f'/api/v1/knd/?page_size={page_size}',
+            'deep': (f'/api/v1/knd/?page_size={page_size}'
+                     f'&cursor={encode_cursor(str(deep_created))}'),
+            'filtered': (f'/api/v1/knd/?page_size={page_size}'
+                         '&status_knm=Ожидает завершения'
+                         '&start_data_after=2025-06-01'),
+            'sparse': (f'/api/v1/knd/?page_size={page_size}'
+                       '&fields=id,number_knd,status_knm'),
+        }
+        client = APIClient(SERVER_NAME='127.0.0.1')
+        client.force_authenticate(user)
+        for name, url in scenarios.items():
+            timings = []
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.status_code
+            timings.sort()
+            self.stdout.write(
+                f'{name:9} p50 {to_ms(percentile(timings, 50)):8.2f} ms  '
+                f'p95 {to_ms(percentile(timings, 95)):8.2f} ms  '
+                f"строк {len(response.data['results'])}"
+            )
+
+    def _seed(self, user, records):
+        started = time.perf_counter()
+        base = datetime(2025, 1, 1)
+        batch = []
+        for index in range(records):
+            start = (base + timedelta(days=index % 365)).date()
+            batch.append(Knd(
+                inspector=user,
+                url_knd=('https://proverki.gov.ru/portal/public-knm/'
+                         f'link-only/{uuid.uuid4()}'),
+                number_knd=f'BL{index:018d}',
+                status_knm=STATUSES[index % len(STATUSES)],
+                start_data=start,
+                end_data=start + timedelta(days=10),
+            ))
+            if len(batch) == 5000:
+                Knd.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Knd.objects.bulk_create(batch)
+        self.stdout.write(
+            f'Создано записей: {records} за '
+            f'{time.perf_counter() - started:.1f} с')
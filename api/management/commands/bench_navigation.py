@@ -0,0 +1,75 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from api.management.bench import FIXTURE_URL
+from api.utils.browser_pool import get_browser_pool
+from api.utils.navigation import (
+    NavigationProfile, NavigationTelemetry, navigation_settings
+)
+from api.utils.parser_erknm_headless import scrape_page
+from api.utils.stub_portal import FIXTURES_DIR
+
+# Синтетические ответы на ресурсы страницы типичного для портала размера
+RESOURCES = {
+    '.css': ('text/css', 180 * 1024),
+    '.woff2': ('font/woff2', 90 * 1024),
+    '.png': ('image/png', 40 * 1024),
+    '.jpg': ('image/jpeg', 350 * 1024),
+    '.js': ('application/javascript', 120 * 1024),
+}
+
+
+def fulfill_from_fixtures(html):
+    """Обработчик page.route: документ из фикстуры, ресурсы — заглушки."""
+    def handle(route):
+        url = route.request.url.split('?')[0]
+        for suffix, (content_type, size) in RESOURCES.items():
+            if url.endswith(suffix):
+                body = b'/*' + b' ' * (size - 4) + b'*/'
+                if content_type.startswith('application/javascript'):
+                    body = b'void 0;' + body
+                route.fulfill(status=200, content_type=content_type, body=body)
+                return
+        route.fulfill(status=200, content_type='text/html; charset=utf-8',
+                      body=html)
+    return handle
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает объем трафика и время до данных для прежней навигации '
+        '(networkidle, все ресурсы) и облегченного профиля на сохраненной '
+        'странице КНМ.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        html = (FIXTURES_DIR / 'knm_page.html').read_text(encoding='utf-8')
+        pool = get_browser_pool()
+        for enabled in (False, True):
+            config = {**navigation_settings(), 'ENABLED': enabled}
+            results = []
+            for _ in range(options['iterations']):
+                telemetry = NavigationTelemetry(measure_bytes=True)
+
+                def run(page):
+                    page.route('**/*', fulfill_from_fixtures(html))
+                    scrape_page(
+                        page, FIXTURE_URL, telemetry=telemetry,
+                        profile=NavigationProfile(FIXTURE_URL, config))
+                    return telemetry.as_dict()
+
+                with pool.lease() as lease:
+                    results.append(lease.run(run))
+            name = 'profile' if enabled else 'legacy'
+            self.stdout.write(
+                f'{name:8} '
+                f"байт {statistics.median(r['bytes'] for r in results):10.0f} "
+                f"запросов {statistics.median(r['requests'] for r in results):4.0f} "
+                f"заблокировано {statistics.median(r['blocked'] for r in results):4.0f} "
+                'время до данных '
+                f"{statistics.median(r['time_to_data_ms'] for r in results):8.1f} ms"
+            )
@@ -0,0 +1,108 @@
+import statistics
+import time
+import tracemalloc
+
+import requests
+from django.core.management.base import BaseCommand
+from requests.adapters import BaseAdapter
+
+from api.management.bench import FIXTURE_URL, to_ms
+from api.utils.metrics import percentile
+from api.utils.parser_erknm_http import parse_knm_data_http
+from api.utils.stub_portal import FIXTURES_DIR
+
+CONTENT_TYPES = {
+    '.json': 'application/json; charset=utf-8',
+    '.html': 'text/html; charset=utf-8',
+}
+
+
+class FixtureAdapter(BaseAdapter):
+    """Транспорт requests, отдающий сохраненный ответ вместо сети."""
+
+    def __init__(self, fixture):
+        super().__init__()
+        self.body = fixture.read_bytes()
+        self.content_type = CONTENT_TYPES[fixture.suffix]
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = self.content_type
+        response._content = self.body
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def measure(fn, iterations):
+    """Возвращает задержки (сек.) и пик выделенной Python-памяти (байт)."""
+    fn()  # Прогрев
+    timings = []
+    tracemalloc.start()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку и память HTTP- и браузерного парсеров ЕРКНМ '
+        'на сохраненных ответах портала, без обращения к сети.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--backends', default='http-json,http-html,browser',
+            help='Список бэкендов через запятую.'
+        )
+
+    def handle(self, *args, **options):
+        backends = {
+            'http-json': lambda: self._http_runner('knm_api.json'),
+            'http-html': lambda: self._http_runner('knm_page.html'),
+            'browser': self._browser_runner,
+        }
+        for name in options['backends'].split(','):
+            runner = backends[name.strip()]()
+            timings, peak = measure(runner, options['iterations'])
+            timings.sort()
+            self.stdout.write(
+                f'{name:10} median={statistics.median(timings) * 1000:8.2f} ms '
+                f'p95={to_ms(percentile(timings, 95)):8.2f} ms '
+                f'py_peak={peak / 1024:8.1f} KiB'
+            )
+
+    @staticmethod
+    def _http_runner(fixture_name):
+        session = requests.Session()
+        session.mount('https://', FixtureAdapter(FIXTURES_DIR / fixture_name))
+        return lambda: parse_knm_data_http(FIXTURE_URL, session=session)
+
+    @staticmethod
+    def _browser_runner():
+        from api.utils.browser_pool import get_browser_pool
+        from api.utils.parser_erknm_headless import scrape_page
+
+        html = (FIXTURES_DIR / 'knm_page.html').read_text(encoding='utf-8')
+
+        def scrape(page):
+            page.route('**/*', lambda route: route.fulfill(
+                status=200, content_type=CONTENT_TYPES['.html'], body=html))
+            return scrape_page(page, FIXTURE_URL)
+
+        pool = get_browser_pool()
+
+        def run():
+            with pool.lease() as lease:
+                return lease.run(scrape)
+        return run
@@ -0,0 +1,63 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.utils.one_qrcod_in_url_decode import (
+    decode_qr_code, decode_qr_code_bytes
+)
+
+SAMPLES_DIR = Path(settings.MEDIA_ROOT) / 'test'
+
+
+def _disk_round_trip(data, tmp_dir, name):
+    """Прежний путь: сохранить файл, прочитать cv2.imread и удалить."""
+    path = os.path.join(tmp_dir, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return decode_qr_code(path)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает распознавание QR-кодов из media/test/ с записью '
+        'на диск и из памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        samples = sorted(SAMPLES_DIR.glob('*.png'))
+        tmp_dir = tempfile.mkdtemp(prefix='qr-bench-')
+        try:
+            for sample in samples:
+                data = sample.read_bytes()
+                disk = self._measure(
+                    lambda: _disk_round_trip(data, tmp_dir, sample.name),
+                    options['iterations'])
+                memory = self._measure(
+                    lambda: decode_qr_code_bytes(data), options['iterations'])
+                self.stdout.write(
+                    f'{sample.name}: диск {disk * 1000:7.2f} ms, '
+                    f'память {memory * 1000:7.2f} ms '
+                    f'({(1 - memory / disk) * 100:+.1f}% быстрее)'
+                )
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def _measure(fn, iterations):
+        """Медиана времени вызова в секундах."""
+        fn()  # Прогрев
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
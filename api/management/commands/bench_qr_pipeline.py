@@ -0,0 +1,124 @@
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from pyzbar.pyzbar import decode
+
+from api.utils.qr_pipeline import decode_pipeline
+
+SAMPLES_DIR = Path(settings.MEDIA_ROOT) / 'test'
+
+
+def _phone_photo(img):
+    """Крупное фото: код занимает малую часть кадра 4000x3000."""
+    canvas = np.full((3000, 4000, 3), 235, dtype=np.uint8)
+    height, width = img.shape[:2]
+    y, x = (3000 - height) // 2, (4000 - width) // 2
+    canvas[y:y + height, x:x + width] = img
+    return canvas
+
+
+def _low_contrast(img):
+    return cv2.convertScaleAbs(img, alpha=0.25, beta=120)
+
+
+def _blurred(img):
+    return cv2.GaussianBlur(img, (7, 7), 0)
+
+
+def _rotated(img, angle=20):
+    height, width = img.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(img, matrix, (width, height),
+                          borderValue=(255, 255, 255))
+
+
+def _skewed(img):
+    height, width = img.shape[:2]
+    src = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    dst = np.float32([
+        [width * 0.1, height * 0.05], [width * 0.9, 0],
+        [width, height], [0, height * 0.9]])
+    matrix = cv2.getPerspectiveTransform(src, dst)
+    return cv2.warpPerspective(img, matrix, (width, height),
+                               borderValue=(255, 255, 255))
+
+
+def _noisy(img):
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 40, img.shape)
+    return np.clip(img.astype(np.float64) + noise, 0, 255).astype(np.uint8)
+
+
+def _small(img):
+    return cv2.resize(img, None, fx=0.35, fy=0.35, interpolation=cv2.INTER_AREA)
+
+
+VARIANTS = {
+    'original': lambda img: img,
+    'phone_photo': _phone_photo,
+    'low_contrast': _low_contrast,
+    'blurred': _blurred,
+    'rotated': _rotated,
+    'skewed': _skewed,
+    'noisy': _noisy,
+    'small': _small,
+}
+
+
+def _baseline(img):
+    """Прежнее поведение: один вызов pyzbar на полном BGR-изображении."""
+    decoded = decode(img)
+    if not decoded:
+        raise ValueError("QR-код не распознан на изображении")
+    return {'url': decoded[0].data.decode('utf-8'), 'stage': 'baseline'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает долю распознанных QR-кодов и задержку прежнего '
+        'распознавания и многоступенчатого конвейера на media/test/ '
+        'и синтетически испорченных копиях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        samples = [cv2.imread(str(path))
+                   for path in sorted(SAMPLES_DIR.glob('*.png'))]
+        for name, variant in VARIANTS.items():
+            images = [variant(img) for img in samples]
+            for decoder_name, decoder in (('baseline', _baseline),
+                                          ('pipeline', decode_pipeline)):
+                decoded, timings, stages = self._run(
+                    decoder, images, options['iterations'])
+                self.stdout.write(
+                    f'{name:13} {decoder_name:9} '
+                    f'распознано {decoded}/{len(images)} '
+                    f'медиана {statistics.median(timings) * 1000:8.2f} ms '
+                    f'ступени {dict(stages)}'
+                )
+
+    @staticmethod
+    def _run(decoder, images, iterations):
+        decoded = 0
+        timings = []
+        stages = Counter()
+        for img in images:
+            for iteration in range(iterations):
+                started = time.perf_counter()
+                try:
+                    result = decoder(img)
+                except ValueError:
+                    result = None
+                timings.append(time.perf_counter() - started)
+                if iteration == 0 and result:
+                    decoded += 1
+                    stages[result['stage']] += 1
+        return decoded, timings, stages
@@ -0,0 +1,309 @@
+import json
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.management.bench import SAMPLE_QR, to_ms
+from api.utils.metrics import percentile
+from api.utils.one_qrcod_in_url_decode import decode_qr_code
+from api.utils.parser_erknm_headless import parse_knm_data
+from api.utils.stub_portal import StubPortal
+from knd.models import Knd
+
+# Метрики, по которым ищется регрессия относительно базового прогона
+COMPARED_METRICS = ('p50_ms', 'p95_ms')
+
+
+def run_scenario(fn, total, concurrency):
+    """Выполняет ``fn(i)`` total раз в concurrency потоках."""
+    latencies = []
+    errors = {}
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    fn(index)
+                    error = None
+                except Exception as e:
+                    error = type(e).__name__
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if error is None:
+                        latencies.append(elapsed)
+                    else:
+                        errors[error] = errors.get(error, 0) + 1
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'ok': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / wall, 2) if wall else None,
+        'p50_ms': to_ms(percentile(latencies, 50)),
+        'p95_ms': to_ms(percentile(latencies, 95)),
+        'p99_ms': to_ms(percentile(latencies, 99)),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2)
+        if latencies else None,
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """Сценарии, где задержка выросла больше чем на threshold (доля)."""
+    regressions = []
+    for scenario, levels in results.items():
+        for level, metrics in levels.items():
+            base = baseline.get(scenario, {}).get(level)
+            if not base:
+                continue
+            for name in COMPARED_METRICS:
+                old, new = base.get(name), metrics.get(name)
+                if old and new and new > old * (1 + threshold):
+                    regressions.append(
+                        f'{scenario}@{level} {name}: {old} -> {new} мс')
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Сквозной бенчмарк на локальной заглушке портала ЕРКНМ: '
+        'decode_qr_code, parse_knm_data, upload_qrcod и обновление '
+        'записи (perform_update) при одиночной и параллельной нагрузке. '
+        'Результаты пишутся в JSON и сравниваются с базовым прогоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--concurrency', default='1,8',
+            help='Уровни параллельности через запятую.')
+        parser.add_argument(
+            '--scenarios', default='decode,parse,upload,update',
+            help='Сценарии через запятую.')
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Задержка заглушки, секунды.')
+        parser.add_argument('--jitter', type=float, default=0.02)
+        parser.add_argument('--failure-rate', type=float, default=0.0)
+        parser.add_argument(
+            '--output', default='bench_results.json',
+            help='Файл для результатов прогона.')
+        parser.add_argument(
+            '--baseline', help='JSON прошлого прогона для сравнения.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p50/p95 относительно базы (доля).')
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        scenarios = [name.strip() for name in options['scenarios'].split(',')]
+        unknown = set(scenarios) - {'decode', 'parse', 'upload', 'update'}
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(unknown)}")
+
+        self.iterations = options['iterations']
+        self.workdir = Path(tempfile.mkdtemp(prefix='bench-suite-'))
+        portal = StubPortal(
+            latency=options['latency'], jitter=options['jitter'],
+            failure_rate=options['failure_rate'], unique_numbers=True)
+        with portal, override_settings(**self._stub_settings(portal)):
+            try:
+                results = self._run(portal, scenarios, levels,
+                                    options['iterations'])
+            finally:
+                shutil.rmtree(self.workdir, ignore_errors=True)
+
+        report = {
+            'revision': git_revision(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'config': {
+                'iterations': options['iterations'],
+                'concurrency': levels,
+                'latency': options['latency'],
+                'jitter': options['jitter'],
+                'failure_rate': options['failure_rate'],
+            },
+            'portal': {'requests': portal.requests,
+                       'failures': portal.failures},
+            'results': results,
+        }
+        Path(options['output']).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.stdout.write(f"Результаты записаны в {options['output']}")
+
+        if options['baseline']:
+            baseline = json.loads(
+                Path(options['baseline']).read_text(encoding='utf-8'))
+            regressions = find_regressions(
+                results, baseline['results'], options['threshold'])
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(f'  РЕГРЕССИЯ {line}')
+                raise CommandError(
+                    f'Найдено регрессий: {len(regressions)} '
+                    f"(порог {options['threshold']:.0%})")
+            self.stdout.write('Регрессий относительно базы нет.')
+
+    def _stub_settings(self, portal):
+        return {
+            # Заглушка отдает данные по API_URL_TEMPLATE, браузер не нужен
+            'ERKNM_PARSER_BACKEND': 'http',
+            'ERKNM_HTTP': {**getattr(settings, 'ERKNM_HTTP', {}),
+                           'API_URL_TEMPLATE': portal.api_url_template},
+            # Свежее состояние защиты портала без лимита частоты
+            'ERKNM_GUARD': {
+                **getattr(settings, 'ERKNM_GUARD', {}),
+                'STATE_PATH': str(self.workdir / 'guard.sqlite3'),
+                'RATE': 10000.0,
+                'BURST': 10000,
+                'MAX_CONCURRENCY': 64,
+            },
+        }
+
+    def _run(self, portal, scenarios, levels, iterations):
+        # Защита портала создается при первом вызове с текущими настройками
+        from api.utils import portal_guard
+        portal_guard._guard = None
+
+        user = get_user_model().objects.create_user(
+            username=f'bench-suite-{uuid.uuid4().hex[:8]}')
+        runners = {
+            'decode': self._decode_runner,
+            'parse': lambda: self._parse_runner(portal),
+            'upload': lambda: self._upload_runner(portal, user),
+            'update': lambda: self._update_runner(portal, user),
+        }
+        results = {}
+        try:
+            for name in scenarios:
+                results[name] = {}
+                for level in levels:
+                    fn = runners[name]()
+                    metrics = run_scenario(fn, iterations, level)
+                    results[name][str(level)] = metrics
+                    self.stdout.write(
+                        f"{name:7} x{level:<3} ok {metrics['ok']:4} "
+                        f"ошибок {sum(metrics['errors'].values()):3} "
+                        f"p50 {metrics['p50_ms']} мс "
+                        f"p95 {metrics['p95_ms']} мс "
+                        f"{metrics['rps']} rps"
+                    )
+        finally:
+            Knd.objects.filter(inspector=user).delete()
+            user.delete()
+            portal_guard._guard = None
+        return results
+
+    def _decode_runner(self):
+        # decode_qr_code удаляет файл, поэтому каждому вызову своя копия
+        def run(index):
+            path = self.workdir / f'decode-{uuid.uuid4().hex}.png'
+            shutil.copyfile(SAMPLE_QR, path)
+            decode_qr_code(str(path))
+        return run
+
+    def _parse_runner(self, portal):
+        def run(index):
+            parse_knm_data(portal.page_url(str(uuid.uuid4())))
+        return run
+
+    @staticmethod
+    def _qr_png(url):
+        qr = cv2.QRCodeEncoder.create().encode(url)
+        qr = cv2.resize(qr, None, fx=8, fy=8, interpolation=cv2.INTER_NEAREST)
+        # Белое поле вокруг кода, как на фотографии или скриншоте
+        qr = cv2.copyMakeBorder(
+            qr, 32, 32, 32, 32, cv2.BORDER_CONSTANT, value=255)
+        ok, png = cv2.imencode('.png', qr)
+        if not ok:
+            raise CommandError('Не удалось создать QR-код.')
+        return png.tobytes()
+
+    def _upload_runner(self, portal, user):
+        # QR-коды с уникальными ссылками готовятся заранее, вне замера
+        images = [self._qr_png(portal.page_url(str(uuid.uuid4())))
+                  for _ in range(self.iterations)]
+        local = threading.local()
+
+        def run(index):
+            client = self._client(local, user)
+            response = client.post(
+                '/api/v1/knd/upload_qrcod/',
+                {'file': SimpleUploadedFile(
+                    f'bench-{index}.png', images[index],
+                    content_type='image/png')},
+                format='multipart')
+            if response.status_code != 201:
+                raise RuntimeError(response.status_code)
+        return run
+
+    def _update_runner(self, portal, user):
+        knds = Knd.objects.bulk_create([
+            Knd(
+                inspector=user,
+                url_knd=portal.page_url(str(uuid.uuid4())),
+                number_knd=f'BS{uuid.uuid4().int % 10 ** 18:018d}',
+                status_knm='Ожидает проведения',
+            )
+            for _ in range(self.iterations)
+        ])
+        pks = list(Knd.objects.filter(
+            url_knd__in=[knd.url_knd for knd in knds]).values_list(
+                'pk', flat=True))
+        local = threading.local()
+
+        def run(index):
+            client = self._client(local, user)
+            response = client.patch(
+                f'/api/v1/knd/{pks[index % len(pks)]}/?force=1', {},
+                format='json')
+            if response.status_code != 200:
+                raise RuntimeError(response.status_code)
+        return run
+
+    @staticmethod
+    def _client(local, user):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = APIClient(SERVER_NAME='127.0.0.1')
+            client.force_authenticate(user)
+        return client
@@ -0,0 +1,103 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.management.bench import SAMPLE_QR, rolled_back
+from api.utils import scrape_cache
+from api.utils.one_qrcod_in_url_decode import decode_qr_code_bytes
+from api.utils.stub_portal import knm_content
+from knd.models import Knd
+
+# Максимальное число SQL-запросов на один вызов эндпоинта
+BUDGETS = {
+    'list': 2,
+    'retrieve': 2,
+    'refresh': 3,
+    'upload': 6,
+}
+
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет, что число SQL-запросов на список, просмотр, загрузку '
+        'QR-кода и обновление статуса не превышает бюджет и не растет '
+        'с числом записей. Данные создаются во временной транзакции и '
+        'откатываются; страницы КНМ берутся из кэша парсинга, без сети.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            results = self._measure(options['records'])
+
+        failed = []
+        for name, (count, sql) in results.items():
+            ok = count <= BUDGETS[name]
+            self.stdout.write(
+                f"{name:9} запросов {count:3} (бюджет {BUDGETS[name]}) "
+                f"{'OK' if ok else 'ПРЕВЫШЕН'}"
+            )
+            if not ok:
+                failed.append(name)
+                for query in sql:
+                    self.stdout.write(f'    {query}')
+        if failed:
+            raise CommandError(f"Превышен бюджет запросов: {', '.join(failed)}")
+
+    def _measure(self, records):
+        user = get_user_model().objects.create_user(
+            username=f'query-budget-{uuid.uuid4().hex[:8]}')
+        knds = Knd.objects.bulk_create([
+            Knd(
+                inspector=user,
+                url_knd=('https://proverki.gov.ru/portal/public-knm/'
+                         f'link-only/{uuid.uuid4()}'),
+                number_knd=f'QB{index:018d}',
+                status_knm='Ожидает проведения',
+            )
+            for index in range(records)
+        ])
+        for knd in knds:
+            scrape_cache.store(knd.url_knd, knm_content(knd.number_knd))
+        knd = Knd.objects.get(number_knd=knds[0].number_knd)
+
+        qr_data = SAMPLE_QR.read_bytes()
+        qr_url = decode_qr_code_bytes(qr_data)['url']
+        scrape_cache.store(qr_url, knm_content(f'QB{records:018d}'))
+
+        client = APIClient(SERVER_NAME='127.0.0.1')
+        client.force_authenticate(user)
+        calls = {
+            'list': lambda: client.get('/api/v1/knd/'),
+            'retrieve': lambda: client.get(f'/api/v1/knd/{knd.pk}/'),
+            'refresh': lambda: client.patch(
+                f'/api/v1/knd/{knd.pk}/', {}, format='json'),
+            'upload': lambda: client.post(
+                '/api/v1/knd/upload_qrcod/',
+                {'file': self._upload(qr_data)}, format='multipart'),
+        }
+        results = {}
+        for name, call in calls.items():
+            with CaptureQueriesContext(connection) as queries:
+                response = call()
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{name}: ответ {response.status_code}: {response.data}')
+            results[name] = (
+                len(queries), [query['sql'] for query in queries])
+        for knd in knds:
+            scrape_cache.invalidate(knd.url_knd)
+        scrape_cache.invalidate(qr_url)
+        return results
+
+    @staticmethod
+    def _upload(data):
+        return SimpleUploadedFile(SAMPLE_QR.name, data, content_type='image/png')
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils.metrics import percentile
+from api.utils.stub_portal import StubPortal
+
+# Эндпоинты обновления статуса одной записи, которые парсят страницу КНМ
+ENDPOINTS = {
+    'wsgi': ('PATCH', '/api/v1/knd/{pk}/?force=1'),
+    'asgi': ('POST', '/api/v1/async/knd/{pk}/refresh/?force=1'),
+}
+
+
+def run_load(method, urls, token, total, concurrency, timeout):
+    """Отправляет total запросов в concurrency потоков, возвращает метрики.
+
+    Запросы по очереди идут на разные urls: одинаковые запросы сливаются
+    в один парсинг (single-flight), и нагрузка на портал была бы занижена.
+    """
+    latencies = []
+    errors = []
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        session = requests.Session()
+        session.headers['Authorization'] = f'Bearer {token}'
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            url = urls[index % len(urls)]
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, json={}, timeout=timeout)
+                ok = response.status_code < 400
+                error = None if ok else str(response.status_code)
+            except requests.RequestException as e:
+                error = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                if error is None:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(error)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'ok': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / wall if wall else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность обновления статуса под WSGI и '
+        'ASGI на локальной заглушке портала. Перед запуском поднимите '
+        'оба сервера с ERKNM_PARSER_BACKEND=auto и '
+        'ERKNM_API_URL_TEMPLATE, указывающим на заглушку, '
+        'например: gunicorn apikndproject.wsgi -b :8000 --threads 4 и '
+        'uvicorn apikndproject.asgi:application --port 8001.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', help='Базовый URL WSGI-сервера.')
+        parser.add_argument('--asgi', help='Базовый URL ASGI-сервера.')
+        parser.add_argument('--token', required=True, help='JWT access-токен.')
+        parser.add_argument(
+            '--pks', type=int, nargs='+', required=True,
+            help='id существующих записей Knd с разными ссылками на КНМ; '
+                 'нужно не меньше, чем --concurrency.')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--timeout', type=float, default=60.0)
+        parser.add_argument('--stub-port', type=int,
+                            help='Запустить заглушку портала на этом порту.')
+        parser.add_argument('--stub-latency', type=float, default=1.0)
+        parser.add_argument('--stub-failure-rate', type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        targets = {name: options[name] for name in ENDPOINTS if options[name]}
+        if not targets:
+            raise CommandError('Укажите --wsgi и/или --asgi.')
+        pks = list(dict.fromkeys(options['pks']))
+        if len(pks) < options['concurrency']:
+            self.stderr.write(
+                f'Записей {len(pks)} меньше, чем --concurrency '
+                f"{options['concurrency']}: одновременные запросы к одной "
+                'записи сольются в один парсинг.')
+
+        stub = None
+        if options['stub_port']:
+            stub = StubPortal(
+                latency=options['stub_latency'],
+                failure_rate=options['stub_failure_rate'],
+                port=options['stub_port'],
+            ).start()
+            self.stdout.write(
+                f'Заглушка портала: ERKNM_API_URL_TEMPLATE='
+                f'{stub.api_url_template}')
+        try:
+            for name, base_url in targets.items():
+                method, path = ENDPOINTS[name]
+                result = run_load(
+                    method,
+                    [base_url.rstrip('/') + path.format(pk=pk) for pk in pks],
+                    options['token'],
+                    options['requests'],
+                    options['concurrency'],
+                    options['timeout'],
+                )
+                p50 = result['p50'] or 0.0
+                p95 = result['p95'] or 0.0
+                self.stdout.write(
+                    f"{name}: {result['rps']:7.2f} запр./с, "
+                    f"успешно {result['ok']}, ошибок {result['errors']}, "
+                    f'p50 {p50 * 1000:8.1f} ms, p95 {p95 * 1000:8.1f} ms'
+                )
+        finally:
+            if stub is not None:
+                stub.stop()
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api.refresh import open_knd_queryset, refresh_statuses
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет статусы всех незавершенных проверок КНД. '
+        'Например, раз в час: --status "" , раз в день: '
+        '--status "Ожидает завершения".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status', action='append', dest='statuses',
+            help='Обновлять только записи с этим статусом (можно повторять).'
+        )
+        parser.add_argument('--workers', type=int, help='Число потоков.')
+        parser.add_argument(
+            '--host-rate', type=float,
+            help='Максимум запросов в секунду к одному хосту.'
+        )
+
+    def handle(self, *args, **options):
+        report = refresh_statuses(
+            open_knd_queryset(options['statuses']),
+            workers=options['workers'],
+            host_rate=options['host_rate'],
+        )
+        # В изменениях есть даты, обычный json их не сериализует
+        self.stdout.write(json.dumps(
+            report.as_dict(), cls=DjangoJSONEncoder, ensure_ascii=False,
+            indent=2))
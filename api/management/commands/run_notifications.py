@@ -0,0 +1,34 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.notifications import run_tick
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассылает уведомления о сроках проверок. Без --loop выполняет '
+        'один проход, с --loop работает как постоянный обработчик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument(
+            '--interval', type=int,
+            default=getattr(settings, 'KND_NOTIFICATIONS_INTERVAL', 300),
+            help='Пауза между проходами в секундах.'
+        )
+        parser.add_argument(
+            '--date', type=date.fromisoformat,
+            help='Считать сегодняшней указанную дату (YYYY-MM-DD).'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = run_tick(today=options['date'])
+            self.stdout.write(f'Отправлено: {sent}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
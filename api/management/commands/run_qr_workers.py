@@ -0,0 +1,68 @@
+import multiprocessing
+import signal
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from api.jobs import run_worker
+from knd.models import QrJob
+
+
+def _worker_main(stop_event, poll_interval):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(poll_interval=poll_interval, stop_event=stop_event)
+
+
+class Command(BaseCommand):
+    help = 'Запускает процессы фоновой обработки загруженных QR-кодов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=getattr(settings, 'KND_QR_WORKERS', 2),
+            help='Количество процессов-обработчиков.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза (сек.) между опросами пустой очереди.'
+        )
+        parser.add_argument(
+            '--stale-minutes', type=int, default=10,
+            help='Вернуть в очередь задания, зависшие дольше N минут.'
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        requeued = QrJob.objects.filter(
+            status__in=[QrJob.DECODING, QrJob.SCRAPING],
+            updated__lt=stale_before,
+        ).update(status=QrJob.QUEUED)
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь заданий: {requeued}')
+
+        # Дочерние процессы откроют собственные соединения с БД
+        connections.close_all()
+        stop_event = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(
+                target=_worker_main,
+                args=(stop_event, options['poll_interval']),
+                name=f'qr-worker-{index}',
+            )
+            for index in range(options['concurrency'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(
+            f'Запущено обработчиков: {len(workers)}. Ctrl+C для остановки.')
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write('Обработчики остановлены.')
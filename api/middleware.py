@@ -0,0 +1,41 @@
+"""Идентификатор запроса для сквозного логирования."""
+import uuid
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+from api.utils.logging_config import request_id_var
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+
+def _request_id(request):
+    # Идентификатор от балансировщика сохраняется, иначе создается новый
+    value = request.headers.get(REQUEST_ID_HEADER, '')[:64]
+    return value or uuid.uuid4().hex
+
+
+@sync_and_async_middleware
+def request_id_middleware(get_response):
+    """Кладет id запроса в contextvars логгера и в заголовок ответа."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            request_id = _request_id(request)
+            token = request_id_var.set(request_id)
+            try:
+                response = await get_response(request)
+            finally:
+                request_id_var.reset(token)
+            response[REQUEST_ID_HEADER] = request_id
+            return response
+    else:
+        def middleware(request):
+            request_id = _request_id(request)
+            token = request_id_var.set(request_id)
+            try:
+                response = get_response(request)
+            finally:
+                request_id_var.reset(token)
+            response[REQUEST_ID_HEADER] = request_id
+            return response
+    return middleware
@@ -0,0 +1,107 @@
+"""Планировщик уведомлений о сроках проверок КНД.
+
+Каждое правило описывает событие относительно одной из дат проверки:
+за два дня до начала, за день и в день выезда, за день и в день
+окончания. За один проход (tick) на правило выполняется постоянное
+число запросов: индексированная выборка по диапазону дат без уже
+отправленных уведомлений и одна пакетная запись в журнал Notification.
+"""
+from datetime import date, datetime, timedelta
+
+from django.db.models import Exists, OuterRef
+
+from api.notifiers import get_notifier
+from api.utils.logging_config import logger
+from knd.models import Knd, Notification
+
+FINISHED_STATUS = 'Завершено'
+
+# Вид уведомления, поле даты, за сколько дней до события, текст
+RULES = [
+    ('start_in_2_days', 'start_data', 2,
+     'Через два дня начинается проверка {number}. '
+     'Необходимо уведомить контролируемое лицо.'),
+    ('departure_tomorrow', 'departure_time', 1,
+     'Завтра выезд на объект по проверке {number}: {adress}.'),
+    ('departure_today', 'departure_time', 0,
+     'Сегодня выезд на объект по проверке {number}: {adress}.'),
+    ('end_tomorrow', 'end_data', 1,
+     'Завтра оканчивается проверка {number}.'),
+    ('end_today', 'end_data', 0,
+     'Сегодня оканчивается проверка {number}. Составьте акт проверки '
+     'и внесите его в ЕРКНМ.'),
+]
+
+DATETIME_FIELDS = {'departure_time'}
+
+BATCH_SIZE = 2000
+
+
+def _due_filter(field, event_date):
+    """Условие диапазона по индексированному полю даты события."""
+    if field in DATETIME_FIELDS:
+        day_start = datetime.combine(event_date, datetime.min.time())
+        return {f'{field}__gte': day_start,
+                f'{field}__lt': day_start + timedelta(days=1)}
+    return {field: event_date}
+
+
+def due_queryset(kind, field, event_date):
+    """Проверки с событием в event_date, по которым уведомление не отправлено."""
+    already_sent = Notification.objects.filter(
+        knd=OuterRef('pk'), kind=kind, due_date=event_date)
+    return (
+        Knd.objects
+        .filter(**_due_filter(field, event_date))
+        .exclude(status_knm=FINISHED_STATUS)
+        .exclude(Exists(already_sent))
+        .select_related('inspector')
+        .only('id', 'number_knd', 'adress', field,
+              'inspector__id', 'inspector__username')
+        .order_by()
+    )
+
+
+def _message(kind, text, knd, event_date):
+    return {
+        'kind': kind,
+        'knd_id': knd.pk,
+        'number_knd': knd.number_knd,
+        'inspector_id': knd.inspector_id,
+        'inspector': str(knd.inspector) if knd.inspector_id else None,
+        'due_date': event_date.isoformat(),
+        'text': text.format(number=knd.number_knd, adress=knd.adress or ''),
+    }
+
+
+def run_tick(today=None, notifier=None):
+    """Рассылает все наступившие уведомления и возвращает их количество по видам."""
+    # USE_TZ = False: даты хранятся в локальном времени сервера
+    today = today or date.today()
+    notifier = notifier or get_notifier()
+    sent = {}
+    for kind, field, days_before, text in RULES:
+        event_date = today + timedelta(days=days_before)
+        batch = []
+        sent[kind] = 0
+        for knd in due_queryset(kind, field, event_date).iterator(
+                chunk_size=BATCH_SIZE):
+            batch.append(knd)
+            if len(batch) >= BATCH_SIZE:
+                sent[kind] += _dispatch(notifier, kind, text, batch, event_date)
+                batch = []
+        if batch:
+            sent[kind] += _dispatch(notifier, kind, text, batch, event_date)
+    logger.info('%s: Отправлено уведомлений: %s', run_tick.__name__, sent)
+    return sent
+
+
+def _dispatch(notifier, kind, text, batch, event_date):
+    notifier.send([_message(kind, text, knd, event_date) for knd in batch])
+    # Журнал пишется после доставки; конфликт означает, что другой
+    # планировщик уже отметил уведомление.
+    Notification.objects.bulk_create(
+        [Notification(knd=knd, kind=kind, due_date=event_date) for knd in batch],
+        ignore_conflicts=True,
+    )
+    return len(batch)
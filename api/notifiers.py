@@ -0,0 +1,50 @@
+"""Бэкенды доставки уведомлений о сроках проверок.
+
+Бэкенд задается настройкой ``KND_NOTIFIER_BACKEND`` (путь к классу).
+Каждый бэкенд получает пачку уведомлений за один вызов ``send``.
+"""
+import json
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from api.utils.logging_config import logger
+
+
+class BaseNotifier:
+    """Базовый бэкенд уведомлений."""
+
+    def send(self, messages):
+        """Доставляет список уведомлений (словарей)."""
+        raise NotImplementedError
+
+
+class LogNotifier(BaseNotifier):
+    """Пишет уведомления в лог приложения."""
+
+    def send(self, messages):
+        for message in messages:
+            logger.info('Уведомление %s: %s', message['kind'], message['text'])
+
+
+class FileNotifier(BaseNotifier):
+    """Дописывает уведомления в JSONL-файл; удобно для тестов и отладки."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = path or getattr(
+            settings, 'KND_NOTIFIER_FILE', 'notifications.jsonl')
+
+    def send(self, messages):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False, default=str))
+                f.write('\n')
+
+
+def get_notifier():
+    backend = getattr(
+        settings, 'KND_NOTIFIER_BACKEND', 'api.notifiers.LogNotifier')
+    return import_string(backend)()
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KndCursorPagination(CursorPagination):
+    """Курсорная пагинация по порядку создания записей.
+
+    Позиция курсора берется из поля created, поэтому глубокие страницы
+    читаются по индексу (created, number_knd) без OFFSET и COUNT.
+    """
+
+    ordering = ('created', 'number_knd')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -0,0 +1,220 @@
+"""Пакетная сверка незавершенных проверок КНД с порталом.
+
+Все незавершенные записи выбираются одним запросом, страницы КНМ
+загружаются ``scrape_many`` параллельно ограниченным числом потоков с ограничением
+частоты запросов к одному хосту, а изменившиеся поля записываются
+одним ``bulk_update`` вместе с записями в ленту изменений.
+
+Из API сверка запускается ``refresh_in_background`` в фоновом потоке,
+по одной на пользователя; полный отчет пишет только команда
+``refresh_knd``.
+"""
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.changes import record_status_changes
+from api.conditional import bump_generation
+from api.services import KNM_FIELDS, apply_diff, diff_knm
+from api.utils.erknm import get_knm_data
+from api.utils.logging_config import logger
+from knd.models import Knd
+
+FINISHED_STATUS = 'Завершено'
+
+DEFAULT_REFRESH_SETTINGS = {
+    'WORKERS': 4,
+    'HOST_RATE': 2.0,  # Запросов в секунду к одному хосту
+}
+
+
+def refresh_settings():
+    return {**DEFAULT_REFRESH_SETTINGS, **getattr(settings, 'KND_REFRESH', {})}
+
+
+class HostRateLimiter:
+    """Ограничивает частоту запросов к каждому хосту отдельно."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).hostname or ''
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RefreshReport:
+    """Итоги пакетного обновления."""
+
+    def __init__(self):
+        self.total = 0
+        self.changes = []
+        self.failures = []
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        """Обработано записей в минуту."""
+        if not self.elapsed:
+            return 0.0
+        return self.total / self.elapsed * 60
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'updated': len(self.changes),
+            'failed': len(self.failures),
+            'elapsed_sec': round(self.elapsed, 2),
+            'records_per_min': round(self.throughput, 1),
+            'changes': self.changes,
+            'failures': self.failures,
+        }
+
+
+def open_knd_queryset(statuses=None):
+    """Незавершенные проверки; statuses сужает выборку до указанных статусов.
+
+    Загружаются все поля, которые сравнивает ``diff_knm``: отложенное
+    поле стоило бы отдельного запроса на каждую запись.
+    """
+    queryset = Knd.objects.exclude(status_knm=FINISHED_STATUS).exclude(
+        url_knd__isnull=True).only('id', 'url_knd', *KNM_FIELDS.values())
+    if statuses is not None:
+        queryset = queryset.filter(status_knm__in=statuses)
+    return queryset
+
+
+def scrape_many(urls, workers=None, host_rate=None):
+    """Загружает данные КНМ по ссылкам параллельно ограниченным числом потоков.
+
+    Returns:
+        dict: ссылка -> данные КНМ или исключение, если загрузка не удалась.
+    """
+    config = refresh_settings()
+    workers = workers or config['WORKERS']
+    limiter = HostRateLimiter(
+        config['HOST_RATE'] if host_rate is None else host_rate)
+    tasks = queue.Queue()
+    for url in urls:
+        tasks.put(url)
+    results = {}
+
+    def worker():
+        while True:
+            try:
+                url = tasks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                limiter.wait(url)
+                results[url] = get_knm_data(url)
+            except Exception as e:
+                results[url] = e
+
+    threads = [
+        threading.Thread(target=worker, name=f'knd-scrape-{index}')
+        for index in range(min(workers, tasks.qsize()))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def refresh_statuses(queryset=None, workers=None, host_rate=None):
+    """Сверяет проверки из queryset с порталом и возвращает RefreshReport.
+
+    Записываются только изменившиеся поля; в отчете по каждой записи
+    перечислены изменения ``{поле: [старое, новое]}``.
+    """
+    report = RefreshReport()
+    started = time.monotonic()
+
+    records = list(open_knd_queryset() if queryset is None else queryset)
+    report.total = len(records)
+    results = scrape_many(
+        {knd.url_knd for knd in records}, workers=workers, host_rate=host_rate)
+
+    changed = []
+    fields = set()
+    transitions = []
+    now = timezone.now()
+    for knd in records:
+        content = results[knd.url_knd]
+        if isinstance(content, Exception):
+            report.failures.append({'id': knd.pk, 'error': str(content)})
+            continue
+        diff = diff_knm(knd, content)
+        if diff:
+            report.changes.append(
+                {'id': knd.pk, 'number_knd': knd.number_knd, **diff})
+            if 'status_knm' in diff:
+                transitions.append((knd, *diff['status_knm']))
+            fields.update(apply_diff(knd, diff))
+            knd.updated = now
+            changed.append(knd)
+
+    if changed:
+        # bulk_update не заполняет auto_now и не отправляет сигналы
+        with transaction.atomic():
+            Knd.objects.bulk_update(changed, sorted(fields))
+            record_status_changes(transitions)
+        bump_generation()
+    report.elapsed = time.monotonic() - started
+    logger.info(
+        '%s: обработано %d, изменено %d, ошибок %d, %.1f записей/мин.',
+        refresh_statuses.__name__, report.total, len(report.changes),
+        len(report.failures), report.throughput,
+        extra={'duration_ms': round(report.elapsed * 1000, 1)}
+    )
+    return report
+
+
+_background = {}
+_background_lock = threading.Lock()
+
+
+def refresh_in_background(queryset, key):
+    """Запускает ``refresh_statuses`` для queryset в фоновом потоке.
+
+    Для одного key одновременно идет не больше одной сверки. Возвращает
+    запущенный поток или None, если сверка для key уже выполняется.
+    """
+    with _background_lock:
+        running = _background.get(key)
+        if running is not None and running.is_alive():
+            return None
+        thread = _background[key] = threading.Thread(
+            target=_refresh_background, args=(queryset, key),
+            name=f'knd-refresh-{key}', daemon=True)
+        thread.start()
+    return thread
+
+
+def _refresh_background(queryset, key):
+    try:
+        refresh_statuses(queryset)
+    except Exception as e:
+        logger.warning('%s: Сверка %s не выполнена: %s',
+                       refresh_in_background.__name__, key, e)
+    finally:
+        connection.close()
+        with _background_lock:
+            if _background.get(key) is threading.current_thread():
+                del _background[key]
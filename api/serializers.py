@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from knd.models import Knd
+from knd.models import Knd, KndStatusChange, QrJob
 
 
 class KndSerializer(serializers.ModelSerializer):
@@ -12,6 +12,7 @@ class KndSerializer(serializers.ModelSerializer):
         fields = [
             'id',
             'created',
+            'updated',
             'inspector',
             'url_knd',
             'number_knd',
@@ -22,5 +23,48 @@ class KndSerializer(serializers.ModelSerializer):
             'departure_time',
             'adress'
         ]
-        read_only_fields = ['id', 'created', 'url_knd', 'number_knd', 
-                          'reg_data', 'start_data', 'end_data', 'adress']
\ No newline at end of file
+        read_only_fields = ['id', 'created', 'updated', 'url_knd', 'number_knd', 
+                          'reg_data', 'start_data', 'end_data', 'adress']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Разреженный набор полей: ?fields=id,number_knd,status_knm
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request else None
+        if requested and request.method == 'GET':
+            keep = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+
+class QrJobSerializer(serializers.ModelSerializer):
+    knd = KndSerializer(read_only=True)
+
+    class Meta:
+        model = QrJob
+        fields = [
+            'id',
+            'created',
+            'updated',
+            'status',
+            'url_knd',
+            'knd',
+            'error',
+            'error_code'
+        ]
+        read_only_fields = fields
+
+
+class KndStatusChangeSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = KndStatusChange
+        fields = [
+            'id',
+            'created',
+            'knd',
+            'number_knd',
+            'old_status',
+            'new_status'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,185 @@
+"""Общая логика загрузки QR-кода, создания и обновления записей КНД.
+
+Используется как представлениями API, так и фоновыми обработчиками очереди.
+"""
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Value
+from rest_framework import status
+
+from api.changes import record_status_changes
+from api.utils.metrics import CONFLICTS, DB_CREATE, DB_EXISTS
+from knd.models import Knd, KndArchive
+
+NOT_FOUND = 'Не найдено'
+
+ARCHIVED_MESSAGE = "Проверка завершена и перенесена в архив"
+
+# Подпись поля на странице КНМ -> поле модели Knd
+KNM_FIELDS = {
+    'Номер КНМ': 'number_knd',
+    'Статус КНМ': 'status_knm',
+    'Дата регистрации': 'reg_data',
+    'Дата начала': 'start_data',
+    'Дата окончания': 'end_data',
+    'Адрес': 'adress',
+}
+
+# Поля, которые заполняет пользователь, а не портал
+USER_FIELDS = ('departure_time',)
+
+
+# Функции для преобразования дат
+def parse_datetime(dt_str):
+    if dt_str == 'Не найдено' or not dt_str.strip():
+        return None
+    try:
+        return datetime.strptime(dt_str, '%d.%m.%Y %H:%M')
+    except ValueError:
+        return None
+
+def parse_date(date_str):
+    if date_str == 'Не найдено' or not date_str.strip():
+        return None
+    try:
+        return datetime.strptime(date_str, '%d.%m.%Y').date()
+    except ValueError:
+        return None
+
+
+class KndConflict(Exception):
+    """Проверку нельзя добавить: она завершена или уже существует."""
+
+    status_code = status.HTTP_409_CONFLICT
+
+    def __init__(self, message, archived=False):
+        super().__init__(message)
+        self.message = message
+        self.archived = archived
+        CONFLICTS.inc()
+
+
+# Преобразование строк портала в значения полей модели
+KNM_PARSERS = {
+    'reg_data': parse_datetime,
+    'start_data': parse_date,
+    'end_data': parse_date,
+}
+
+
+def normalize_knm(result_knd):
+    """Значения полей модели Knd из результата парсинга страницы КНМ."""
+    values = {}
+    for label, field in KNM_FIELDS.items():
+        value = result_knd.get(label)
+        parser = KNM_PARSERS.get(field)
+        values[field] = parser(value) if parser and value is not None else value
+    return values
+
+
+def build_knd_data(url, result_knd, inspector):
+    """Собирает поля модели Knd из результата парсинга страницы КНМ."""
+    return {
+        'url_knd': url,
+        'inspector': inspector,
+        **normalize_knm(result_knd),
+    }
+
+
+def diff_knm(knd, result_knd):
+    """Поля, значения которых на портале отличаются от записи.
+
+    Returns:
+        dict: ``{поле: [старое, новое]}``. Пустые и ненайденные значения
+        портала не учитываются, чтобы сбой разбора страницы не стер
+        данные записи.
+    """
+    diff = {}
+    for field, value in normalize_knm(result_knd).items():
+        if value in (None, '', NOT_FOUND):
+            continue
+        old = getattr(knd, field)
+        if old != value:
+            diff[field] = [old, value]
+    return diff
+
+
+def diff_fields(knd, values):
+    """Изменения ``{поле: [старое, новое]}`` для произвольных значений."""
+    return {
+        field: [getattr(knd, field), value]
+        for field, value in values.items()
+        if getattr(knd, field) != value
+    }
+
+
+def apply_diff(knd, diff):
+    """Переносит изменения в экземпляр и возвращает список update_fields."""
+    for field, (_, value) in diff.items():
+        setattr(knd, field, value)
+    return [*diff, 'updated']
+
+
+def save_diff(knd, diff):
+    """Сохраняет только изменившиеся столбцы и пишет смену статуса в ленту.
+
+    Транзакция нужна только вместе с записью в ленту: один UPDATE
+    атомарен и без нее.
+    """
+    if not diff:
+        return
+    if 'status_knm' not in diff:
+        knd.save(update_fields=apply_diff(knd, diff))
+        return
+    old_status = diff['status_knm'][0]
+    with transaction.atomic():
+        knd.save(update_fields=apply_diff(knd, diff))
+        record_status_changes([(knd, old_status, knd.status_knm)])
+
+
+def known_in(**lookup):
+    """Где уже есть проверка: в рабочей таблице и (или) в архиве.
+
+    Обе таблицы проверяются одним запросом UNION по уникальным
+    индексам.
+
+    Returns:
+        set: подмножество ``{'knd', 'archive'}``.
+    """
+    with DB_EXISTS.time():
+        return set(
+            Knd.objects.filter(**lookup).order_by()
+            .annotate(place=Value('knd')).values_list('place', flat=True)
+            .union(KndArchive.objects.filter(**lookup).order_by()
+                   .annotate(place=Value('archive'))
+                   .values_list('place', flat=True))
+        )
+
+
+def ensure_new_url(url):
+    """Проверяет ссылку до парсинга, чтобы известные КНМ не загружались снова."""
+    places = known_in(url_knd=url)
+    if 'knd' in places:
+        raise KndConflict("Запись с такой ссылкой на КНМ уже существует")
+    if places:
+        raise KndConflict(ARCHIVED_MESSAGE, archived=True)
+
+
+def create_knd(url, result_knd, inspector):
+    """Создает запись КНД или выбрасывает KndConflict."""
+    if result_knd.get('Статус КНМ') == 'Завершено':
+        raise KndConflict("Проверка завершена. Введите другой QR Code")
+    knd_data = build_knd_data(url, result_knd, inspector)
+    # Проверка на существование записи
+    places = known_in(number_knd=knd_data['number_knd'])
+    if 'knd' in places:
+        raise KndConflict("Запись с таким номером КНМ уже существует")
+    if places:
+        raise KndConflict(ARCHIVED_MESSAGE, archived=True)
+    # Проверка выше не защищает от гонки, окончательно решает unique-индекс
+    try:
+        with DB_CREATE.time(), transaction.atomic():
+            return Knd.objects.create(**knd_data)
+    except IntegrityError:
+        raise KndConflict("Запись с таким номером КНМ уже существует")
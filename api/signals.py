@@ -0,0 +1,12 @@
+"""Сброс кэша страниц списка КНД при изменении записей."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.conditional import bump_generation
+from knd.models import Knd
+
+
+@receiver(post_save, sender=Knd, dispatch_uid='knd_list_cache_save')
+@receiver(post_delete, sender=Knd, dispatch_uid='knd_list_cache_delete')
+def invalidate_list_cache(sender, **kwargs):
+    bump_generation()
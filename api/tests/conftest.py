@@ -0,0 +1,15 @@
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def user(db):
+    return get_user_model().objects.create_user(username='inspector')
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient(SERVER_NAME='127.0.0.1')
+    client.force_authenticate(user)
+    return client
@@ -0,0 +1,110 @@
+"""Перенос завершенных проверок в архив и поиск дубликатов в нем."""
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.archive import archive_finished
+from api.management.bench import SAMPLE_QR
+from api.services import KndConflict, create_knd, ensure_new_url, known_in
+from api.utils import upload_dedup
+from api.utils.one_qrcod_in_url_decode import decode_qr_code_bytes
+from knd.models import Knd, KndArchive
+
+pytestmark = pytest.mark.django_db
+
+URL = 'https://proverki.gov.ru/portal/public-knm/link-only/1'
+
+
+def finished_knd(number, url=None, days_ago=60):
+    knd = Knd.objects.create(
+        number_knd=number, url_knd=url, status_knm='Завершено')
+    Knd.objects.filter(pk=knd.pk).update(
+        updated=timezone.now() - timedelta(days=days_ago))
+    return knd
+
+
+def test_archive_moves_only_old_finished():
+    old = finished_knd('1', URL)
+    finished_knd('2', days_ago=1)
+    Knd.objects.create(number_knd='3', status_knm='Ожидает проведения')
+    report = archive_finished(retention_days=30, batch_size=1)
+    assert report['archived'] == 1
+    assert not Knd.objects.filter(pk=old.pk).exists()
+    assert KndArchive.objects.get(knd_id=old.pk).url_knd == URL
+    assert Knd.objects.count() == 2
+
+
+def test_known_in_one_query(django_assert_num_queries):
+    finished_knd('1', URL)
+    archive_finished(retention_days=30)
+    Knd.objects.create(number_knd='2')
+    with django_assert_num_queries(1):
+        assert known_in(url_knd=URL) == {'archive'}
+    assert known_in(number_knd='2') == {'knd'}
+    assert known_in(number_knd='3') == set()
+
+
+def test_archived_knd_is_conflict():
+    finished_knd('1', URL)
+    archive_finished(retention_days=30)
+    with pytest.raises(KndConflict) as error:
+        ensure_new_url(URL)
+    assert error.value.archived
+    with pytest.raises(KndConflict) as error:
+        create_knd(URL + '0', {'Номер КНМ': '1', 'Статус КНМ': 'Ожидает'},
+                   None)
+    assert error.value.archived
+
+
+@pytest.fixture
+def archived_upload():
+    """Изображение, запись которого есть в кэше загрузок и в архиве."""
+    data = SAMPLE_QR.read_bytes()
+    url = decode_qr_code_bytes(data)['url']
+    knd = finished_knd('1', url)
+    dedup = upload_dedup.get_upload_dedup()
+    keys, _ = dedup.lookup(data)
+    dedup.remember(keys, url, knd.pk)
+    archive_finished(retention_days=30)
+    yield data
+    upload_dedup._cache = None
+
+
+def upload_file(data):
+    return SimpleUploadedFile(SAMPLE_QR.name, data, content_type='image/png')
+
+
+def test_upload_archived_has_no_stale_id(api_client, archived_upload):
+    response = api_client.post(
+        '/api/v1/knd/upload_qrcod/', {'file': upload_file(archived_upload)},
+        format='multipart')
+    assert response.status_code == 409
+    assert 'knd_id' not in response.data
+
+
+def test_async_upload_archived_has_no_stale_id(user, archived_upload):
+    client = Client(
+        SERVER_NAME='127.0.0.1',
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    response = client.post(
+        '/api/v1/async/knd/upload_qrcod/',
+        {'file': upload_file(archived_upload)})
+    assert response.status_code == 409
+    assert 'knd_id' not in response.json()
+
+
+def test_conflicting_row_is_not_deleted():
+    KndArchive.objects.create(
+        knd_id=0, number_knd='1', created=timezone.now(),
+        updated=timezone.now())
+    knd = finished_knd('1', URL)
+    moved = finished_knd('2')
+    report = archive_finished(retention_days=30)
+    assert report['archived'] == 1
+    assert report['skipped'] == [knd.pk]
+    assert Knd.objects.filter(pk=knd.pk).exists()
+    assert KndArchive.objects.filter(knd_id=moved.pk).exists()
@@ -0,0 +1,58 @@
+"""Асинхронные представления и общий браузер асинхронного парсера."""
+import asyncio
+import threading
+
+import pytest
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.utils import scrape_cache
+from api.utils.parser_erknm_async import _BrowserLoop
+from knd.models import Knd
+
+URL = 'https://proverki.gov.ru/portal/public-knm/link-only/async-1'
+
+
+async def current_thread():
+    return threading.get_ident()
+
+
+async def run_on(browser_loop):
+    return await browser_loop.submit(current_thread())
+
+
+def test_browser_loop_is_shared_between_event_loops():
+    browser_loop = _BrowserLoop()
+    try:
+        # Под WSGI каждый запрос выполняется в новом цикле событий
+        first = asyncio.run(run_on(browser_loop))
+        second = asyncio.run(run_on(browser_loop))
+    finally:
+        browser_loop.shutdown()
+    assert first == second != threading.get_ident()
+
+
+@pytest.fixture
+def knd(db):
+    knd = Knd.objects.create(url_knd=URL, status_knm='Ожидает проведения')
+    scrape_cache.store(URL, {'Статус КНМ': 'Ожидает проведения'})
+    yield knd
+    scrape_cache.invalidate(URL)
+
+
+@pytest.mark.parametrize('header', [None, 'Bearer invalid'])
+def test_refresh_requires_authentication(knd, header):
+    client = Client(SERVER_NAME='127.0.0.1')
+    if header:
+        client.defaults['HTTP_AUTHORIZATION'] = header
+    response = client.post(f'/api/v1/async/knd/{knd.pk}/refresh/')
+    assert response.status_code == 401
+
+
+def test_refresh_with_token(knd, user):
+    client = Client(
+        SERVER_NAME='127.0.0.1',
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    response = client.post(f'/api/v1/async/knd/{knd.pk}/refresh/')
+    assert response.status_code == 200
+    assert response.json()['changes'] == {}
@@ -0,0 +1,152 @@
+"""Пул прогретых браузеров на поддельном Playwright."""
+import threading
+
+import pytest
+
+from api.utils import browser_pool
+from api.utils.browser_pool import BrowserPool, LatencyStats, PoolError
+
+
+class FakePage:
+
+    def close(self):
+        pass
+
+
+class FakeContext:
+
+    def add_init_script(self, script):
+        pass
+
+    def new_page(self):
+        return FakePage()
+
+    def close(self):
+        pass
+
+
+class FakeBrowser:
+    browser_type = type('BrowserType', (), {'name': 'chromium'})
+
+    def __init__(self):
+        self.connected = True
+
+    def new_context(self, **kwargs):
+        return FakeContext()
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+
+    def __init__(self, launched):
+        self.chromium = self
+        self.launched = launched
+
+    def launch(self, **kwargs):
+        browser = FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def launched(monkeypatch):
+    launched = []
+    monkeypatch.setattr(
+        browser_pool, 'sync_playwright', lambda: FakePlaywright(launched))
+    return launched
+
+
+@pytest.fixture
+def make_pool(launched):
+    pools = []
+
+    def make(**config):
+        pool = BrowserPool({'LEASE_TIMEOUT': 1, **config})
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def run_pages(pool, count):
+    for _ in range(count):
+        with pool.lease() as lease:
+            lease.run(lambda page: None)
+
+
+def test_context_and_browser_recycled_by_limits(make_pool, launched):
+    pool = make_pool(BROWSERS=1, MAX_PAGES_PER_CONTEXT=2,
+                     MAX_PAGES_PER_BROWSER=5)
+    run_pages(pool, 6)
+    recycles = pool.stats()['recycles']
+    assert recycles['browser'] == 1
+    assert recycles['context'] == 2
+    assert len(launched) == 2
+
+
+def test_crashed_browser_restarted(make_pool, launched):
+    pool = make_pool(BROWSERS=1)
+    run_pages(pool, 1)
+    launched[0].connected = False
+    run_pages(pool, 1)
+    assert pool.stats()['recycles']['crash'] == 1
+    assert len(launched) == 2
+
+
+def test_leases_run_in_parallel(make_pool):
+    pool = make_pool(BROWSERS=2)
+    barrier = threading.Barrier(2, timeout=5)
+    results = []
+
+    def worker():
+        with pool.lease() as lease:
+            # Обе аренды дойдут до барьера, только если идут одновременно
+            results.append(lease.run(lambda page: barrier.wait()))
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [0, 1]
+
+
+def test_lease_timeout(make_pool):
+    pool = make_pool(BROWSERS=1)
+    with pool.lease():
+        with pytest.raises(PoolError):
+            with pool.lease(timeout=0.01):
+                pass
+
+
+def test_task_error_returns_slot(make_pool):
+    pool = make_pool(BROWSERS=1)
+
+    def fail(page):
+        raise ValueError('page')
+
+    with pytest.raises(ValueError):
+        with pool.lease() as lease:
+            lease.run(fail)
+    assert pool.stats()['idle'] == 1
+
+
+def test_latency_percentile():
+    stats = LatencyStats()
+    for value in range(1, 101):
+        stats.add(value / 1000)
+    assert stats.percentile(50) == pytest.approx(0.05, abs=0.001)
+    assert stats.snapshot()['count'] == 100
@@ -0,0 +1,50 @@
+"""Пакетная загрузка QR-кодов."""
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from api import bulk
+from api.bulk import _create_all, bulk_upload
+from api.utils import metrics
+from knd.models import Knd
+
+pytestmark = pytest.mark.django_db
+
+URL = 'https://proverki.gov.ru/portal/public-knm/link-only/{}'
+
+
+def conflicts_total():
+    return dict(metrics.CONFLICTS.samples())['knd_conflicts_total']
+
+
+def content(number):
+    return {'Номер КНМ': number, 'Статус КНМ': 'Ожидает проведения'}
+
+
+def test_create_all_falls_back_to_single_rows():
+    Knd.objects.create(number_knd='B1', url_knd=URL.format('other'))
+    created, conflicts = _create_all([
+        Knd(number_knd='B0', url_knd=URL.format(0)),
+        Knd(number_knd='B1', url_knd=URL.format(1)),
+        Knd(number_knd='B2', url_knd=URL.format(2)),
+    ])
+    assert [knd.number_knd for knd in created] == ['B0', 'B2']
+    assert [knd.number_knd for knd in conflicts] == ['B1']
+    assert conflicts[0].pk is None
+
+
+def test_conflicting_row_in_batch_is_counted(monkeypatch, user):
+    urls = [URL.format(index) for index in range(3)]
+    monkeypatch.setattr(bulk, 'decode_images', lambda images: [urls])
+
+    def scrape(pending):
+        # Параллельный запрос успел создать запись с тем же номером
+        Knd.objects.create(number_knd='B1', url_knd=URL.format('other'))
+        return {url: content(f'B{index}') for index, url in enumerate(urls)}
+
+    monkeypatch.setattr(bulk, 'scrape_many', scrape)
+    before = conflicts_total()
+    items = bulk_upload(
+        [SimpleUploadedFile('codes.png', b'png')], user)
+    assert [item['status'] for item in items] == [
+        'created', 'exists', 'created']
+    assert conflicts_total() == before + 1
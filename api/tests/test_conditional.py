@@ -0,0 +1,62 @@
+"""Условные GET-запросы карточки и списка проверок."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.checks import check_list_cache
+from knd.models import Knd
+
+
+def test_retrieve_not_modified(api_client, user):
+    knd = Knd.objects.create(inspector=user, number_knd='1')
+    response = api_client.get(f'/api/v1/knd/{knd.pk}/')
+    assert response.status_code == 200
+    response = api_client.get(
+        f'/api/v1/knd/{knd.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+
+
+def test_retrieve_invalid_id_is_404(api_client):
+    assert api_client.get('/api/v1/knd/abc/').status_code == 404
+
+
+def test_retrieve_missing_is_404(api_client):
+    assert api_client.get('/api/v1/knd/999999/').status_code == 404
+
+
+def test_list_not_modified_without_count(api_client, user):
+    Knd.objects.create(inspector=user, number_knd='1')
+    etag = api_client.get('/api/v1/knd/')['ETag']
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get('/api/v1/knd/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert not any('COUNT(' in query['sql'] for query in queries)
+
+
+def test_list_etag_changes_on_delete(api_client, user):
+    Knd.objects.create(inspector=user, number_knd='1')
+    # Удаляется не последняя измененная запись: max(updated) не меняется
+    Knd.objects.create(inspector=user, number_knd='2')
+    etag = api_client.get('/api/v1/knd/')['ETag']
+    Knd.objects.get(number_knd='1').delete()
+    response = api_client.get('/api/v1/knd/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(response.data['results']) == 1
+
+
+def test_list_page_cache_hit(api_client, user, settings):
+    settings.KND_LIST_CACHE = {'ENABLED': True, 'ALIAS': 'default'}
+    Knd.objects.create(inspector=user, number_knd='1')
+    api_client.get('/api/v1/knd/')
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get('/api/v1/knd/')
+    assert response.status_code == 200
+    assert len(response.data['results']) == 1
+    # Только запрос валидаторов, строки берутся из кэша
+    assert len(queries) == 1
+
+
+def test_process_local_list_cache_warns(settings):
+    settings.KND_LIST_CACHE = {'ENABLED': True, 'ALIAS': 'default'}
+    assert [w.id for w in check_list_cache(None)] == ['api.W001']
+    settings.KND_LIST_CACHE = {'ENABLED': False, 'ALIAS': 'default'}
+    assert check_list_cache(None) == []
@@ -0,0 +1,31 @@
+"""Потоковая выгрузка проверок КНД."""
+from datetime import date
+
+import pytest
+
+from api.export import xlsx_available
+from knd.models import Knd
+
+
+def test_export_csv(api_client, user):
+    Knd.objects.create(inspector=user, number_knd='66250926600018705336',
+                       status_knm='Ожидает проведения')
+    response = api_client.get('/api/v1/knd/export/')
+    assert response.status_code == 200
+    assert f'knd-{date.today():%Y%m%d}.csv' in response['Content-Disposition']
+    content = b''.join(response.streaming_content).decode('utf-8')
+    assert content.startswith('\ufeffID;')
+    assert '66250926600018705336' in content
+
+
+@pytest.mark.skipif(not xlsx_available(), reason='openpyxl не установлен')
+def test_export_xlsx(api_client, user):
+    Knd.objects.create(inspector=user, number_knd='1')
+    response = api_client.get('/api/v1/knd/export/?export_format=xlsx')
+    assert response.status_code == 200
+    assert response['Content-Disposition'].endswith('.xlsx"')
+
+
+def test_export_unknown_format(api_client):
+    response = api_client.get('/api/v1/knd/export/?export_format=pdf')
+    assert response.status_code == 400
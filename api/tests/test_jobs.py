@@ -0,0 +1,21 @@
+"""Локальная очередь фоновой обработки QR-кодов."""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.jobs import claim_next_job, enqueue_qr_job
+from knd.models import QrJob
+
+pytestmark = pytest.mark.django_db
+
+
+def test_claim_updates_timestamp(user):
+    job = enqueue_qr_job('qr/1.png', user)
+    queued_at = timezone.now() - timedelta(hours=1)
+    QrJob.objects.filter(pk=job.pk).update(updated=queued_at)
+    claimed = claim_next_job()
+    assert claimed.pk == job.pk
+    assert claimed.status == QrJob.DECODING
+    assert claimed.updated > queued_at
+    assert claim_next_job() is None
@@ -0,0 +1,47 @@
+"""Курсорная пагинация, фильтры и набор полей списка проверок."""
+from urllib.parse import urlsplit
+
+from knd.models import Knd
+
+
+def create_knds(user, count):
+    Knd.objects.bulk_create([
+        Knd(inspector=user, number_knd=f'L{index:03d}',
+            status_knm='Завершено' if index % 3 == 0 else 'Ожидает проведения')
+        for index in range(count)
+    ])
+
+
+def next_path(url):
+    parts = urlsplit(url)
+    return f'{parts.path}?{parts.query}'
+
+
+def test_cursor_walks_all_records_once(api_client, user):
+    create_knds(user, 12)
+    numbers = []
+    path = '/api/v1/knd/?page_size=5'
+    pages = 0
+    while path:
+        response = api_client.get(path)
+        assert response.status_code == 200
+        assert 'count' not in response.data
+        numbers.extend(row['number_knd'] for row in response.data['results'])
+        path = response.data['next'] and next_path(response.data['next'])
+        pages += 1
+    assert pages == 3
+    assert numbers == [f'L{index:03d}' for index in range(12)]
+
+
+def test_sparse_fields(api_client, user):
+    create_knds(user, 2)
+    response = api_client.get('/api/v1/knd/?fields=id,number_knd')
+    assert all(set(row) == {'id', 'number_knd'}
+               for row in response.data['results'])
+
+
+def test_status_filter(api_client, user):
+    create_knds(user, 6)
+    response = api_client.get('/api/v1/knd/?status_knm=Завершено')
+    assert [row['number_knd'] for row in response.data['results']] == [
+        'L000', 'L003']
@@ -0,0 +1,51 @@
+"""Структурированные JSON-логи и прореживание отладочных записей."""
+import json
+import logging
+
+from django.test import Client
+
+from api.utils.logging_config import (
+    DebugSamplingFilter, JsonFormatter, RequestContextFilter, request_id_var
+)
+
+
+def make_record(level=logging.INFO, msg='%s: готово', args=('tick',), **extra):
+    record = logging.LogRecord(
+        'app_logger', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_context_and_extra():
+    record = make_record(knm_number='1', duration_ms=12.5, other='skip')
+    token = request_id_var.set('req-1')
+    try:
+        RequestContextFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+    data = json.loads(JsonFormatter().format(record))
+    assert data['message'] == 'tick: готово'
+    assert data['level'] == 'INFO'
+    assert data['request_id'] == 'req-1'
+    assert data['knm_number'] == '1'
+    assert data['duration_ms'] == 12.5
+    assert 'other' not in data
+
+
+def test_debug_sampling_keeps_share_of_debug():
+    sampler = DebugSamplingFilter(0.25)
+    passed = [sampler.filter(make_record(logging.DEBUG)) for _ in range(8)]
+    assert passed.count(True) == 2
+    assert sampler.filter(make_record(logging.WARNING))
+
+
+def test_debug_sampling_zero_drops_debug_only():
+    sampler = DebugSamplingFilter(0)
+    assert not sampler.filter(make_record(logging.DEBUG))
+    assert sampler.filter(make_record(logging.INFO))
+
+
+def test_request_id_header_is_kept(db):
+    response = Client(SERVER_NAME='127.0.0.1').get(
+        '/metrics', HTTP_X_REQUEST_ID='lb-42')
+    assert response['X-Request-ID'] == 'lb-42'
@@ -0,0 +1,42 @@
+"""Метрики в текстовом формате Prometheus."""
+from django.test import Client
+
+from api.utils import metrics
+from api.utils.metrics import Histogram
+
+
+def sample(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split()[-1])
+    return None
+
+
+def test_metrics_endpoint(db):
+    before = sample(metrics.render(), 'knd_conflicts_total')
+    metrics.CONFLICTS.inc()
+    response = Client(SERVER_NAME='127.0.0.1').get('/metrics')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.content.decode('utf-8')
+    assert '# TYPE knd_qr_decode_seconds histogram' in text
+    assert '# TYPE knd_conflicts counter' in text
+    assert sample(text, 'knd_conflicts_total') == before + 1
+
+
+def test_metrics_disabled(db, settings):
+    settings.KND_METRICS_ENABLED = False
+    response = Client(SERVER_NAME='127.0.0.1').get('/metrics')
+    assert response.status_code == 404
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_seconds', 'Тест.', buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(seconds)
+    samples = dict(histogram.samples())
+    assert samples['test_seconds_bucket{le="0.1"}'] == 1
+    assert samples['test_seconds_bucket{le="1.0"}'] == 3
+    assert samples['test_seconds_bucket{le="+Inf"}'] == 4
+    assert samples['test_seconds_count'] == 4
+    assert samples['test_seconds_sum'] == 6.05
@@ -0,0 +1,29 @@
+"""Телеметрия навигации браузера."""
+from api.utils.navigation import NavigationTelemetry
+
+
+class FakeRequest:
+
+    def __init__(self):
+        self.size_calls = 0
+
+    def sizes(self):
+        self.size_calls += 1
+        return {'responseHeadersSize': 100, 'responseBodySize': 900}
+
+
+def test_sizes_not_requested_by_default():
+    telemetry = NavigationTelemetry()
+    request = FakeRequest()
+    telemetry.on_request_finished(request)
+    data = telemetry.as_dict()
+    assert data['requests'] == 1
+    assert data['bytes'] is None
+    assert request.size_calls == 0
+
+
+def test_bytes_measured_when_enabled():
+    telemetry = NavigationTelemetry(measure_bytes=True)
+    for _ in range(3):
+        telemetry.on_request_finished(FakeRequest())
+    assert telemetry.as_dict()['bytes'] == 3000
@@ -0,0 +1,69 @@
+"""Планировщик уведомлений о сроках проверок."""
+import logging
+from datetime import date, timedelta
+
+import pytest
+
+from api.notifications import run_tick
+from api.notifiers import BaseNotifier
+from api.utils.logging_config import logger
+from knd.models import Knd
+
+pytestmark = pytest.mark.django_db
+
+
+class CollectingNotifier(BaseNotifier):
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, messages):
+        self.messages.extend(messages)
+
+
+def test_tick_uses_today_by_default():
+    Knd.objects.create(number_knd='1', status_knm='Ожидает проведения',
+                       end_data=date.today())
+    Knd.objects.create(number_knd='2', status_knm='Ожидает проведения',
+                       start_data=date.today() + timedelta(days=2))
+    notifier = CollectingNotifier()
+    sent = run_tick(notifier=notifier)
+    assert sent['end_today'] == 1
+    assert sent['start_in_2_days'] == 1
+    assert len(notifier.messages) == 2
+
+
+def test_tick_sends_each_event_once():
+    Knd.objects.create(number_knd='1', status_knm='Ожидает проведения',
+                       end_data=date.today())
+    run_tick(notifier=CollectingNotifier())
+    notifier = CollectingNotifier()
+    assert sum(run_tick(notifier=notifier).values()) == 0
+    assert notifier.messages == []
+
+
+def test_finished_knd_is_skipped():
+    Knd.objects.create(number_knd='1', status_knm='Завершено',
+                       end_data=date.today())
+    assert sum(run_tick(notifier=CollectingNotifier()).values()) == 0
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_tick_log_message_is_formatted():
+    handler = RecordingHandler()
+    logger.addHandler(handler)
+    try:
+        run_tick(notifier=CollectingNotifier())
+    finally:
+        logger.removeHandler(handler)
+    assert any('Отправлено уведомлений' in message
+               for message in handler.messages)
@@ -0,0 +1,21 @@
+"""Проверка результата извлечения полей в браузере."""
+import pytest
+
+from api.utils.parser_erknm_headless import (
+    NOT_FOUND, ParserError, complete_fields, ensure_status
+)
+
+URL = 'https://proverki.gov.ru/portal/public-knm/link-only/1'
+
+
+def test_empty_page_is_error():
+    # Пустой результат не должен считаться успешной загрузкой
+    with pytest.raises(ParserError):
+        ensure_status(complete_fields({}), URL)
+
+
+def test_partial_page_keeps_found_fields():
+    content = ensure_status(
+        complete_fields({'Статус КНМ': 'Завершено'}), URL)
+    assert content['Статус КНМ'] == 'Завершено'
+    assert content['Номер КНМ'] == NOT_FOUND
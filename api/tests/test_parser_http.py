@@ -0,0 +1,99 @@
+"""Быстрый HTTP-парсер на сохраненных ответах портала ЕРКНМ."""
+import json
+import uuid
+
+import pytest
+
+from api.utils.parser_erknm_headless import NOT_FOUND
+from api.utils.parser_erknm_http import (
+    FastPathError, extract_from_html, extract_from_json, fetch_knm_data_http
+)
+from api.utils.stub_portal import FIXTURES_DIR, PAGE_PREFIX, StubPortal
+
+EXPECTED = {
+    'Номер КНМ': '66250926600018705336',
+    'Статус КНМ': 'Ожидает проведения',
+    'Дата регистрации': '12.08.2025 10:41',
+    'Дата начала': '01.09.2025',
+    'Дата окончания': '12.09.2025',
+    'Адрес': ('620014, Свердловская обл., г. Екатеринбург, '
+              'ул. Малышева, д. 31'),
+}
+
+
+def read_fixture(name):
+    return (FIXTURES_DIR / name).read_text(encoding='utf-8')
+
+
+@pytest.fixture
+def portal():
+    with StubPortal() as portal:
+        yield portal
+
+
+@pytest.fixture
+def api_portal(portal, settings):
+    settings.ERKNM_HTTP = {'API_URL_TEMPLATE': portal.api_url_template}
+    return portal
+
+
+@pytest.fixture
+def page_portal(portal, settings):
+    # Источник данных отдает отрисованную HTML-страницу вместо JSON
+    settings.ERKNM_HTTP = {
+        'API_URL_TEMPLATE': portal.base_url + PAGE_PREFIX + '{uuid}'}
+    return portal
+
+
+def test_extract_from_json():
+    data = json.loads(read_fixture('knm_api.json'))
+    assert extract_from_json(data) == EXPECTED
+
+
+def test_extract_from_html():
+    assert extract_from_html(read_fixture('knm_page.html')) == EXPECTED
+
+
+def test_extract_from_partial_html():
+    content = extract_from_html(read_fixture('knm_page_partial.html'))
+    assert content['Номер КНМ'] == EXPECTED['Номер КНМ']
+    assert content['Статус КНМ'] == EXPECTED['Статус КНМ']
+    assert content['Дата регистрации'] == NOT_FOUND
+    assert content['Адрес'] == NOT_FOUND
+
+
+def test_fetch_json(api_portal):
+    content, validators = fetch_knm_data_http(
+        api_portal.page_url(str(uuid.uuid4())))
+    assert content == EXPECTED
+    assert set(validators) == {'etag', 'last_modified'}
+
+
+def test_fetch_html(page_portal):
+    content, _ = fetch_knm_data_http(page_portal.page_url(str(uuid.uuid4())))
+    assert content == EXPECTED
+
+
+def test_fetch_partial_page(page_portal):
+    page_portal.page = (FIXTURES_DIR / 'knm_page_partial.html').read_bytes()
+    content, _ = fetch_knm_data_http(page_portal.page_url(str(uuid.uuid4())))
+    assert content['Статус КНМ'] == EXPECTED['Статус КНМ']
+    assert content['Дата окончания'] == EXPECTED['Дата окончания']
+    assert content['Адрес'] == NOT_FOUND
+
+
+def test_fetch_without_status(page_portal):
+    page_portal.page = b'<html><body><div id="root"></div></body></html>'
+    with pytest.raises(FastPathError):
+        fetch_knm_data_http(page_portal.page_url(str(uuid.uuid4())))
+
+
+def test_fetch_portal_error(api_portal):
+    api_portal.failure_rate = 1.0
+    with pytest.raises(FastPathError):
+        fetch_knm_data_http(api_portal.page_url(str(uuid.uuid4())))
+
+
+def test_fetch_rejects_foreign_url(api_portal):
+    with pytest.raises(FastPathError):
+        fetch_knm_data_http('https://example.com/knm/1')
@@ -0,0 +1,72 @@
+"""Автомат и лимиты защиты портала ЕРКНМ."""
+import pytest
+
+from api.utils.parser_erknm_headless import ContentError, ParserError
+from api.utils.portal_guard import (
+    CLOSED, HALF_OPEN, OPEN, PortalGuard, PortalUnavailable
+)
+
+
+@pytest.fixture
+def guard(tmp_path):
+    return PortalGuard({
+        'STATE_PATH': str(tmp_path / 'guard.sqlite3'),
+        'FAILURE_THRESHOLD': 1,
+        'RECOVERY_TIMEOUT': 0,
+        'RETRIES': 0,
+        'ACQUIRE_TIMEOUT': 0,
+    })
+
+
+def fail():
+    raise ParserError('Портал не отвечает.')
+
+
+def test_breaker_opens_after_failures(guard):
+    with pytest.raises(ParserError):
+        guard.call(fail)
+    assert guard.breaker.snapshot()['state'] == OPEN
+
+
+def test_trial_released_when_rate_limited(guard):
+    with pytest.raises(ParserError):
+        guard.call(fail)
+    with guard.store.transaction() as db:
+        db.execute('UPDATE bucket SET tokens = 0')
+    with pytest.raises(PortalUnavailable):
+        guard.call(lambda: 'ok')
+    assert guard.breaker.snapshot()['state'] == HALF_OPEN
+    # Пробная попытка свободна: следующая загрузка проверяет портал
+    with guard.store.transaction() as db:
+        db.execute('UPDATE bucket SET tokens = 1')
+    assert guard.call(lambda: 'ok') == 'ok'
+    assert guard.breaker.snapshot()['state'] == CLOSED
+
+
+def test_trial_released_on_unrelated_error(guard):
+    with pytest.raises(ParserError):
+        guard.call(fail)
+
+    def crash():
+        raise KeyError('field')
+
+    with pytest.raises(KeyError):
+        guard.call(crash)
+    # Пробная попытка не зависла до TRIAL_TIMEOUT
+    assert guard.call(lambda: 'ok') == 'ok'
+    assert guard.breaker.snapshot()['state'] == CLOSED
+
+
+def test_content_error_is_not_a_portal_failure(guard):
+    calls = []
+
+    def empty_page():
+        calls.append(1)
+        raise ContentError('Статус КНМ не найден.')
+
+    guard.config['RETRIES'] = 2
+    with pytest.raises(ContentError):
+        guard.call(empty_page)
+    assert len(calls) == 1
+    assert guard.breaker.snapshot()['state'] == CLOSED
+    assert guard.stats()['counters'].get('invalid') == 1
@@ -0,0 +1,45 @@
+"""Многоступенчатое распознавание QR-кода."""
+import cv2
+import pytest
+
+from api.management.bench import SAMPLE_QR
+from api.utils import metrics
+from api.utils.logging_config import logger
+from api.utils.one_qrcod_in_url_decode import decode_qr_code_bytes
+from api.utils.qr_pipeline import decode_pipeline
+
+URL_PREFIX = 'https://proverki.gov.ru/portal/public-knm/'
+
+
+def stage_count(stage):
+    return dict(metrics.QR_DECODE_STAGES.samples()).get(
+        f'knd_qr_decode_stage_total{{stage="{stage}"}}', 0)
+
+
+def test_large_image_decoded_on_downscaled_stage():
+    img = cv2.imread(str(SAMPLE_QR))
+    large = cv2.resize(img, None, fx=8, fy=8, interpolation=cv2.INTER_NEAREST)
+    budget = large.shape[0] * large.shape[1] // 16
+    result = decode_pipeline(large, budget=budget)
+    assert result['stage'] == 'downscaled'
+    assert result['url'].startswith(URL_PREFIX)
+
+
+def test_decoded_stage_is_counted(caplog):
+    before = stage_count('downscaled')
+    # app_logger не передает записи корневому логгеру
+    logger.addHandler(caplog.handler)
+    try:
+        with caplog.at_level('DEBUG', logger=logger.name):
+            result = decode_qr_code_bytes(SAMPLE_QR.read_bytes())
+    finally:
+        logger.removeHandler(caplog.handler)
+    assert result['stage'] == 'downscaled'
+    assert stage_count('downscaled') == before + 1
+    assert 'ступени downscaled' in caplog.text
+
+
+def test_undecodable_image_raises():
+    blank = cv2.imencode('.png', cv2.imread(str(SAMPLE_QR)) * 0 + 255)[1]
+    with pytest.raises(ValueError):
+        decode_qr_code_bytes(blank.tobytes())
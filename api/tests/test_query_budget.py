@@ -0,0 +1,81 @@
+"""Бюджеты SQL-запросов на горячие эндпоинты проверок КНД.
+
+Бюджеты общие с командой ``check_query_budget``. Число запросов не
+должно расти с числом записей: список и просмотр проверяются на
+маленькой и большой выборке.
+"""
+import uuid
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from api.management.bench import SAMPLE_QR
+from api.management.commands.check_query_budget import BUDGETS
+from api.utils import scrape_cache, upload_dedup
+from api.utils.one_qrcod_in_url_decode import decode_qr_code_bytes
+from api.utils.stub_portal import knm_content
+from knd.models import Knd
+
+
+def create_knds(user, count):
+    knds = Knd.objects.bulk_create([
+        Knd(
+            inspector=user,
+            url_knd=('https://proverki.gov.ru/portal/public-knm/'
+                     f'link-only/{uuid.uuid4()}'),
+            number_knd=f'QB{uuid.uuid4().int % 10 ** 18:018d}',
+            status_knm='Ожидает проведения',
+        )
+        for _ in range(count)
+    ])
+    return Knd.objects.filter(
+        url_knd__in=[knd.url_knd for knd in knds]).order_by('pk')
+
+
+@pytest.mark.parametrize('count', [5, 50])
+def test_list(api_client, user, count, django_assert_max_num_queries):
+    create_knds(user, count)
+    with django_assert_max_num_queries(BUDGETS['list']):
+        response = api_client.get('/api/v1/knd/')
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('count', [5, 50])
+def test_retrieve(api_client, user, count, django_assert_max_num_queries):
+    knd = create_knds(user, count).first()
+    with django_assert_max_num_queries(BUDGETS['retrieve']):
+        response = api_client.get(f'/api/v1/knd/{knd.pk}/')
+    assert response.status_code == 200
+
+
+def test_refresh(api_client, user, django_assert_max_num_queries):
+    knd = create_knds(user, 1).get()
+    scrape_cache.store(knd.url_knd, knm_content(knd.number_knd))
+    try:
+        with django_assert_max_num_queries(BUDGETS['refresh']):
+            response = api_client.patch(
+                f'/api/v1/knd/{knd.pk}/', {}, format='json')
+    finally:
+        scrape_cache.invalidate(knd.url_knd)
+    assert response.status_code == 200
+
+
+@pytest.fixture
+def qr_upload():
+    data = SAMPLE_QR.read_bytes()
+    url = decode_qr_code_bytes(data)['url']
+    scrape_cache.store(url, knm_content('QB' + '0' * 18))
+    upload_dedup._cache = None
+    yield data
+    scrape_cache.invalidate(url)
+    upload_dedup._cache = None
+
+
+def test_upload(api_client, qr_upload, django_assert_max_num_queries):
+    with django_assert_max_num_queries(BUDGETS['upload']):
+        response = api_client.post(
+            '/api/v1/knd/upload_qrcod/',
+            {'file': SimpleUploadedFile(
+                SAMPLE_QR.name, qr_upload, content_type='image/png')},
+            format='multipart')
+    assert response.status_code == 201, response.data
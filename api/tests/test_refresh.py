@@ -0,0 +1,81 @@
+"""Пакетная сверка незавершенных проверок с порталом."""
+import json
+import uuid
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api import views
+from api.refresh import refresh_in_background, refresh_statuses
+from api.utils import scrape_cache
+from api.utils.stub_portal import knm_content
+from knd.models import Knd, KndStatusChange
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def open_knds():
+    knds = Knd.objects.bulk_create([
+        Knd(url_knd=('https://proverki.gov.ru/portal/public-knm/'
+                     f'link-only/{uuid.uuid4()}'),
+            number_knd=f'RF{index:018d}', status_knm='Ожидает проведения')
+        for index in range(20)
+    ])
+    # Страницы КНМ берутся из кэша парсинга, без сети
+    for index, knd in enumerate(knds):
+        status = 'Завершено' if index % 2 else 'Ожидает проведения'
+        scrape_cache.store(knd.url_knd, knm_content(knd.number_knd, status))
+    yield knds
+    for knd in knds:
+        scrape_cache.invalidate(knd.url_knd)
+
+
+def test_refresh_query_count_is_constant(
+        open_knds, django_assert_max_num_queries):
+    # Выборка, bulk_update и запись в ленту, без запроса на каждую запись
+    with django_assert_max_num_queries(6):
+        report = refresh_statuses(workers=2, host_rate=0)
+    assert report.total == len(open_knds)
+    assert len(report.changes) == len(open_knds)
+    assert not report.failures
+
+
+def test_refresh_writes_changed_fields(open_knds):
+    refresh_statuses(workers=2, host_rate=0)
+    knd = Knd.objects.get(pk=open_knds[1].pk)
+    assert knd.status_knm == 'Завершено'
+    assert knd.adress == 'г. Екатеринбург'
+    assert KndStatusChange.objects.count() == len(open_knds) // 2
+
+
+def test_command_reports_changed_dates(open_knds):
+    out = StringIO()
+    call_command('refresh_knd', '--workers', '2', '--host-rate', '0',
+                 stdout=out)
+    report = json.loads(out.getvalue())
+    assert report['updated'] == len(open_knds)
+    assert report['changes'][0]['start_data'] == [None, '2025-09-01']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_refresh_runs_in_background_for_own_records(
+        open_knds, user, api_client, monkeypatch):
+    own = [knd.pk for knd in open_knds[:2]]
+    Knd.objects.filter(pk__in=own).update(inspector=user)
+    threads = []
+
+    def start(queryset, key):
+        threads.append(refresh_in_background(queryset, key))
+        return threads[-1]
+
+    monkeypatch.setattr(views, 'refresh_in_background', start)
+    response = api_client.post('/api/v1/knd/refresh/', {}, format='json')
+    assert response.status_code == 202
+    assert response.data == {'total': len(own)}
+    threads[0].join(timeout=10)
+    assert Knd.objects.get(pk=open_knds[1].pk).status_knm == 'Завершено'
+    # Чужие записи не сверяются
+    assert Knd.objects.get(pk=open_knds[3].pk).status_knm == (
+        'Ожидает проведения')
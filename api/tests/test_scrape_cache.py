@@ -0,0 +1,51 @@
+"""Кэш результатов парсинга страниц КНМ."""
+import time
+import uuid
+
+import pytest
+
+from api.utils import erknm, scrape_cache
+from api.utils.stub_portal import knm_content
+
+
+@pytest.fixture
+def url():
+    url = f'https://proverki.gov.ru/portal/public-knm/link-only/{uuid.uuid4()}'
+    yield url
+    scrape_cache.invalidate(url)
+
+
+@pytest.fixture
+def portal_calls(monkeypatch):
+    calls = []
+
+    def fetch(url, validators=None):
+        calls.append(validators)
+        # Портал ответил 304: данные не изменились
+        return None, {'etag': '"v2"'}
+
+    monkeypatch.setattr(erknm, 'fetch_knm_data_with_validators', fetch)
+    return calls
+
+
+def test_ttl_depends_on_status(settings, url):
+    settings.ERKNM_CACHE = {'TTL': {'Завершено': 1000}, 'DEFAULT_TTL': 10}
+    finished = scrape_cache.store(url, knm_content('1', 'Завершено'))
+    pending = scrape_cache.store(url, knm_content('1'))
+    now = time.time()
+    assert finished['expires_at'] - now == pytest.approx(1000, abs=5)
+    assert pending['expires_at'] - now == pytest.approx(10, abs=5)
+
+
+def test_fresh_entry_skips_portal(url, portal_calls):
+    scrape_cache.store(url, knm_content('1'))
+    assert erknm.get_knm_data(url) == knm_content('1')
+    assert portal_calls == []
+
+
+def test_stale_entry_is_revalidated(settings, url, portal_calls):
+    settings.ERKNM_CACHE = {'DEFAULT_TTL': 0}
+    scrape_cache.store(url, knm_content('1'), {'etag': '"v1"'})
+    assert erknm.get_knm_data(url) == knm_content('1')
+    assert portal_calls == [{'etag': '"v1"'}]
+    assert scrape_cache.get_entry(url)['validators'] == {'etag': '"v2"'}
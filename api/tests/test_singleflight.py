@@ -0,0 +1,89 @@
+"""Объединение одновременных загрузок одной ссылки."""
+import asyncio
+import threading
+
+from api.utils import erknm
+from api.utils.singleflight import SingleFlight
+
+CALLERS = 5
+
+
+def run_concurrently(flight, fn):
+    results = []
+    errors = []
+
+    def caller():
+        try:
+            results.append(flight.do('key', fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results, errors
+
+
+def wait_for_waiters(flight):
+    # Ведущий вызов держит ключ, пока остальные не встанут в ожидание
+    while flight._calls['key'].waiters < CALLERS - 1:
+        threading.Event().wait(0.001)
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def load():
+        calls.append(1)
+        wait_for_waiters(flight)
+        return 'page'
+
+    results, errors = run_concurrently(flight, load)
+    assert not errors
+    assert len(calls) == 1
+    assert sorted(results) == [('page', False)] + [('page', True)] * (
+        CALLERS - 1)
+    assert flight.in_flight() == 0
+
+
+def test_error_is_shared():
+    flight = SingleFlight()
+
+    def load():
+        wait_for_waiters(flight)
+        raise ValueError('portal')
+
+    results, errors = run_concurrently(flight, load)
+    assert not results
+    assert len(errors) == CALLERS
+    assert all(str(error) == 'portal' for error in errors)
+
+
+def test_async_callers_share_one_load(monkeypatch):
+    calls = []
+
+    async def load(url, force):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return {'Статус КНМ': 'Завершено'}
+
+    monkeypatch.setattr(erknm, '_load_async', load)
+
+    async def main():
+        return await asyncio.gather(*(
+            erknm.get_knm_data_async('https://example.com/1')
+            for _ in range(CALLERS)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(result == {'Статус КНМ': 'Завершено'} for result in results)
+    assert not erknm._async_scrapes
+
+
+def test_sequential_calls_are_not_merged():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == (1, False)
+    assert flight.do('key', lambda: 2) == (2, False)
@@ -0,0 +1,85 @@
+"""Кэш повторных загрузок изображений с QR-кодом."""
+import cv2
+import numpy as np
+import pytest
+
+from api.management.bench import SAMPLE_QR
+from api.utils.upload_dedup import UploadDedupCache
+
+
+@pytest.fixture
+def decode_calls():
+    calls = []
+
+    def decode(data):
+        calls.append(data)
+        return {'url': f'https://example.com/knm/{len(calls)}'}
+
+    decode.calls = calls
+    return decode
+
+
+def recompress(data, quality=80):
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    _, encoded = cv2.imencode(
+        '.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes()
+
+
+def test_repeated_upload_skips_decode(decode_calls):
+    cache = UploadDedupCache()
+    url, keys, knd_id = cache.resolve(b'image', decode_calls)
+    assert knd_id is None
+    cache.remember(keys, url, 7)
+
+    assert cache.resolve(b'image', decode_calls) == (url, keys, 7)
+    assert len(decode_calls.calls) == 1
+    stats = cache.stats()
+    assert (stats['content_hit'], stats['miss']) == (1, 1)
+
+
+def test_least_recently_used_is_evicted(decode_calls):
+    cache = UploadDedupCache({'MAX_ENTRIES': 2})
+    for data in (b'a', b'b'):
+        cache.resolve(data, decode_calls)
+    # Повторное обращение делает b'a' свежей записью
+    cache.resolve(b'a', decode_calls)
+    cache.resolve(b'c', decode_calls)
+    assert cache.stats()['evicted'] == 1
+
+    cache.resolve(b'a', decode_calls)
+    assert len(decode_calls.calls) == 3
+    cache.resolve(b'b', decode_calls)
+    assert decode_calls.calls[-1] == b'b'
+
+
+def test_disabled_cache_always_decodes(decode_calls):
+    cache = UploadDedupCache({'ENABLED': False})
+    cache.resolve(b'image', decode_calls)
+    assert cache.resolve(b'image', decode_calls)[1] is None
+    assert len(decode_calls.calls) == 2
+
+
+def test_recompressed_copy_needs_perceptual_hash(decode_calls):
+    original = SAMPLE_QR.read_bytes()
+    copy = recompress(original)
+    assert copy != original
+
+    cache = UploadDedupCache()
+    cache.resolve(original, decode_calls)
+    cache.resolve(copy, decode_calls)
+    assert len(decode_calls.calls) == 2
+
+    cache = UploadDedupCache({'PERCEPTUAL': True})
+    url, _, _ = cache.resolve(original, decode_calls)
+    assert cache.resolve(copy, decode_calls)[0] == url
+    assert len(decode_calls.calls) == 3
+    assert cache.stats()['perceptual_hit'] == 1
+
+
+def test_forget_knd_keeps_url(decode_calls):
+    cache = UploadDedupCache()
+    url, keys, _ = cache.resolve(b'image', decode_calls)
+    cache.remember(keys, url, 7)
+    cache.forget_knd(7)
+    assert cache.resolve(b'image', decode_calls) == (url, keys, None)
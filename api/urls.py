@@ -1,6 +1,7 @@
 
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import refresh_knd_async, upload_qrcod_async
 from api.views import KndViewSet
 from django.urls import include, path
 
@@ -11,6 +12,16 @@ router_api_v1.register(r'knd/upload_qrcod', KndViewSet, basename='knd-qrcodes-up
 
 v1_patterns = [
     path('', include(router_api_v1.urls)),
+    path(
+        'async/knd/upload_qrcod/',
+        upload_qrcod_async,
+        name='knd-upload-qrcod-async'
+    ),
+    path(
+        'async/knd/<int:pk>/refresh/',
+        refresh_knd_async,
+        name='knd-refresh-async'
+    ),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.jwt')),
 ]
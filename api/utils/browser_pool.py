@@ -0,0 +1,322 @@
+"""Пул прогретых браузеров Chromium для парсера ЕРКНМ.
+
+Sync API Playwright привязан к потоку, в котором был запущен, поэтому
+каждый браузер пула живет в собственном потоке-владельце (слоте).
+Вызывающий код берет слот в аренду (lease), выполняет в нем функцию
+со страницей и возвращает слот в пул. Так парсинг платит только за
+навигацию, а не за запуск Chromium. Слот выполняет задания по одному,
+поэтому число одновременных загрузок равно BROWSERS.
+
+Настройки берутся из ``settings.ERKNM_BROWSER_POOL``:
+
+- BROWSERS: количество прогретых браузеров (слотов);
+- MAX_PAGES_PER_CONTEXT: пересоздание контекста после N страниц;
+- MAX_PAGES_PER_BROWSER: перезапуск браузера после N страниц;
+- LEASE_TIMEOUT: сколько секунд ждать свободный слот.
+"""
+import atexit
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.conf import settings
+from playwright.sync_api import sync_playwright
+
+from .logging_config import logger
+from .metrics import BROWSER_LAUNCH, percentile
+
+BROWSER_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-dev-shm-usage",  # Для стабильности в Docker/CI
+    "--no-sandbox"
+]
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+VIEWPORT = {"width": 1280, "height": 1024}
+
+# Обход защиты
+INIT_SCRIPT = """
+    delete Object.getPrototypeOf(navigator).webdriver;
+    window.navigator.chrome = { runtime: {} };
+"""
+
+DEFAULT_POOL_SETTINGS = {
+    'BROWSERS': 2,
+    'MAX_PAGES_PER_CONTEXT': 50,
+    'MAX_PAGES_PER_BROWSER': 200,
+    'LEASE_TIMEOUT': 60,
+}
+
+# Как часто (в арендах) писать статистику пула в лог
+STATS_LOG_EVERY = 100
+
+
+class PoolError(Exception):
+    """Исключение при ошибке пула браузеров."""
+    pass
+
+
+class LatencyStats:
+    """Скользящее окно замеров времени с расчетом перцентилей."""
+
+    def __init__(self, maxlen=1000):
+        self._values = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, seconds):
+        with self._lock:
+            self._values.append(seconds)
+            self.count += 1
+
+    def percentile(self, p):
+        with self._lock:
+            values = sorted(self._values)
+        return percentile(values, p)
+
+    def snapshot(self):
+        p50, p99 = self.percentile(50), self.percentile(99)
+        return {
+            'count': self.count,
+            'p50_ms': None if p50 is None else round(p50 * 1000, 1),
+            'p99_ms': None if p99 is None else round(p99 * 1000, 1),
+        }
+
+
+class _BrowserSlot(threading.Thread):
+    """Поток-владелец одного браузера и его прогретого контекста."""
+
+    def __init__(self, pool, index):
+        super().__init__(name=f'erknm-browser-{index}', daemon=True)
+        self.pool = pool
+        self.index = index
+        self._tasks = queue.Queue()
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._context_pages = 0
+        self._browser_pages = 0
+
+    # --- Методы, выполняемые в потоке слота ---
+
+    def run(self):
+        with sync_playwright() as p:
+            self._playwright = p
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                fn, future = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self._run_task(fn))
+                except BaseException as e:
+                    future.set_exception(e)
+            self._close_browser()
+
+    def _launch_browser(self):
+        with BROWSER_LAUNCH.time():
+            self._browser = self._playwright.chromium.launch(
+                headless=True,  # Работает в фоне
+                args=BROWSER_ARGS
+            )
+        self._context = self._new_context()
+        self._context_pages = 0
+        self._browser_pages = 0
+        logger.debug('%s: Браузер запущен: %s.',
+                     self.name, self._browser.browser_type.name)
+
+    def _new_context(self):
+        context = self._browser.new_context(
+            user_agent=USER_AGENT,
+            viewport=VIEWPORT
+        )
+        context.add_init_script(INIT_SCRIPT)
+        return context
+
+    def _close_browser(self):
+        if self._context is not None:
+            try:
+                self._context.close()
+            except Exception:
+                pass
+        self._context = None
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+        self._browser = None
+
+    def _ensure_healthy(self):
+        """Проверка здоровья: перезапуск упавшего или отработавшего браузера."""
+        config = self.pool.config
+        if self._browser is not None and not self._browser.is_connected():
+            logger.warning('%s: Браузер упал, перезапускаем.', self.name)
+            self.pool.record_recycle('crash')
+            self._close_browser()
+        elif self._browser_pages >= config['MAX_PAGES_PER_BROWSER']:
+            logger.debug('%s: Лимит страниц браузера, перезапускаем.', self.name)
+            self.pool.record_recycle('browser')
+            self._close_browser()
+        if self._browser is None:
+            self._launch_browser()
+
+    def _take_context(self):
+        if self._context_pages >= self.pool.config['MAX_PAGES_PER_CONTEXT']:
+            try:
+                self._context.close()
+            except Exception:
+                pass
+            self._context = self._new_context()
+            self._context_pages = 0
+            self.pool.record_recycle('context')
+        self._context_pages += 1
+        return self._context
+
+    def _run_task(self, fn):
+        self._ensure_healthy()
+        page = self._take_context().new_page()
+        self._browser_pages += 1
+        try:
+            return fn(page)
+        finally:
+            try:
+                page.close()
+            except Exception:
+                pass
+
+    # --- Методы, вызываемые из других потоков ---
+
+    def submit(self, fn):
+        future = Future()
+        self._tasks.put((fn, future))
+        return future
+
+    def stop(self):
+        self._tasks.put(None)
+
+
+class Lease:
+    """Арендованный слот пула: выполняет функции со страницей браузера."""
+
+    def __init__(self, slot):
+        self._slot = slot
+
+    def run(self, fn):
+        """Выполняет ``fn(page)`` на новой странице арендованного браузера."""
+        return self._slot.submit(fn).result()
+
+
+class BrowserPool:
+    """Пул долгоживущих браузеров с арендой, проверкой здоровья и статистикой."""
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_POOL_SETTINGS, **(config or {})}
+        self._idle = queue.LifoQueue()
+        self._slots = []
+        self._leases = 0
+        self._lock = threading.Lock()
+        self.lease_wait = LatencyStats()
+        self.page_load = LatencyStats()
+        self.time_to_data = LatencyStats()
+        self.bytes_transferred = 0
+        self.blocked_requests = 0
+        self.recycles = {'context': 0, 'browser': 0, 'crash': 0}
+        for index in range(self.config['BROWSERS']):
+            slot = _BrowserSlot(self, index)
+            slot.start()
+            self._slots.append(slot)
+            self._idle.put(slot)
+
+    def warm_up(self):
+        """Заранее запускает браузеры во всех слотах."""
+        futures = [slot.submit(lambda page: None) for slot in self._slots]
+        for future in futures:
+            future.result()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Берет слот в аренду и возвращает его в пул после использования."""
+        timeout = self.config['LEASE_TIMEOUT'] if timeout is None else timeout
+        started = time.monotonic()
+        try:
+            slot = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolError('Нет свободного браузера в пуле.')
+        self.lease_wait.add(time.monotonic() - started)
+        try:
+            yield Lease(slot)
+        finally:
+            self._idle.put(slot)
+            self._log_stats()
+
+    def record_recycle(self, kind):
+        with self._lock:
+            self.recycles[kind] += 1
+
+    def record_page_load(self, seconds):
+        self.page_load.add(seconds)
+
+    def record_navigation(self, telemetry):
+        """Учитывает телеметрию загрузки страницы и пишет ее в лог."""
+        data = telemetry.as_dict()
+        if telemetry.time_to_data is not None:
+            self.time_to_data.add(telemetry.time_to_data)
+        with self._lock:
+            if data['bytes'] is not None:
+                self.bytes_transferred += data['bytes']
+            self.blocked_requests += data['blocked']
+        logger.debug('%s: Навигация: %s', BrowserPool.__name__, data)
+
+    def stats(self):
+        with self._lock:
+            counters = {
+                'bytes_transferred': self.bytes_transferred,
+                'blocked_requests': self.blocked_requests,
+                'recycles': dict(self.recycles),
+            }
+        return {
+            'browsers': len(self._slots),
+            'idle': self._idle.qsize(),
+            'lease_wait': self.lease_wait.snapshot(),
+            'page_load': self.page_load.snapshot(),
+            'time_to_data': self.time_to_data.snapshot(),
+            **counters,
+        }
+
+    def _log_stats(self):
+        with self._lock:
+            self._leases += 1
+            if self._leases % STATS_LOG_EVERY:
+                return
+        logger.info('%s: %s', BrowserPool.__name__, self.stats())
+
+    def close(self):
+        for slot in self._slots:
+            slot.stop()
+        for slot in self._slots:
+            slot.join(timeout=10)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Возвращает общий для процесса пул браузеров, создавая его при первом вызове."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool(getattr(settings, 'ERKNM_BROWSER_POOL', None))
+                atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,159 @@
+"""Единая точка получения данных КНМ с портала proverki.gov.ru.
+
+Сначала проверяется кэш результатов парсинга, затем используется
+быстрый HTTP-парсер, а headless-браузер запускается только если быстрый
+путь не справился. Бэкенд выбирается настройкой
+``ERKNM_PARSER_BACKEND``: ``auto``, ``http`` или ``browser`` (по
+умолчанию, пока адрес источника данных быстрого пути не подтвержден,
+см. ``parser_erknm_http``). Для представлений под ASGI есть ``get_knm_data_async``.
+
+Каждая загрузка с портала проходит через ``PortalGuard``: при сбоях
+портала запросы отклоняются сразу с ``PortalUnavailable``.
+"""
+import asyncio
+from typing import Dict
+
+from django.conf import settings
+
+from . import scrape_cache
+from .logging_config import logger
+from .parser_erknm_async import parse_knm_data_async
+from .parser_erknm_headless import ContentError, ParserError, parse_knm_data
+from .parser_erknm_http import (
+    FastPathContentError, FastPathError, fetch_knm_data_http
+)
+from .portal_guard import get_portal_guard
+from .singleflight import SingleFlight
+
+DEFAULT_PARSER_BACKEND = 'browser'
+
+# Одновременные загрузки одной ссылки выполняются один раз
+_scrapes = SingleFlight()
+_async_scrapes = {}
+
+
+def fetch_knm_data_with_validators(url: str, validators=None):
+    """Загружает данные КНМ, минуя кэш.
+
+    Returns:
+        tuple: ``(данные, validators)``; данные равны None, если портал
+        подтвердил, что страница не изменилась с прошлого ответа.
+    """
+    return get_portal_guard().call(
+        lambda: _fetch(url, validators))
+
+
+def _as_parser_error(error):
+    """Ошибка быстрого пути в режиме ``http``, без перехода на браузер."""
+    if isinstance(error, FastPathContentError):
+        return ContentError(str(error))
+    return ParserError(str(error))
+
+
+def _fetch(url, validators):
+    backend = getattr(
+        settings, 'ERKNM_PARSER_BACKEND', DEFAULT_PARSER_BACKEND)
+    if backend != 'browser':
+        try:
+            return fetch_knm_data_http(url, validators=validators)
+        except FastPathError as e:
+            if backend == 'http':
+                raise _as_parser_error(e)
+            logger.info(
+                '%s: Быстрый путь не сработал, используем браузер: %s',
+                fetch_knm_data.__name__, e, extra={'url': url})
+    return parse_knm_data(url), {}
+
+
+def fetch_knm_data(url: str) -> Dict[str, str]:
+    """Возвращает данные КНМ по ссылке, выбирая самый дешевый бэкенд."""
+    return fetch_knm_data_with_validators(url)[0]
+
+
+def get_knm_data(url: str, force: bool = False) -> Dict[str, str]:
+    """Возвращает данные КНМ из кэша или с портала.
+
+    Свежая запись кэша возвращается сразу. Устаревшая запись с ETag или
+    Last-Modified перепроверяется условным запросом. ``force`` отбрасывает
+    кэш и всегда загружает страницу заново. Одновременные вызовы с одной
+    ссылкой ждут одну общую загрузку.
+    """
+    entry = None if force else scrape_cache.get_entry(url)
+    if scrape_cache.is_fresh(entry):
+        scrape_cache.record('hit')
+        return entry['data']
+    content, shared = _scrapes.do(url, lambda: _load(url, force))
+    if shared:
+        logger.debug(
+            '%s: Результат общей загрузки: %s.', get_knm_data.__name__, url)
+    return content
+
+
+def _load(url, force):
+    """Загружает или перепроверяет страницу и обновляет кэш."""
+    # Запись могла обновить загрузка, завершившаяся перед этим вызовом
+    entry = None if force else scrape_cache.get_entry(url)
+    if scrape_cache.is_fresh(entry):
+        scrape_cache.record('hit')
+        return entry['data']
+
+    validators = entry['validators'] if entry else None
+    content, validators = fetch_knm_data_with_validators(
+        url, validators=validators or None)
+    if content is None:
+        scrape_cache.record('revalidated')
+        return scrape_cache.touch(url, entry, validators)['data']
+
+    scrape_cache.record('miss')
+    scrape_cache.store(url, content, validators)
+    return content
+
+
+async def _load_async(url, force):
+    entry = None if force else scrape_cache.get_entry(url)
+    validators = entry['validators'] if entry else None
+    return await get_portal_guard().call_async(
+        lambda: _fetch_async(url, entry, validators))
+
+
+async def _fetch_async(url, entry, validators):
+    backend = getattr(
+        settings, 'ERKNM_PARSER_BACKEND', DEFAULT_PARSER_BACKEND)
+    content = None
+    if backend != 'browser':
+        try:
+            # requests блокирующий, поэтому быстрый путь выполняется в потоке
+            content, validators = await asyncio.to_thread(
+                fetch_knm_data_http, url, validators=validators or None)
+        except FastPathError as e:
+            if backend == 'http':
+                raise _as_parser_error(e)
+            logger.info(
+                '%s: Быстрый путь не сработал, используем браузер: %s',
+                get_knm_data_async.__name__, e, extra={'url': url})
+            content, validators = await parse_knm_data_async(url), {}
+        else:
+            if content is None:
+                scrape_cache.record('revalidated')
+                return scrape_cache.touch(url, entry, validators)['data']
+    else:
+        content, validators = await parse_knm_data_async(url), {}
+
+    scrape_cache.record('miss')
+    scrape_cache.store(url, content, validators)
+    return content
+
+
+async def get_knm_data_async(url: str, force: bool = False) -> Dict[str, str]:
+    """Асинхронный аналог ``get_knm_data`` для представлений под ASGI."""
+    entry = None if force else scrape_cache.get_entry(url)
+    if scrape_cache.is_fresh(entry):
+        scrape_cache.record('hit')
+        return entry['data']
+    key = (asyncio.get_running_loop(), url)
+    task = _async_scrapes.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_load_async(url, force))
+        _async_scrapes[key] = task
+        task.add_done_callback(lambda _: _async_scrapes.pop(key, None))
+    return await asyncio.shield(task)
@@ -1,15 +1,159 @@
+"""Неблокирующее структурированное логирование приложения.
+
+Логгер ``app_logger`` только кладет записи в очередь (``QueueHandler``),
+форматирование и вывод в stdout выполняет фоновый поток
+``QueueListener``. Записи выводятся в JSON с идентификатором запроса
+(его устанавливает ``api.middleware.request_id_middleware``) и
+дополнительными полями из ``extra``: номером КНМ, ссылкой,
+длительностью. Отладочные записи прореживаются: выводится только доля
+``KND_LOG_DEBUG_SAMPLE`` из них.
+
+Сообщения передаются в стиле ``%``: ``logger.debug('%s: %s', a, b)``,
+тогда строка собирается только для записей, которые будут выведены.
+
+Настройки (``settings`` или переменные окружения):
+
+- KND_LOG_LEVEL: уровень логирования, по умолчанию INFO;
+- KND_LOG_FORMAT: ``json`` или ``text``;
+- KND_LOG_DEBUG_SAMPLE: доля выводимых отладочных записей, 0..1.
+"""
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+DEFAULT_LOG_SETTINGS = {
+    'KND_LOG_LEVEL': 'INFO',
+    'KND_LOG_FORMAT': 'json',
+    'KND_LOG_DEBUG_SAMPLE': 1.0,
+}
+
+# Поля из ``extra``, которые попадают в JSON-запись
+EXTRA_FIELDS = ('knm_number', 'url', 'duration_ms', 'job_id', 'status')
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+
+def _setting(name):
+    try:
+        value = getattr(settings, name, None)
+    except ImproperlyConfigured:
+        value = None
+    if value is None:
+        value = os.getenv(name, DEFAULT_LOG_SETTINGS[name])
+    return value
+
+
+class RequestContextFilter(logging.Filter):
+    """Добавляет в запись идентификатор текущего запроса."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Пропускает только долю ``rate`` отладочных записей."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        if not self.every:
+            return False
+        with self._lock:
+            self._count += 1
+            return (self._count - 1) % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись как одну строку JSON."""
+
+    def format(self, record):
+        data = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            data['request_id'] = record.request_id
+        for name in EXTRA_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                data[name] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class InProcessQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler без форматирования в потоке запроса.
+
+    Очередь не покидает процесс, поэтому запись не нужно готовить к
+    сериализации: сообщение соберет поток-слушатель.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _build_formatter():
+    if _setting('KND_LOG_FORMAT') == 'text':
+        return logging.Formatter(
+            '%(asctime)s [%(levelname)s] %(request_id)s %(message)s',
+            datefmt='%d-%m-%Y %H:%M:%S'
+        )
+    return JsonFormatter()
+
 
 logger = logging.getLogger('app_logger')
-logger.setLevel(logging.DEBUG)
+logger.setLevel(str(_setting('KND_LOG_LEVEL')).upper())
+logger.propagate = False
+
+log_queue = queue.SimpleQueue()
+queue_handler = InProcessQueueHandler(log_queue)
+# Фильтры выполняются в потоке запроса до постановки в очередь:
+# идентификатор запроса берется из contextvars вызывающего потока
+queue_handler.addFilter(RequestContextFilter())
+queue_handler.addFilter(
+    DebugSamplingFilter(float(_setting('KND_LOG_DEBUG_SAMPLE'))))
+logger.addHandler(queue_handler)
 
 stream_handler = logging.StreamHandler(sys.stdout)
-stream_handler.setLevel(logging.DEBUG)
+stream_handler.setFormatter(_build_formatter())
+
+listener = logging.handlers.QueueListener(
+    log_queue, stream_handler, respect_handler_level=True)
+listener.start()
+
+
+def _stop_listener():
+    listener.stop()
+
+
+atexit.register(_stop_listener)
+
+
+def _restart_listener():
+    # Поток слушателя не переживает fork: дочернему процессу нужен свой
+    global listener
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
 
-formatter = logging.Formatter(
-    '%(asctime)s [%(levelname)s] %(message)s', datefmt='%d-%m-%Y %H:%M:%S'
-)
-stream_handler.setFormatter(formatter)
 
-logger.addHandler(stream_handler)
\ No newline at end of file
+os.register_at_fork(after_in_child=_restart_listener)
@@ -0,0 +1,164 @@
+"""Метрики горячих путей в текстовом формате Prometheus.
+
+Гистограммы и счетчики хранятся в памяти процесса и отдаются
+представлением ``/metrics``. Замер стоит один вызов ``perf_counter`` и
+одно обновление под блокировкой; при ``KND_METRICS_ENABLED = False``
+замеры не выполняются. При нескольких рабочих процессах каждый процесс
+отдает свои значения, суммирование выполняет сборщик метрик.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Границы корзин гистограмм, секунды
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def metrics_enabled():
+    return getattr(settings, 'KND_METRICS_ENABLED', True)
+
+
+def percentile(values, p):
+    """Перцентиль p (0–100) отсортированных значений или None для пустых."""
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Counter:
+    """Монотонно растущий счетчик."""
+
+    type_name = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if not metrics_enabled():
+            return
+        with self._lock:
+            self._value += amount
+
+    def samples(self):
+        yield f'{self.name}_total', self._value
+
+
+class LabeledCounter(Counter):
+    """Счетчик с одной меткой, например ступенью распознавания."""
+
+    def __init__(self, name, documentation, label):
+        super().__init__(name, documentation)
+        self.label = label
+        self._values = {}
+
+    def inc(self, value, amount=1):
+        if not metrics_enabled():
+            return
+        with self._lock:
+            self._values[value] = self._values.get(value, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for value, count in sorted(values.items()):
+            yield f'{self.name}_total{{{self.label}="{value}"}}', count
+
+
+class Histogram:
+    """Распределение длительностей по фиксированным корзинам."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+
+    @contextmanager
+    def time(self):
+        """Замеряет длительность блока, в том числе завершенного ошибкой."""
+        if not metrics_enabled():
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self):
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{bound}"}}', cumulative
+        cumulative += counts[-1]
+        yield f'{self.name}_bucket{{le="+Inf"}}', cumulative
+        yield f'{self.name}_sum', round(total, 6)
+        yield f'{self.name}_count', cumulative
+
+
+_registry = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render():
+    """Все метрики процесса в текстовом формате экспозиции."""
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type_name}')
+        lines.extend(f'{name} {value}' for name, value in metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+IMAGE_SAVE = _register(Histogram(
+    'knd_image_save_seconds', 'Сохранение загруженного изображения.'))
+QR_DECODE = _register(Histogram(
+    'knd_qr_decode_seconds', 'Распознавание QR-кода.'))
+BROWSER_LAUNCH = _register(Histogram(
+    'erknm_browser_launch_seconds', 'Запуск браузера Chromium.'))
+PAGE_NAVIGATION = _register(Histogram(
+    'erknm_page_navigation_seconds', 'Загрузка страницы КНМ в браузере.'))
+FIELD_EXTRACTION = _register(Histogram(
+    'erknm_field_extraction_seconds', 'Извлечение полей КНМ со страницы.'))
+DB_EXISTS = _register(Histogram(
+    'knd_db_exists_seconds', 'Проверка существования записи КНД.'))
+DB_CREATE = _register(Histogram(
+    'knd_db_create_seconds', 'Создание записи КНД.'))
+
+DECODE_FAILURES = _register(Counter(
+    'knd_qr_decode_failures', 'QR-код не распознан.'))
+QR_DECODE_STAGES = _register(LabeledCounter(
+    'knd_qr_decode_stage', 'Распознанные QR-коды по успешной ступени.',
+    'stage'))
+PARSER_TIMEOUTS = _register(Counter(
+    'erknm_parser_timeouts', 'Превышено время загрузки страницы КНМ.'))
+CONFLICTS = _register(Counter(
+    'knd_conflicts', 'Отказы 409: проверка завершена или уже существует.'))
+UPLOAD_DEDUP_HITS = _register(Counter(
+    'knd_upload_dedup_hits', 'Повторные загрузки, найденные в кэше.'))
+UPLOAD_DEDUP_MISSES = _register(Counter(
+    'knd_upload_dedup_misses', 'Новые загрузки, распознанные заново.'))
@@ -0,0 +1,153 @@
+"""Облегченный профиль навигации браузера для страниц ЕРКНМ.
+
+Через ``page.route`` прерываются запросы ненужных типов (картинки,
+шрифты, стили, медиа) и запросы к сторонним хостам (аналитика,
+виджеты). Вместо ожидания ``networkidle`` страница ждет появления строк
+КНМ, а каждая стадия навигации ограничена своим таймаутом.
+
+Настройки берутся из ``settings.ERKNM_NAVIGATION``:
+
+- ENABLED: профиль включен (иначе прежнее ожидание networkidle);
+- BLOCK_RESOURCE_TYPES: типы ресурсов, которые не загружаются;
+- ALLOWED_HOSTS: хосты, кроме хоста самой страницы, с которых можно
+  загружать ресурсы (поддомены разрешены);
+- GOTO_TIMEOUT: таймаут загрузки документа, мс;
+- DATA_TIMEOUT: таймаут появления строк КНМ, мс;
+- MEASURE_BYTES: считать байты ответов. Размеры запрашиваются у браузера
+  отдельным вызовом на каждый ответ, поэтому по умолчанию выключено и
+  включается в замерах (``bench_navigation``). В async API размеры не
+  считаются, учитывается только число запросов.
+"""
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+DEFAULT_NAVIGATION_SETTINGS = {
+    'ENABLED': True,
+    'BLOCK_RESOURCE_TYPES': [
+        'image', 'media', 'font', 'stylesheet', 'texttrack', 'manifest',
+        'eventsource', 'websocket',
+    ],
+    'ALLOWED_HOSTS': ['proverki.gov.ru'],
+    'GOTO_TIMEOUT': 15000,
+    'DATA_TIMEOUT': 10000,
+    'MEASURE_BYTES': False,
+}
+
+# Прежнее поведение при выключенном профиле
+LEGACY_WAIT_UNTIL = 'networkidle'
+LEGACY_GOTO_TIMEOUT = 30000
+LEGACY_DATA_TIMEOUT = 3000
+
+
+def navigation_settings():
+    return {**DEFAULT_NAVIGATION_SETTINGS,
+            **getattr(settings, 'ERKNM_NAVIGATION', {})}
+
+
+def _host_allowed(host, allowed_hosts):
+    return any(host == allowed or host.endswith('.' + allowed)
+               for allowed in allowed_hosts)
+
+
+class NavigationTelemetry:
+    """Телеметрия одной загрузки: запросы, байты и время до данных."""
+
+    def __init__(self, measure_bytes=None):
+        self.started = time.monotonic()
+        self.time_to_data = None
+        self.blocked = 0
+        self.requests = 0
+        self.finished = []
+        if measure_bytes is None:
+            measure_bytes = navigation_settings()['MEASURE_BYTES']
+        self.measure_bytes = measure_bytes
+
+    def on_request_finished(self, request):
+        self.requests += 1
+        if self.measure_bytes:
+            self.finished.append(request)
+
+    def mark_data(self):
+        self.time_to_data = time.monotonic() - self.started
+
+    def bytes_transferred(self):
+        """Сумма заголовков и тел ответов или None, если байты не считаются."""
+        if not self.measure_bytes:
+            return None
+        total = 0
+        for request in self.finished:
+            try:
+                sizes = request.sizes()
+            except Exception:
+                continue
+            total += sizes['responseHeadersSize'] + sizes['responseBodySize']
+        return total
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'blocked': self.blocked,
+            'bytes': self.bytes_transferred(),
+            'time_to_data_ms': None if self.time_to_data is None else round(
+                self.time_to_data * 1000, 1),
+        }
+
+
+class NavigationProfile:
+    """Правила блокировки и таймауты стадий для загрузки одной страницы."""
+
+    def __init__(self, url, config=None):
+        config = config or navigation_settings()
+        self.enabled = config['ENABLED']
+        self.blocked_types = set(config['BLOCK_RESOURCE_TYPES'])
+        self.allowed_hosts = [
+            *config['ALLOWED_HOSTS'], urlsplit(url).hostname or '']
+        if self.enabled:
+            self.wait_until = 'domcontentloaded'
+            self.goto_timeout = config['GOTO_TIMEOUT']
+            self.data_timeout = config['DATA_TIMEOUT']
+        else:
+            self.wait_until = LEGACY_WAIT_UNTIL
+            self.goto_timeout = LEGACY_GOTO_TIMEOUT
+            self.data_timeout = LEGACY_DATA_TIMEOUT
+
+    def should_block(self, request):
+        if request.resource_type in self.blocked_types:
+            return True
+        host = urlsplit(request.url).hostname or ''
+        return not _host_allowed(host, self.allowed_hosts)
+
+    def install(self, page, telemetry):
+        """Подключает профиль к вкладке sync API."""
+        page.on('requestfinished', telemetry.on_request_finished)
+        if not self.enabled:
+            return
+
+        def handle(route):
+            if self.should_block(route.request):
+                telemetry.blocked += 1
+                route.abort()
+            else:
+                route.fallback()
+        page.route('**/*', handle)
+
+    async def install_async(self, page, telemetry):
+        """Подключает профиль к вкладке async API.
+
+        ``request.sizes()`` в async API — корутина, поэтому байты здесь не
+        считаются, только число запросов.
+        """
+        telemetry.measure_bytes = False
+        page.on('requestfinished', telemetry.on_request_finished)
+        if not self.enabled:
+            return
+
+        async def handle(route):
+            if self.should_block(route.request):
+                telemetry.blocked += 1
+                await route.abort()
+            else:
+                await route.fallback()
+        await page.route('**/*', handle)
@@ -3,11 +3,16 @@
 Для работы необходимо установить следующие зависимости:
 
 - opencv-python==4.12.0.88
+- numpy==2.0.2
 - pyzbar==0.1.9
 """
 import cv2
+import numpy as np
 import os
-from pyzbar.pyzbar import decode
+
+from .logging_config import logger
+from .metrics import DECODE_FAILURES, QR_DECODE, QR_DECODE_STAGES
+from .qr_pipeline import decode_all, decode_pipeline
 
 
 class DeletionError(Exception):
@@ -15,6 +20,74 @@ class DeletionError(Exception):
     pass
 
 
+def _decode_image(img):
+    """Распознает QR-код на уже загруженном изображении OpenCV.
+
+    Возвращает словарь с ключами 'url', 'stage' (успешная ступень
+    распознавания) и 'elapsed_ms'.
+    """
+    with QR_DECODE.time():
+        try:
+            result = decode_pipeline(img)
+        except ValueError:
+            DECODE_FAILURES.inc()
+            raise
+    QR_DECODE_STAGES.inc(result['stage'])
+    logger.debug(
+        '%s: QR-код распознан на ступени %s за %.2f мс.',
+        _decode_image.__name__, result['stage'], result['elapsed_ms'],
+        extra={'duration_ms': result['elapsed_ms']})
+    return result
+
+
+def _imdecode(data):
+    if hasattr(data, 'read'):
+        if hasattr(data, 'seek'):
+            data.seek(0)
+        data = data.read()
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Файл изображения поврежден или не поддерживается")
+    return img
+
+
+def decode_all_qr_codes_bytes(data):
+    """
+    Распознает все QR-коды на изображении, переданном байтами.
+
+    Функция не зависит от состояния процесса и может выполняться
+    в пуле процессов.
+
+    Args:
+        data (bytes): Содержимое файла изображения.
+
+    Returns:
+        list: Распознанные ссылки без повторов.
+
+    Raises:
+        ValueError: Если изображение повреждено или QR-коды не распознаны.
+    """
+    return decode_all(_imdecode(data))
+
+
+def decode_qr_code_bytes(data):
+    """
+    Распознает QR-код на изображении, переданном байтами, без записи на диск.
+
+    Args:
+        data (bytes | memoryview | file-like): Содержимое файла изображения
+            или объект с методом read(), например загруженный файл Django.
+
+    Returns:
+        dict: Словарь с ключом 'url' и распознанным значением.
+
+    Raises:
+        ValueError: Если изображение повреждено, QR-код не распознан
+            или данные пусты.
+    """
+    return _decode_image(_imdecode(data))
+
+
 def decode_qr_code(image_path):
     """
     Распознает QR-код на изображении и возвращает данные в виде словаря.
@@ -38,17 +111,7 @@ def decode_qr_code(image_path):
             raise FileNotFoundError(
                 f"Файл не найден или поврежден: {image_path}")
 
-        # Декодирование QR-кода
-        decoded = decode(img)
-        if not decoded:
-            raise ValueError("QR-код не распознан на изображении")
-
-        # Извлечение данных
-        qr_data = decoded[0].data.decode('utf-8')
-        if not qr_data:
-            raise ValueError("Распознанные данные пусты")
-
-        return {'url': qr_data}
+        return _decode_image(img)
 
     except Exception:
         raise
@@ -57,9 +120,10 @@ def decode_qr_code(image_path):
         try:
             if os.path.exists(image_path):
                 os.remove(image_path)
-                print(f"Файл удален: {image_path}")
+                logger.debug('Файл удален: %s', image_path)
         except Exception as err:
-            print(f"Ошибка при удалении файла {image_path}: {err}")
+            logger.warning(
+                'Ошибка при удалении файла %s: %s', image_path, err)
 
 
 # Пример использования
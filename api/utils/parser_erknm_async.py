@@ -0,0 +1,164 @@
+"""Асинхронный парсер страниц КНМ на ``playwright.async_api``.
+
+Предназначен для работы под ASGI: один прогретый браузер на процесс
+обслуживает много одновременных загрузок, каждая в своей вкладке.
+Браузер живет в собственном цикле событий в фоновом потоке, а вызовы
+из любого цикла передаются туда. Иначе под WSGI, где каждый запрос к
+асинхронному представлению получает новый цикл, на каждый запрос
+оставался бы незакрытый Chromium.
+"""
+import asyncio
+import atexit
+import threading
+from typing import Dict
+
+from django.conf import settings
+from playwright.async_api import TimeoutError, async_playwright
+
+from .browser_pool import (
+    BROWSER_ARGS, DEFAULT_POOL_SETTINGS, INIT_SCRIPT, USER_AGENT, VIEWPORT
+)
+from .logging_config import logger
+from .metrics import (
+    BROWSER_LAUNCH, FIELD_EXTRACTION, PAGE_NAVIGATION, PARSER_TIMEOUTS
+)
+from .navigation import NavigationProfile, NavigationTelemetry
+from .parser_erknm_headless import (
+    EXTRACT_ROWS_JS, FIELD_LABELS, ROW_SELECTOR, ParserError, complete_fields,
+    ensure_status
+)
+
+
+class _AsyncBrowser:
+    """Прогретый браузер с перезапуском по лимиту страниц."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pages = 0
+
+    async def new_page(self):
+        async with self._lock:
+            config = {**DEFAULT_POOL_SETTINGS,
+                      **getattr(settings, 'ERKNM_BROWSER_POOL', {})}
+            if self._browser is not None and (
+                    not self._browser.is_connected()
+                    or self._pages >= config['MAX_PAGES_PER_BROWSER']):
+                await self.close()
+            if self._browser is None:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                with BROWSER_LAUNCH.time():
+                    self._browser = await self._playwright.chromium.launch(
+                        headless=True, args=BROWSER_ARGS)
+                self._context = await self._browser.new_context(
+                    user_agent=USER_AGENT, viewport=VIEWPORT)
+                await self._context.add_init_script(INIT_SCRIPT)
+                self._pages = 0
+            self._pages += 1
+            return await self._context.new_page()
+
+    async def close(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        self._browser = None
+        self._context = None
+
+    async def stop(self):
+        await self.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+class _BrowserLoop:
+    """Фоновый поток с циклом событий, в котором живет общий браузер."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self.browser = _AsyncBrowser()
+
+    def submit(self, coro):
+        """Запускает корутину в цикле браузера, возвращает awaitable."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name='erknm-browser',
+                    daemon=True).start()
+        return asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    def shutdown(self, timeout=5):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self.browser.stop(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+
+
+_browser_loop = _BrowserLoop()
+atexit.register(_browser_loop.shutdown)
+
+
+async def parse_knm_data_async(url: str) -> Dict[str, str]:
+    """Асинхронно парсит страницу КНМ в отдельной вкладке общего браузера."""
+    return await _browser_loop.submit(_parse(url))
+
+
+async def _parse(url):
+    page = await _browser_loop.browser.new_page()
+    profile = NavigationProfile(url)
+    telemetry = NavigationTelemetry()
+    try:
+        await profile.install_async(page, telemetry)
+        logger.debug(
+            '%s: Загружаем страницу: %s.', parse_knm_data_async.__name__, url)
+        with PAGE_NAVIGATION.time():
+            await page.goto(url, wait_until=profile.wait_until,
+                            timeout=profile.goto_timeout)
+            await page.wait_for_selector(
+                ROW_SELECTOR, timeout=profile.data_timeout)
+        # Все поля извлекаются за один проход по странице
+        with FIELD_EXTRACTION.time():
+            content_value = complete_fields(
+                await page.evaluate(EXTRACT_ROWS_JS, FIELD_LABELS))
+        ensure_status(content_value, url)
+        telemetry.mark_data()
+        logger.debug(
+            '%s: Данные получены за %.2f с, заблокировано запросов: %d.',
+            parse_knm_data_async.__name__, telemetry.time_to_data,
+            telemetry.blocked,
+            extra={'url': url, 'knm_number': content_value.get('Номер КНМ'),
+                   'duration_ms': round(telemetry.time_to_data * 1000, 1)}
+        )
+        return content_value
+
+    except TimeoutError:
+        PARSER_TIMEOUTS.inc()
+        logger.warning(
+            '%s: Превышено время ожидания загрузки страниц.',
+            parse_knm_data_async.__name__, extra={'url': url})
+        raise ParserError('Превышено время ожидания загрузки страниц.')
+    except ParserError as e:
+        logger.warning('%s: %s', parse_knm_data_async.__name__, e,
+                       extra={'url': url})
+        raise
+    except Exception as e:
+        logger.warning(
+            '%s: Критическая ошибка: %s.', parse_knm_data_async.__name__, e,
+            extra={'url': url})
+        raise ParserError(f'Критическая ошибка: {str(e)}.')
+    finally:
+        await page.close()
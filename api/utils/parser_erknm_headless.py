@@ -1,124 +1,191 @@
-from playwright.sync_api import sync_playwright, TimeoutError
+from playwright.sync_api import TimeoutError
 from typing import Dict
-import logging
-import sys
+import time
+from .browser_pool import PoolError, get_browser_pool
 from .logging_config import logger
+from .metrics import FIELD_EXTRACTION, PAGE_NAVIGATION, PARSER_TIMEOUTS
+from .navigation import NavigationProfile, NavigationTelemetry
 
 
 class ParserError(Exception):
     """Пользовательское исключение для ошибок парсера"""
     pass
 
+
+class ContentError(ParserError):
+    """Портал ответил, но на странице нет данных КНМ.
+
+    Это не сбой портала: такая ошибка не размыкает автомат защиты
+    портала и не повторяется.
+    """
+    pass
+
+
+# Начало подписи строки на странице КНМ для каждого извлекаемого поля
+FIELD_LABELS = {
+    'Номер КНМ': 'Учетный номер КНМ в соответствии',
+    'Статус КНМ': 'Статус КНМ',
+    'Дата регистрации': 'Дата регистрации в ФГИС ЕРКНМ',
+    'Дата начала': 'Дата начала КНМ',
+    'Дата окончания': 'Дата окончания КНМ',
+    'Адрес': 'Адрес',
+}
+
+NOT_FOUND = 'Не найдено'
+
+# Строки страницы ищутся по началу имени CSS-модуля, без хеша сборки
+ROW_SELECTOR = '[class*="_Row_"]'
+
+# Один проход по строкам страницы в браузере: подпись -> значение
+EXTRACT_ROWS_JS = """
+(labels) => {
+    const clean = (node) => (node ? node.textContent : '')
+        .replace(/\\s+/g, ' ').trim();
+    const result = {};
+    for (const row of document.querySelectorAll('[class*="_Row_"]')) {
+        const label = clean(row.querySelector('[class*="_ColText_"]'));
+        const valueNode = row.querySelector('[class*="_ColValue_"]');
+        if (!label || !valueNode) continue;
+        for (const [field, prefix] of Object.entries(labels)) {
+            if (!(field in result) && label.startsWith(prefix)) {
+                result[field] = clean(valueNode);
+            }
+        }
+    }
+    return result;
+}
+"""
+
+def complete_fields(found) -> Dict[str, str]:
+    """Дополняет результат извлечения отсутствующими полями."""
+    return {field: found.get(field) or NOT_FOUND for field in FIELD_LABELS}
+
+
+def ensure_status(content_value, url) -> Dict[str, str]:
+    """Без статуса КНМ страница считается не загруженной."""
+    if content_value['Статус КНМ'] == NOT_FOUND:
+        raise ContentError(f'Статус КНМ не найден на странице {url}.')
+    return content_value
+
+
+def extract_fields(page) -> Dict[str, str]:
+    """Извлекает все поля КНМ одним вызовом page.evaluate."""
+    return complete_fields(page.evaluate(EXTRACT_ROWS_JS, FIELD_LABELS))
+
+
 # Функция для безопасного извлечения текста
+# Прежний способ: отдельный запрос и ожидание до 3 с на каждое поле.
+# Используется только для сравнения в bench_extraction.
 
 
 def safe_extract(page, selector) -> str:
     try:
         content = page.locator(selector).first.text_content(
             timeout=3000).strip()
-        logger.debug(f'{safe_extract.__name__}: Данные КНМ распознаны.')
+        logger.debug('%s: Данные КНМ распознаны.', safe_extract.__name__)
         return content
 
     except Exception:
-        logger.debug(f'{safe_extract.__name__}: Отсутствуют данные КНМ.')
-        return 'Не найдено'
-
-
-def parse_knm_data(url: str) -> Dict[str, str]:
-    with sync_playwright() as p:
-        verifiable_data = {
-            'Номер КНМ': (
-                'div._Row_1bklp_108:has('
-                'div._ColText_1bklp_124:has-text("Учетный номер КНМ в соответствии")) '
-                'div._ColValue_1bklp_130'
-            ),
-            'Статус КНМ': (
-                'div._Row_1bklp_108:has('
-                'div._ColText_1bklp_124:has-text("Статус КНМ")) '
-                'div._ColValue_1bklp_130'
-            ),
-            'Дата регистрации': (
-                'div._Row_1bklp_108:has('
-                'div._ColText_1bklp_124:has-text('
-                '"Дата регистрации в ФГИС ЕРКНМ")) '
-                'div._ColValue_1bklp_130'
-            ),
-            'Дата начала': (
-                'div._Row_1bklp_108:has('
-                'div._ColText_1bklp_124:has-text("Дата начала КНМ")) '
-                'div._ColValue_1bklp_130'),
-            'Дата окончания': (
-                'div._Row_1bklp_108:has('
-                'div._ColText_1bklp_124:has-text("Дата окончания КНМ")) '
-                'div._ColValue_1bklp_130'),
-            'Адрес': (
-                'div._Row_1bklp_108:has('
-                'div._ColText_1bklp_124:has-text("Адрес")) '
-                'div._ColValue_1bklp_130')
-        }
-
-        # Настройка headless-браузера
-        browser = p.chromium.launch(
-            headless=True,  # Работает в фоне
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--disable-dev-shm-usage",  # Для стабильности в Docker/CI
-                "--no-sandbox"
-            ]
+        logger.debug('%s: Отсутствуют данные КНМ.', safe_extract.__name__)
+        return NOT_FOUND
+
+
+VERIFIABLE_DATA = {
+    'Номер КНМ': (
+        'div._Row_1bklp_108:has('
+        'div._ColText_1bklp_124:has-text("Учетный номер КНМ в соответствии")) '
+        'div._ColValue_1bklp_130'
+    ),
+    'Статус КНМ': (
+        'div._Row_1bklp_108:has('
+        'div._ColText_1bklp_124:has-text("Статус КНМ")) '
+        'div._ColValue_1bklp_130'
+    ),
+    'Дата регистрации': (
+        'div._Row_1bklp_108:has('
+        'div._ColText_1bklp_124:has-text('
+        '"Дата регистрации в ФГИС ЕРКНМ")) '
+        'div._ColValue_1bklp_130'
+    ),
+    'Дата начала': (
+        'div._Row_1bklp_108:has('
+        'div._ColText_1bklp_124:has-text("Дата начала КНМ")) '
+        'div._ColValue_1bklp_130'),
+    'Дата окончания': (
+        'div._Row_1bklp_108:has('
+        'div._ColText_1bklp_124:has-text("Дата окончания КНМ")) '
+        'div._ColValue_1bklp_130'),
+    'Адрес': (
+        'div._Row_1bklp_108:has('
+        'div._ColText_1bklp_124:has-text("Адрес")) '
+        'div._ColValue_1bklp_130')
+}
+
+
+def scrape_page(page, url: str, telemetry=None,
+                profile=None) -> Dict[str, str]:
+    """Загружает страницу КНМ в готовой вкладке и извлекает данные.
+
+    Навигация выполняется по профилю ``profile`` (по умолчанию из
+    настроек ERKNM_NAVIGATION); телеметрия загрузки сохраняется в
+    ``telemetry`` и в статистике пула.
+    """
+    pool = get_browser_pool()
+    profile = profile or NavigationProfile(url)
+    telemetry = telemetry or NavigationTelemetry()
+    profile.install(page, telemetry)
+    try:
+        logger.debug('%s: Загружаем страницу: %s.', parse_knm_data.__name__, url)
+        # Загрузка страницы с улучшенным ожиданием
+        with PAGE_NAVIGATION.time():
+            started = time.monotonic()
+            page.goto(url, wait_until=profile.wait_until,
+                      timeout=profile.goto_timeout)
+            pool.record_page_load(time.monotonic() - started)
+            logger.debug(
+                '%s: Cтраница загружена, определяем ключевые элементы.',
+                parse_knm_data.__name__)
+            # Строки КНМ — признак готовности данных; без них страница
+            # не загрузилась, и пустой результат не должен попасть в кэш
+            page.wait_for_selector(ROW_SELECTOR, timeout=profile.data_timeout)
+        with FIELD_EXTRACTION.time():
+            content_value = extract_fields(page)
+        ensure_status(content_value, url)
+        telemetry.mark_data()
+        pool.record_navigation(telemetry)
+        logger.debug(
+            '%s: Определены ключевые элементы: %s.',
+            parse_knm_data.__name__, ', '.join(content_value),
+            extra={'url': url, 'knm_number': content_value.get('Номер КНМ'),
+                   'duration_ms': round(telemetry.time_to_data * 1000, 1)}
         )
+        return content_value
+
+    except TimeoutError:
+        PARSER_TIMEOUTS.inc()
+        logger.warning(
+            '%s: Превышено время ожидания загрузки страниц.',
+            parse_knm_data.__name__, extra={'url': url})
+        raise ParserError('Превышено время ожидания загрузки страниц.')
+    except ParserError as e:
+        logger.warning('%s: %s', parse_knm_data.__name__, e,
+                       extra={'url': url})
+        raise
+    except Exception as e:
+        logger.warning(
+            '%s: Критическая ошибка: %s.', parse_knm_data.__name__, e,
+            extra={'url': url})
+        raise ParserError(f'Критическая ошибка: {str(e)}.')
 
-        context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            ),
-            viewport={"width": 1280, "height": 1024}
-        )
-        page = context.new_page()
 
-        # Обход защиты
-        page.add_init_script("""
-            delete Object.getPrototypeOf(navigator).webdriver;
-            window.navigator.chrome = { runtime: {} };
-        """)
-        logger.debug(
-            f'{parse_knm_data.__name__}: Браузер настроен: {browser.browser_type.name}.')
-        try:
-            logger.debug(
-                f'{parse_knm_data.__name__}: Загружаем страницу: {url}.')
-            # Загрузка страницы с улучшенным ожиданием
-            page.goto(url, wait_until="networkidle", timeout=30000)
-            logger.debug(
-                f'{parse_knm_data.__name__}: '
-                'Cтраница загружена, определяем ключевые элементы.'
-            )
-            # Явное ожидание ключевых элементов
-            page.locator('div._Row_1bklp_108')
-            content_value = {stat: safe_extract(
-                page, val) for stat, val in verifiable_data.items()}
-            logger.debug(
-                f'{parse_knm_data.__name__}: '
-                f'Определены ключевые элементы: {", ".join(content_value)}.'
-            )
-            return content_value
-
-        except TimeoutError:
-            logger.warning(
-                f'{parse_knm_data.__name__}: '
-                'Превышено время ожидания загрузки страниц.'
-            )
-            raise ParserError('Превышено время ожидания загрузки страниц.')
-        except Exception as e:
-            logger.warning(
-                f'{parse_knm_data.__name__}: '
-                f'Критическая ошибка: {str(e)}.'
-            )
-            raise ParserError(f'Критическая ошибка: {str(e)}.')
-        finally:
-            if 'context' in locals():
-                context.close()
-            if 'browser' in locals():
-                browser.close()
+def parse_knm_data(url: str) -> Dict[str, str]:
+    """Парсит страницу КНМ в браузере, арендованном из общего пула."""
+    try:
+        with get_browser_pool().lease() as lease:
+            return lease.run(lambda page: scrape_page(page, url))
+    except PoolError as e:
+        logger.warning('%s: %s', parse_knm_data.__name__, e)
+        raise ParserError(str(e))
 
 
 # Пример вызова
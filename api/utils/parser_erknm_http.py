@@ -0,0 +1,243 @@
+"""Быстрый HTTP-парсер страниц КНМ без headless-браузера.
+
+Ссылка вида ``https://proverki.gov.ru/portal/public-knm/link-only/<uuid>``
+преобразуется в адрес источника данных портала (``API_URL_TEMPLATE``),
+который запрашивается через общую сессию ``requests`` с keep-alive.
+Ответ может быть JSON или заранее отрисованным HTML; в обоих случаях
+возвращается тот же словарь, что и у ``parse_knm_data``.
+
+Адрес ``API_URL_TEMPLATE`` по умолчанию — предположение о том, откуда
+страница портала берет данные, и на живом портале он не подтвержден.
+Поэтому быстрый путь выключен (``ERKNM_PARSER_BACKEND = 'browser'``) и
+включается значением ``auto`` только после проверки адреса или для
+заглушки портала в тестах и нагрузочных замерах.
+
+Настройки берутся из ``settings.ERKNM_HTTP``.
+"""
+import re
+import threading
+from html.parser import HTMLParser
+from typing import Dict
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .browser_pool import USER_AGENT
+from .logging_config import logger
+from .parser_erknm_headless import FIELD_LABELS, NOT_FOUND
+
+DEFAULT_HTTP_SETTINGS = {
+    'API_URL_TEMPLATE': (
+        'https://proverki.gov.ru/portal/api/public-knm/link-only/{uuid}'
+    ),
+    'TIMEOUT': 10,
+    'POOL_SIZE': 10,
+}
+
+LINK_ONLY_RE = re.compile(
+    r'/link-only/(?P<uuid>[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-'
+    r'[0-9a-fA-F]{4}-[0-9a-fA-F]{12})'
+)
+
+# Ключи JSON, в которых портал хранит подпись и значение строки
+JSON_LABEL_KEYS = ('label', 'title', 'name', 'caption')
+JSON_VALUE_KEYS = ('value', 'text', 'content')
+
+# Теги без закрывающей пары не меняют глубину вложенности
+VOID_TAGS = {'br', 'hr', 'img', 'input', 'meta', 'link', 'wbr'}
+
+
+class FastPathError(Exception):
+    """Быстрый путь не смог получить данные КНМ."""
+    pass
+
+
+class FastPathContentError(FastPathError):
+    """Ответ получен, но данных КНМ в нем нет."""
+    pass
+
+
+def http_settings():
+    return {**DEFAULT_HTTP_SETTINGS, **getattr(settings, 'ERKNM_HTTP', {})}
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Общая для процесса HTTP-сессия с пулом keep-alive соединений."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = http_settings()['POOL_SIZE']
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'User-Agent': USER_AGENT,
+                    'Accept': 'application/json, text/html;q=0.9',
+                })
+                _session = session
+    return _session
+
+
+def resolve_data_url(url: str) -> str:
+    """Преобразует публичную ссылку КНМ в адрес источника данных."""
+    match = LINK_ONLY_RE.search(url)
+    if not match:
+        raise FastPathError(f'Ссылка не содержит идентификатор КНМ: {url}')
+    return http_settings()['API_URL_TEMPLATE'].format(uuid=match['uuid'])
+
+
+def match_labels(rows) -> Dict[str, str]:
+    """Сопоставляет пары (подпись, значение) с полями КНМ по началу подписи.
+
+    Для каждого поля берется первая строка, подпись которой начинается
+    с ожидаемого текста.
+    """
+    content_value = {field: NOT_FOUND for field in FIELD_LABELS}
+    for label, value in rows:
+        label = ' '.join(str(label).split())
+        value = ' '.join(str(value).split()) if value is not None else ''
+        for field, prefix in FIELD_LABELS.items():
+            if content_value[field] == NOT_FOUND and label.startswith(prefix):
+                content_value[field] = value or NOT_FOUND
+    return content_value
+
+
+class _RowsHTMLParser(HTMLParser):
+    """Собирает пары подпись/значение из строк ``_Row_`` страницы КНМ."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._target = None
+        self._depth = 0
+        self._label = None
+        self._buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        if self._target is not None:
+            if tag not in VOID_TAGS:
+                self._depth += 1
+            return
+        classes = dict(attrs).get('class') or ''
+        if '_ColText_' in classes:
+            self._target = 'label'
+        elif '_ColValue_' in classes:
+            self._target = 'value'
+        else:
+            return
+        self._depth = 1
+        self._buffer = []
+
+    def handle_startendtag(self, tag, attrs):
+        if self._target is None:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if self._target is None or tag in VOID_TAGS:
+            return
+        self._depth -= 1
+        if self._depth:
+            return
+        text = ''.join(self._buffer)
+        if self._target == 'label':
+            self._label = text
+        elif self._label is not None:
+            self.rows.append((self._label, text))
+            self._label = None
+        self._target = None
+
+    def handle_data(self, data):
+        if self._target is not None:
+            self._buffer.append(data)
+
+
+def extract_from_html(html: str) -> Dict[str, str]:
+    parser = _RowsHTMLParser()
+    parser.feed(html)
+    return match_labels(parser.rows)
+
+
+def _walk_json_rows(node):
+    if isinstance(node, dict):
+        label_key = next((k for k in JSON_LABEL_KEYS if k in node), None)
+        value_key = next((k for k in JSON_VALUE_KEYS if k in node), None)
+        if label_key and value_key and isinstance(node[label_key], str):
+            yield node[label_key], node[value_key]
+        for value in node.values():
+            yield from _walk_json_rows(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk_json_rows(item)
+
+
+def extract_from_json(data) -> Dict[str, str]:
+    return match_labels(_walk_json_rows(data))
+
+
+def fetch_knm_data_http(url: str, session=None, validators=None):
+    """Условный запрос данных КНМ.
+
+    Args:
+        url: Публичная ссылка КНМ.
+        session: Сессия requests; по умолчанию общая сессия процесса.
+        validators: Словарь с ``etag``/``last_modified`` прошлого ответа.
+
+    Returns:
+        tuple: ``(данные, validators)``; данные равны None, если портал
+        ответил 304 Not Modified.
+    """
+    data_url = resolve_data_url(url)
+    session = session or get_session()
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    try:
+        response = session.get(
+            data_url, headers=headers, timeout=http_settings()['TIMEOUT'])
+        response.raise_for_status()
+    except requests.RequestException as e:
+        raise FastPathError(f'Ошибка запроса {data_url}: {str(e)}')
+
+    new_validators = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+    if response.status_code == 304:
+        return None, {k: v or (validators or {}).get(k)
+                      for k, v in new_validators.items()}
+
+    content_type = response.headers.get('Content-Type', '')
+    try:
+        if 'json' in content_type:
+            content_value = extract_from_json(response.json())
+        else:
+            content_value = extract_from_html(response.text)
+    except ValueError as e:
+        raise FastPathContentError(
+            f'Некорректный ответ {data_url}: {str(e)}')
+
+    if content_value['Статус КНМ'] == NOT_FOUND:
+        raise FastPathContentError(
+            f'Статус КНМ не найден в ответе {data_url}')
+    logger.debug(
+        '%s: Определены ключевые элементы: %s.',
+        parse_knm_data_http.__name__, ', '.join(content_value),
+        extra={'url': url, 'knm_number': content_value.get('Номер КНМ')}
+    )
+    return content_value, new_validators
+
+
+def parse_knm_data_http(url: str, session=None) -> Dict[str, str]:
+    """Получает данные КНМ напрямую из источника данных портала."""
+    return fetch_knm_data_http(url, session=session)[0]
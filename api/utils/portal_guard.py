@@ -0,0 +1,492 @@
+"""Защита портала proverki.gov.ru от лавины запросов при его сбоях.
+
+Каждая загрузка страницы КНМ проходит через три ограничения:
+
+- автомат (circuit breaker) с состояниями closed/open/half-open: после
+  серии ошибок он размыкается и сразу отвечает ``PortalUnavailable``
+  (HTTP 503), а по истечении паузы пропускает одну пробную загрузку;
+- адаптивный лимит частоты (token bucket): частота плавно растет после
+  успешных загрузок и уменьшается вдвое после ошибок;
+- ограничение числа одновременных загрузок.
+
+Состояние хранится в локальном файле sqlite3 и общее для всех рабочих
+процессов на машине. Неудачные загрузки повторяются с экспоненциальной
+задержкой со случайным разбросом (full jitter). Сбоем портала считается
+только ``ParserError`` (таймаут, ошибка соединения или HTTP): страница
+без данных КНМ (``ContentError``) означает, что портал ответил, поэтому
+не размыкает автомат и не повторяется.
+
+Настройки берутся из ``settings.ERKNM_GUARD``:
+
+- ENABLED: защита включена;
+- STATE_PATH: файл sqlite3 с общим состоянием;
+- FAILURE_THRESHOLD: ошибок подряд до размыкания автомата;
+- RECOVERY_TIMEOUT: пауза до пробной загрузки, секунды;
+- TRIAL_TIMEOUT: через сколько секунд зависшая пробная загрузка
+  считается потерянной;
+- RATE / MIN_RATE / BURST: начальная и минимальная частота загрузок
+  в секунду и размер пачки;
+- RATE_INCREASE / RATE_DECREASE: шаг роста и множитель снижения частоты;
+- MAX_CONCURRENCY: одновременных загрузок на все процессы;
+- SLOT_TTL: время, после которого слот упавшего процесса освобождается;
+- ACQUIRE_TIMEOUT: сколько секунд ждать лимита частоты или слота;
+- RETRIES / BACKOFF_BASE / BACKOFF_MAX: повторы и их задержки, секунды.
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .logging_config import logger
+from .parser_erknm_headless import ContentError, ParserError
+
+DEFAULT_GUARD_SETTINGS = {
+    'ENABLED': True,
+    'STATE_PATH': os.path.join(tempfile.gettempdir(), 'erknm_guard.sqlite3'),
+    'FAILURE_THRESHOLD': 5,
+    'RECOVERY_TIMEOUT': 30,
+    'TRIAL_TIMEOUT': 60,
+    'RATE': 2.0,
+    'MIN_RATE': 0.2,
+    'BURST': 4,
+    'RATE_INCREASE': 0.1,
+    'RATE_DECREASE': 0.5,
+    'MAX_CONCURRENCY': 4,
+    'SLOT_TTL': 120,
+    'ACQUIRE_TIMEOUT': 30,
+    'RETRIES': 2,
+    'BACKOFF_BASE': 0.5,
+    'BACKOFF_MAX': 8.0,
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Пауза между попытками занять слот одновременной загрузки
+SLOT_POLL_INTERVAL = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS breaker (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    failures INTEGER NOT NULL,
+    opened_at REAL NOT NULL,
+    trial_started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bucket (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    rate REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT NOT NULL,
+    event TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (name, event)
+);
+"""
+
+
+def guard_settings():
+    return {**DEFAULT_GUARD_SETTINGS, **getattr(settings, 'ERKNM_GUARD', {})}
+
+
+class PortalUnavailable(ParserError):
+    """Портал недоступен или перегружен: загрузка отклонена без попытки."""
+
+    status_code = 503
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+
+class _StateStore:
+    """Файл sqlite3 с общим для процессов состоянием защиты.
+
+    Соединение открывается отдельно в каждом потоке и процессе, все
+    изменения выполняются в транзакциях ``BEGIN IMMEDIATE``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def incr(self, name, event):
+        with self.transaction() as db:
+            db.execute(
+                'INSERT INTO counters (name, event, value) VALUES (?, ?, 1) '
+                'ON CONFLICT (name, event) DO UPDATE SET value = value + 1',
+                (name, event))
+
+    def counters(self, name):
+        rows = self._connection().execute(
+            'SELECT event, value FROM counters WHERE name = ?', (name,))
+        return dict(rows.fetchall())
+
+
+class CircuitBreaker:
+    """Автомат closed/open/half-open с состоянием в общем хранилище."""
+
+    def __init__(self, store, name, config):
+        self.store = store
+        self.name = name
+        self.config = config
+
+    def _row(self, db):
+        row = db.execute(
+            'SELECT state, failures, opened_at, trial_started FROM breaker '
+            'WHERE name = ?', (self.name,)).fetchone()
+        return row or (CLOSED, 0, 0.0, 0.0)
+
+    def _save(self, db, state, failures, opened_at, trial_started):
+        db.execute(
+            'INSERT OR REPLACE INTO breaker '
+            '(name, state, failures, opened_at, trial_started) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (self.name, state, failures, opened_at, trial_started))
+
+    def before_call(self):
+        """Пропускает загрузку или выбрасывает PortalUnavailable.
+
+        Returns:
+            bool: True, если эта загрузка заняла пробную попытку.
+        """
+        now = time.time()
+        with self.store.transaction() as db:
+            state, failures, opened_at, trial_started = self._row(db)
+            if state == CLOSED:
+                return False
+            retry_after = opened_at + self.config['RECOVERY_TIMEOUT'] - now
+            if state == OPEN and retry_after > 0:
+                raise PortalUnavailable(
+                    'Портал ЕРКНМ недоступен, повторите запрос позже.',
+                    retry_after=int(retry_after) + 1)
+            trial_running = (
+                state == HALF_OPEN
+                and now - trial_started < self.config['TRIAL_TIMEOUT'])
+            if trial_running:
+                raise PortalUnavailable(
+                    'Портал ЕРКНМ проверяется, повторите запрос позже.',
+                    retry_after=self.config['RECOVERY_TIMEOUT'])
+            self._save(db, HALF_OPEN, failures, opened_at, now)
+        logger.info('%s: Пробная загрузка после сбоя.', CircuitBreaker.__name__)
+        return True
+
+    def release_trial(self):
+        """Освобождает пробную попытку, если загрузка так и не началась."""
+        with self.store.transaction() as db:
+            state, failures, opened_at, _ = self._row(db)
+            if state == HALF_OPEN:
+                self._save(db, HALF_OPEN, failures, opened_at, 0.0)
+
+    def on_success(self):
+        with self.store.transaction() as db:
+            state = self._row(db)[0]
+            self._save(db, CLOSED, 0, 0.0, 0.0)
+        if state != CLOSED:
+            logger.info('%s: Портал снова доступен.', CircuitBreaker.__name__)
+
+    def on_failure(self):
+        now = time.time()
+        with self.store.transaction() as db:
+            state, failures, opened_at, _ = self._row(db)
+            failures += 1
+            if state == HALF_OPEN or failures >= self.config['FAILURE_THRESHOLD']:
+                self._save(db, OPEN, failures, now, 0.0)
+                opened = True
+            else:
+                self._save(db, state, failures, opened_at, 0.0)
+                opened = False
+        if opened:
+            self.store.incr(self.name, 'opened')
+            logger.warning(
+                '%s: Автомат разомкнут после %d ошибок подряд.',
+                CircuitBreaker.__name__, failures)
+
+    def snapshot(self):
+        with self.store.transaction() as db:
+            state, failures, opened_at, _ = self._row(db)
+        return {
+            'state': state,
+            'failures': failures,
+            'opened_at': opened_at or None,
+        }
+
+
+class AdaptiveRateLimiter:
+    """Общий token bucket, частота которого подстраивается под ответы портала."""
+
+    def __init__(self, store, name, config):
+        self.store = store
+        self.name = name
+        self.config = config
+
+    def _row(self, db, now):
+        row = db.execute(
+            'SELECT tokens, rate, updated FROM bucket WHERE name = ?',
+            (self.name,)).fetchone()
+        return row or (float(self.config['BURST']), self.config['RATE'], now)
+
+    def _save(self, db, tokens, rate, updated):
+        db.execute(
+            'INSERT OR REPLACE INTO bucket (name, tokens, rate, updated) '
+            'VALUES (?, ?, ?, ?)', (self.name, tokens, rate, updated))
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.time()
+            with self.store.transaction() as db:
+                tokens, rate, updated = self._row(db, now)
+                tokens = min(
+                    self.config['BURST'], tokens + (now - updated) * rate)
+                if tokens >= 1:
+                    self._save(db, tokens - 1, rate, now)
+                    return
+                self._save(db, tokens, rate, now)
+            wait = (1 - tokens) / rate
+            if time.monotonic() + wait > deadline:
+                raise PortalUnavailable(
+                    'Превышен лимит запросов к порталу ЕРКНМ.',
+                    retry_after=int(wait) + 1)
+            time.sleep(wait)
+
+    def _adjust(self, fn):
+        now = time.time()
+        with self.store.transaction() as db:
+            tokens, rate, updated = self._row(db, now)
+            rate = min(self.config['RATE'],
+                       max(self.config['MIN_RATE'], fn(rate)))
+            self._save(db, tokens, rate, updated)
+
+    def on_success(self):
+        self._adjust(lambda rate: rate + self.config['RATE_INCREASE'])
+
+    def on_failure(self):
+        self._adjust(lambda rate: rate * self.config['RATE_DECREASE'])
+
+    def snapshot(self):
+        now = time.time()
+        with self.store.transaction() as db:
+            tokens, rate, _ = self._row(db, now)
+        return {'rate': round(rate, 3), 'tokens': round(tokens, 2)}
+
+
+class ConcurrencyLimiter:
+    """Общее для процессов ограничение одновременных загрузок."""
+
+    def __init__(self, store, name, config):
+        self.store = store
+        self.name = name
+        self.config = config
+
+    def _try_acquire(self):
+        now = time.time()
+        with self.store.transaction() as db:
+            # Слоты упавших процессов освобождаются по истечении срока
+            db.execute('DELETE FROM slots WHERE name = ? AND expires_at < ?',
+                       (self.name, now))
+            (busy,) = db.execute('SELECT COUNT(*) FROM slots WHERE name = ?',
+                                 (self.name,)).fetchone()
+            if busy >= self.config['MAX_CONCURRENCY']:
+                return None
+            cursor = db.execute(
+                'INSERT INTO slots (name, pid, expires_at) VALUES (?, ?, ?)',
+                (self.name, os.getpid(), now + self.config['SLOT_TTL']))
+            return cursor.lastrowid
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        slot_id = self._try_acquire()
+        while slot_id is None:
+            if time.monotonic() > deadline:
+                raise PortalUnavailable(
+                    'Слишком много одновременных загрузок с портала ЕРКНМ.',
+                    retry_after=1)
+            time.sleep(SLOT_POLL_INTERVAL)
+            slot_id = self._try_acquire()
+        return slot_id
+
+    def release(self, slot_id):
+        with self.store.transaction() as db:
+            db.execute('DELETE FROM slots WHERE id = ?', (slot_id,))
+
+    def snapshot(self):
+        (busy,) = self.store._connection().execute(
+            'SELECT COUNT(*) FROM slots WHERE name = ? AND expires_at >= ?',
+            (self.name, time.time())).fetchone()
+        return {'in_flight': busy, 'limit': self.config['MAX_CONCURRENCY']}
+
+
+class PortalGuard:
+    """Автомат, лимит частоты, лимит одновременности и повторы вместе."""
+
+    def __init__(self, config=None, name='proverki.gov.ru'):
+        self.config = {**DEFAULT_GUARD_SETTINGS, **(config or {})}
+        self.name = name
+        self.store = _StateStore(self.config['STATE_PATH'])
+        self.breaker = CircuitBreaker(self.store, name, self.config)
+        self.limiter = AdaptiveRateLimiter(self.store, name, self.config)
+        self.concurrency = ConcurrencyLimiter(self.store, name, self.config)
+
+    def backoff(self, attempt):
+        """Задержка перед повтором: full jitter от экспоненциального предела."""
+        cap = min(self.config['BACKOFF_MAX'],
+                  self.config['BACKOFF_BASE'] * 2 ** attempt)
+        return random.uniform(0, cap)
+
+    def _retry_delay(self, attempt, error):
+        """Задержка перед повтором или None, если повторять не нужно."""
+        if isinstance(error, PortalUnavailable):
+            self.store.incr(self.name, 'rejected')
+            return None
+        if isinstance(error, ContentError):
+            return None
+        if attempt >= self.config['RETRIES']:
+            return None
+        delay = self.backoff(attempt)
+        self.store.incr(self.name, 'retried')
+        logger.info(
+            '%s: Повтор %d через %.2f с: %s',
+            PortalGuard.__name__, attempt + 1, delay, error)
+        return delay
+
+    def _admit(self):
+        """Проверяет автомат и лимит частоты, занимает слот загрузки.
+
+        Returns:
+            tuple: ``(slot_id, trial)``; trial — загрузка пробная.
+        """
+        trial = self.breaker.before_call()
+        timeout = self.config['ACQUIRE_TIMEOUT']
+        try:
+            self.limiter.acquire(timeout)
+            return self.concurrency.acquire(timeout), trial
+        except PortalUnavailable:
+            # Иначе автомат ждал бы исхода пробной загрузки TRIAL_TIMEOUT
+            if trial:
+                self.breaker.release_trial()
+            raise
+
+    def _finish(self, slot_id, trial, error=None):
+        self.concurrency.release(slot_id)
+        if error is None or isinstance(error, ContentError):
+            self.breaker.on_success()
+            self.limiter.on_success()
+            self.store.incr(
+                self.name, 'succeeded' if error is None else 'invalid')
+        elif isinstance(error, ParserError):
+            self.breaker.on_failure()
+            self.limiter.on_failure()
+            self.store.incr(self.name, 'failed')
+        elif trial:
+            # Ошибка не говорит о состоянии портала (например, отмена
+            # запроса), а пробная попытка не должна остаться занятой
+            self.breaker.release_trial()
+
+    def call(self, fn):
+        """Выполняет загрузку ``fn()`` под защитой с повторами при ошибках."""
+        if not self.config['ENABLED']:
+            return fn()
+        attempt = 0
+        while True:
+            try:
+                slot_id, trial = self._admit()
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self._finish(slot_id, trial, e)
+                    raise
+                self._finish(slot_id, trial)
+                return result
+            except ParserError as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    async def call_async(self, fn):
+        """Асинхронный аналог ``call`` для корутины ``fn()``.
+
+        Операции с файлом состояния выполняются в потоке, чтобы не
+        блокировать цикл событий.
+        """
+        if not self.config['ENABLED']:
+            return await fn()
+        attempt = 0
+        while True:
+            try:
+                slot_id, trial = await asyncio.to_thread(self._admit)
+                try:
+                    result = await fn()
+                except BaseException as e:
+                    await asyncio.to_thread(self._finish, slot_id, trial, e)
+                    raise
+                await asyncio.to_thread(self._finish, slot_id, trial)
+                return result
+            except ParserError as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def stats(self):
+        return {
+            'enabled': self.config['ENABLED'],
+            'breaker': self.breaker.snapshot(),
+            'rate_limiter': self.limiter.snapshot(),
+            'concurrency': self.concurrency.snapshot(),
+            'counters': self.store.counters(self.name),
+        }
+
+
+_guard = None
+_guard_lock = threading.Lock()
+
+
+def get_portal_guard():
+    """Возвращает общий для процесса экземпляр защиты портала."""
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = PortalGuard(guard_settings())
+    return _guard
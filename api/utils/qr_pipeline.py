@@ -0,0 +1,172 @@
+"""Многоступенчатое распознавание QR-кода.
+
+Ступени выполняются от дешевых к дорогим, и распознавание
+останавливается на первой успешной:
+
+1. ``downscaled`` — оттенки серого, уменьшенные до бюджета пикселей;
+2. ``roi`` — область QR-кода, найденная ``cv2.QRCodeDetector``;
+3. ``binarized`` — адаптивная бинаризация области;
+4. ``rotated`` — повороты области;
+5. ``upscaled`` — увеличенная область для мелких кодов;
+6. ``full`` — исходное изображение в полном разрешении.
+
+Результат содержит ссылку, название успешной ступени и затраченное время.
+"""
+import time
+
+import cv2
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from pyzbar.pyzbar import ZBarSymbol, decode
+
+DEFAULT_PIXEL_BUDGET = 1_000_000
+ROI_MARGIN = 0.15
+ROTATION_ANGLES = (-15, 15, 90, -30, 30)
+UPSCALE_FACTOR = 2.0
+MIN_ROI_SIDE = 200
+
+
+def pixel_budget():
+    try:
+        return getattr(settings, 'KND_QR_PIXEL_BUDGET', DEFAULT_PIXEL_BUDGET)
+    except ImproperlyConfigured:
+        # Запуск вне Django, например из примера в модуле распознавания
+        return DEFAULT_PIXEL_BUDGET
+
+
+def _zbar_all(img):
+    """Все непустые QR-коды на изображении в порядке обнаружения."""
+    urls = []
+    for symbol in decode(img, symbols=[ZBarSymbol.QRCODE]):
+        data = symbol.data.decode('utf-8')
+        if data and data not in urls:
+            urls.append(data)
+    return urls
+
+
+def _zbar(img):
+    decoded = decode(img, symbols=[ZBarSymbol.QRCODE])
+    for symbol in decoded:
+        data = symbol.data.decode('utf-8')
+        if data:
+            return data
+    return None
+
+
+def to_gray(img):
+    if img.ndim == 3:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return img
+
+
+def downscale(img, budget):
+    """Уменьшает изображение так, чтобы площадь не превышала budget пикселей."""
+    height, width = img.shape[:2]
+    if height * width <= budget:
+        return img
+    scale = (budget / (height * width)) ** 0.5
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def locate_roi(gray):
+    """Вырезает область QR-кода по углам от QRCodeDetector или возвращает None."""
+    found, points = cv2.QRCodeDetector().detect(gray)
+    if not found or points is None:
+        return None
+    points = points.reshape(-1, 2)
+    x_min, y_min = points.min(axis=0)
+    x_max, y_max = points.max(axis=0)
+    margin = max(x_max - x_min, y_max - y_min) * ROI_MARGIN
+    height, width = gray.shape[:2]
+    x0, y0 = max(0, int(x_min - margin)), max(0, int(y_min - margin))
+    x1, y1 = min(width, int(x_max + margin)), min(height, int(y_max + margin))
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return gray[y0:y1, x0:x1]
+
+
+def binarize(gray):
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    return cv2.adaptiveThreshold(
+        blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 5)
+
+
+def rotations(gray):
+    height, width = gray.shape[:2]
+    center = (width / 2, height / 2)
+    for angle in ROTATION_ANGLES:
+        matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+        yield cv2.warpAffine(
+            gray, matrix, (width, height),
+            flags=cv2.INTER_LINEAR, borderValue=255)
+
+
+def upscale(gray):
+    factor = max(UPSCALE_FACTOR, MIN_ROI_SIDE / max(1, min(gray.shape[:2])))
+    return cv2.resize(
+        gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+
+
+def decode_pipeline(img, budget=None):
+    """Распознает QR-код, перебирая ступени от дешевых к дорогим.
+
+    Args:
+        img: Изображение OpenCV (BGR или оттенки серого).
+        budget: Бюджет пикселей для уменьшения; по умолчанию из настроек.
+
+    Returns:
+        dict: ``url``, ``stage`` (успешная ступень) и ``elapsed_ms``.
+
+    Raises:
+        ValueError: Если QR-код не распознан ни на одной ступени.
+    """
+    started = time.perf_counter()
+    gray = to_gray(img)
+    small = downscale(gray, budget or pixel_budget())
+
+    def stages():
+        yield 'downscaled', small
+        roi = locate_roi(small)
+        area = small if roi is None else roi
+        if roi is not None:
+            yield 'roi', roi
+        yield 'binarized', binarize(area)
+        for rotated in rotations(area):
+            yield 'rotated', rotated
+        yield 'upscaled', upscale(area)
+        if small is not gray:
+            yield 'full', gray
+
+    for stage, candidate in stages():
+        data = _zbar(candidate)
+        if data:
+            return {
+                'url': data,
+                'stage': stage,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+            }
+    raise ValueError("QR-код не распознан на изображении")
+
+
+def decode_all(img, budget=None):
+    """Распознает все QR-коды на изображении.
+
+    Сначала ищет коды на уменьшенном и полном изображении, а если не
+    найден ни один, переходит к ступеням ``decode_pipeline`` для
+    единственного кода.
+
+    Returns:
+        list: Уникальные распознанные строки.
+
+    Raises:
+        ValueError: Если не распознан ни один QR-код.
+    """
+    gray = to_gray(img)
+    small = downscale(gray, budget or pixel_budget())
+    urls = _zbar_all(small)
+    if not urls and small is not gray:
+        urls = _zbar_all(gray)
+    if not urls:
+        urls = [decode_pipeline(img, budget)['url']]
+    return urls
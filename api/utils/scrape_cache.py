@@ -0,0 +1,91 @@
+"""Кэш результатов парсинга страниц КНМ.
+
+Ключ записи строится из хеша ссылки КНМ, записи хранятся в кэше Django
+с псевдонимом ``ERKNM_CACHE_ALIAS`` (по умолчанию ``erknm``). Время жизни
+зависит от статуса КНМ: завершенные проверки не меняются и хранятся
+долго, ожидающие — недолго. После истечения срока запись еще
+``STALE_GRACE`` секунд остается в кэше, чтобы ее можно было
+перепроверить условным запросом вместо полного парсинга.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_CACHE_SETTINGS = {
+    'ALIAS': 'erknm',
+    'TTL': {
+        'Завершено': 30 * 24 * 3600,
+    },
+    'DEFAULT_TTL': 15 * 60,
+    'STALE_GRACE': 24 * 3600,
+}
+
+STATS_KEYS = ('hit', 'miss', 'revalidated')
+
+
+def cache_settings():
+    return {**DEFAULT_CACHE_SETTINGS, **getattr(settings, 'ERKNM_CACHE', {})}
+
+
+def _cache():
+    return caches[cache_settings()['ALIAS']]
+
+
+def cache_key(url):
+    return 'erknm:' + hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def ttl_for(content):
+    config = cache_settings()
+    return config['TTL'].get(content.get('Статус КНМ'), config['DEFAULT_TTL'])
+
+
+def get_entry(url):
+    """Запись кэша: словарь с ключами data, validators, expires_at."""
+    return _cache().get(cache_key(url))
+
+
+def is_fresh(entry):
+    return entry is not None and entry['expires_at'] > time.time()
+
+
+def store(url, content, validators=None):
+    ttl = ttl_for(content)
+    entry = {
+        'data': content,
+        'validators': validators or {},
+        'expires_at': time.time() + ttl,
+    }
+    _cache().set(
+        cache_key(url), entry, ttl + cache_settings()['STALE_GRACE'])
+    return entry
+
+
+def touch(url, entry, validators=None):
+    """Продлевает запись после успешной условной перепроверки."""
+    return store(url, entry['data'], validators or entry['validators'])
+
+
+def invalidate(url):
+    _cache().delete(cache_key(url))
+
+
+def record(event):
+    cache = _cache()
+    key = f'erknm:stats:{event}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def cache_stats():
+    values = _cache().get_many([f'erknm:stats:{event}' for event in STATS_KEYS])
+    stats = {event: values.get(f'erknm:stats:{event}', 0) for event in STATS_KEYS}
+    total = sum(stats.values())
+    stats['hit_rate'] = round(
+        (stats['hit'] + stats['revalidated']) / total, 3) if total else None
+    return stats
@@ -0,0 +1,60 @@
+"""Объединение одновременных вызовов с одинаковым ключом (single-flight).
+
+Если несколько потоков одновременно запрашивают один и тот же ключ,
+функция выполняется только в первом из них, а остальные ждут и получают
+тот же результат или то же исключение.
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Группа вызовов, дедуплицируемых по ключу в пределах процесса."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Выполняет ``fn()`` один раз на ключ для всех одновременных вызовов.
+
+        Returns:
+            tuple: ``(результат, shared)``; shared истинно, если результат
+            получен от чужого вызова.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
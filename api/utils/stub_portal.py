@@ -0,0 +1,141 @@
+"""Локальная заглушка портала proverki.gov.ru для нагрузочных тестов.
+
+Отдает сохраненные ответы из ``media/test/erknm/`` по тем же путям, что
+и настоящий портал, с настраиваемой задержкой и долей отказов. Сеть при
+этом не используется.
+
+- ``/portal/public-knm/link-only/<uuid>`` — HTML-страница КНМ;
+- ``/portal/api/public-knm/link-only/<uuid>`` — JSON источника данных.
+
+С ``unique_numbers=True`` номер КНМ в ответе выводится из uuid ссылки,
+так что разные ссылки дают разные проверки.
+"""
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).resolve().parents[2] / 'media' / 'test' / 'erknm'
+
+PAGE_PREFIX = '/portal/public-knm/link-only/'
+API_PREFIX = '/portal/api/public-knm/link-only/'
+
+# Номер КНМ в сохраненных ответах
+FIXTURE_NUMBER = b'66250926600018705336'
+UUID_RE = re.compile(r'[0-9a-fA-F-]{36}')
+
+
+def knm_content(number, status='Ожидает проведения'):
+    """Данные КНМ в том виде, в каком их возвращает парсер.
+
+    Записываются в кэш парсинга, чтобы тесты и проверки бюджета запросов
+    обходились без портала.
+    """
+    return {
+        'Номер КНМ': number,
+        'Статус КНМ': status,
+        'Дата регистрации': '12.08.2025 10:41',
+        'Дата начала': '01.09.2025',
+        'Дата окончания': '12.09.2025',
+        'Адрес': 'г. Екатеринбург',
+    }
+
+
+class StubPortal:
+    """HTTP-сервер заглушки в фоновом потоке.
+
+    Args:
+        latency: Задержка ответа в секундах.
+        jitter: Случайная добавка к задержке, от 0 до jitter секунд.
+        failure_rate: Доля запросов, на которые отвечается 503.
+        port: Порт; 0 — выбрать свободный.
+        unique_numbers: Выводить номер КНМ из uuid ссылки.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 host='127.0.0.1', port=0, unique_numbers=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.unique_numbers = unique_numbers
+        self.page = (FIXTURES_DIR / 'knm_page.html').read_bytes()
+        self.api = (FIXTURES_DIR / 'knm_api.json').read_bytes()
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def api_url_template(self):
+        """Значение для ``ERKNM_HTTP['API_URL_TEMPLATE']``."""
+        return self.base_url + API_PREFIX + '{uuid}'
+
+    def page_url(self, uuid):
+        return self.base_url + PAGE_PREFIX + uuid
+
+    def body(self, template, path):
+        match = UUID_RE.search(path)
+        if not self.unique_numbers or not match:
+            return template
+        number = int(match.group().replace('-', ''), 16) % 10 ** 20
+        return template.replace(FIXTURE_NUMBER, b'%020d' % number)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='stub-portal', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with portal._lock:
+                    portal.requests += 1
+                delay = portal.latency + random.uniform(0, portal.jitter)
+                if delay:
+                    time.sleep(delay)
+                if random.random() < portal.failure_rate:
+                    with portal._lock:
+                        portal.failures += 1
+                    self._send(503, b'Service Unavailable', 'text/plain')
+                elif self.path.startswith(API_PREFIX):
+                    self._send(200, portal.body(portal.api, self.path),
+                               'application/json; charset=utf-8')
+                elif self.path.startswith(PAGE_PREFIX):
+                    self._send(200, portal.body(portal.page, self.path),
+                               'text/html; charset=utf-8')
+                else:
+                    self._send(404, b'Not Found', 'text/plain')
+
+            def _send(self, code, body, content_type):
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
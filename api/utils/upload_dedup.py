@@ -0,0 +1,173 @@
+"""Кэш повторных загрузок изображений с QR-кодом.
+
+Инспекторы часто загружают одну и ту же фотографию или скриншот
+повторно. Кэш сопоставляет хеш содержимого файла с уже распознанной
+ссылкой КНМ и id созданной записи, поэтому повторная загрузка не
+распознается заново. Для пережатых копий можно включить перцептивный
+хеш (dHash 16x16, 256 бит): копия считается той же картинкой, если
+хеши отличаются не более чем на ``MAX_DISTANCE`` бит. Разные QR-коды
+похожи друг на друга, поэтому по умолчанию он выключен.
+
+Кэш хранится в памяти процесса, ограничен ``MAX_ENTRIES`` записями и
+вытесняет давно не использованные (LRU).
+
+Настройки берутся из ``settings.KND_UPLOAD_DEDUP``:
+
+- ENABLED: кэш включен;
+- MAX_ENTRIES: предельное число записей;
+- PERCEPTUAL: считать перцептивный хеш для пережатых копий;
+- MAX_DISTANCE: допустимое расстояние Хэмминга между хешами.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from .metrics import UPLOAD_DEDUP_HITS, UPLOAD_DEDUP_MISSES
+
+DEFAULT_DEDUP_SETTINGS = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 4096,
+    'PERCEPTUAL': False,
+    'MAX_DISTANCE': 8,
+}
+
+# Сторона сетки перцептивного хеша
+HASH_SIZE = 16
+
+STATS_KEYS = ('content_hit', 'perceptual_hit', 'miss', 'evicted')
+
+
+def dedup_settings():
+    return {**DEFAULT_DEDUP_SETTINGS,
+            **getattr(settings, 'KND_UPLOAD_DEDUP', {})}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(data):
+    """dHash по серому изображению или None.
+
+    Уменьшенное декодирование (``IMREAD_REDUCED_*``) не используется:
+    JPEG и PNG уменьшаются при нем по-разному, и хеши пережатой копии
+    расходятся на десятки бит.
+    """
+    img = cv2.imdecode(
+        np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    small = cv2.resize(
+        img, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class UploadDedupCache:
+    """LRU-кэш: хеш загрузки -> распознанная ссылка и id записи КНД."""
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_DEDUP_SETTINGS, **(config or {})}
+        self._entries = OrderedDict()
+        self._perceptual = {}
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(STATS_KEYS, 0)
+
+    def _find_perceptual(self, phash):
+        max_distance = self.config['MAX_DISTANCE']
+        for key, other in self._perceptual.items():
+            if (phash ^ other).bit_count() <= max_distance:
+                return key
+        return None
+
+    def lookup(self, data):
+        """Ищет загрузку в кэше.
+
+        Returns:
+            tuple: ``(keys, entry)``; keys нужны для ``remember``, entry —
+            словарь с ключами url и knd_id или None при промахе.
+        """
+        content_key = content_hash(data)
+        with self._lock:
+            entry = self._entries.get(content_key)
+            if entry is not None:
+                self._entries.move_to_end(content_key)
+                self._stats['content_hit'] += 1
+                UPLOAD_DEDUP_HITS.inc()
+                return (content_key, None), dict(entry)
+        phash = perceptual_hash(data) if self.config['PERCEPTUAL'] else None
+        with self._lock:
+            key = None if phash is None else self._find_perceptual(phash)
+            if key is not None:
+                self._entries.move_to_end(key)
+                self._stats['perceptual_hit'] += 1
+                UPLOAD_DEDUP_HITS.inc()
+                return (content_key, phash), dict(self._entries[key])
+            self._stats['miss'] += 1
+        UPLOAD_DEDUP_MISSES.inc()
+        return (content_key, phash), None
+
+    def remember(self, keys, url, knd_id=None):
+        content_key, phash = keys
+        with self._lock:
+            entry = self._entries.setdefault(
+                content_key, {'url': url, 'knd_id': None})
+            entry['url'] = url
+            if knd_id is not None:
+                entry['knd_id'] = knd_id
+            self._entries.move_to_end(content_key)
+            if phash is not None:
+                self._perceptual[content_key] = phash
+            while len(self._entries) > self.config['MAX_ENTRIES']:
+                evicted, _ = self._entries.popitem(last=False)
+                self._perceptual.pop(evicted, None)
+                self._stats['evicted'] += 1
+
+    def forget_knd(self, knd_id):
+        """Убирает id удаленной записи, ссылка остается в кэше."""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry['knd_id'] == knd_id:
+                    entry['knd_id'] = None
+
+    def resolve(self, data, decode):
+        """Ссылка из QR-кода загрузки; ``decode(data)`` вызывается при промахе.
+
+        Returns:
+            tuple: ``(url, keys, knd_id)``.
+        """
+        if not self.config['ENABLED']:
+            return decode(data)['url'], None, None
+        keys, entry = self.lookup(data)
+        if entry is not None:
+            return entry['url'], keys, entry['knd_id']
+        url = decode(data)['url']
+        self.remember(keys, url)
+        return url, keys, None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        hits = stats['content_hit'] + stats['perceptual_hit']
+        total = hits + stats['miss']
+        stats['hit_rate'] = round(hits / total, 3) if total else None
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_upload_dedup():
+    """Возвращает общий для процесса кэш повторных загрузок."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = UploadDedupCache(dedup_settings())
+    return _cache
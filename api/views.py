@@ -1,54 +1,80 @@
 import os
+from datetime import date
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
 from django.core.files.storage import default_storage
 from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from datetime import datetime
-import logging
-import sys
 
-from api.serializers import KndSerializer
-from knd.models import Knd, Users
-from api.utils.one_qrcod_in_url_decode import decode_qr_code
-from api.utils.parser_erknm_headless import parse_knm_data
+from api import conditional
+from api.bulk import BulkUploadError, bulk_upload
+from api.export import ExportError, build_xlsx, stream_csv
+from api.changes import change_feed_settings, wait_for_changes
+from api.filters import filter_knd_queryset
+from api.jobs import enqueue_qr_job
+from api.pagination import KndCursorPagination
+from api.refresh import open_knd_queryset, refresh_in_background
+from api.serializers import (
+    KndSerializer, KndStatusChangeSerializer, QrJobSerializer
+)
+from api.services import (
+    KNM_FIELDS, USER_FIELDS, KndConflict, create_knd, diff_fields, diff_knm,
+    ensure_new_url, save_diff
+)
+from knd.models import Knd, QrJob
+from api.utils.one_qrcod_in_url_decode import decode_qr_code_bytes
+from api.utils.erknm import get_knm_data
+from api.utils.portal_guard import PortalUnavailable, get_portal_guard
+from api.utils.upload_dedup import get_upload_dedup
+from api.utils import metrics, scrape_cache
 
 from .utils.logging_config import logger
 
-# Функции для преобразования дат
-def parse_datetime(dt_str):
-    if dt_str == 'Не найдено' or not dt_str.strip():
-        return None
-    try:
-        return datetime.strptime(dt_str, '%d.%m.%Y %H:%M')
-    except ValueError:
-        return None
-
-def parse_date(date_str):
-    if date_str == 'Не найдено' or not date_str.strip():
-        return None
-    try:
-        return datetime.strptime(date_str, '%d.%m.%Y').date()
-    except ValueError:
-        return None
-
 
 class KndViewSet(viewsets.ModelViewSet):
     """ViewSet для работы КНД."""
 
-    queryset = Knd.objects.all()
+    queryset = Knd.objects.select_related('inspector')
     serializer_class = KndSerializer
-    FIELD_MAPPING = {
-        'Дата регистрации': 'reg_data',
-        'Номер КНМ': 'number_knd',
-        'Статус КНМ': 'status_knm',
-        'Дата регистрации': 'reg_data',
-        'Дата начала': 'start_data', 
-        'Дата окончания': 'end_data', 
-        'Адрес': 'adress'
-    }
+    pagination_class = KndCursorPagination
+    FIELD_MAPPING = KNM_FIELDS
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'export'):
+            queryset = filter_knd_queryset(
+                queryset, self.request.query_params, self.request.user)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """Список с ETag/Last-Modified и кэшем страниц по инспектору."""
+        etag, last_modified = conditional.list_validators(
+            self.get_queryset(), request)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        data = conditional.get_page(request.user.pk, etag)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            conditional.store_page(request.user.pk, etag, response.data)
+        else:
+            response = Response(data)
+        return conditional.set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Карточка проверки с ответом 304, если запись не менялась."""
+        etag, last_modified = conditional.detail_validators(
+            self.get_queryset(), kwargs['pk'])
+        if etag is not None:
+            response = conditional.not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+        response = super().retrieve(request, *args, **kwargs)
+        return conditional.set_validators(response, etag, last_modified)
 
     @action(detail=False, methods=['post'], url_path='upload_qrcod', parser_classes=[MultiPartParser])
     def upload_qrcod(self, request):
@@ -68,47 +94,206 @@ class KndViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Сохраняем файл в папку `media/uploads/`
-        save_path = os.path.join('uploads', file.name)
-        file_path = default_storage.save(save_path, file)
-        # Возвращаем URL до сохраненного файла
-        file_url = os.path.join(settings.MEDIA_URL, file_path)
+        if self._is_async_upload(request):
+            # Фоновому обработчику нужен файл на диске
+            with metrics.IMAGE_SAVE.time():
+                file_path = default_storage.save(
+                    os.path.join('uploads', file.name), file)
+            job = enqueue_qr_job(file_path, self.request.user)
+            return Response(
+                QrJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        if getattr(settings, 'KND_QR_AUDIT_UPLOADS', False):
+            # Сохраняем файл в папку `media/audit/` только для аудита
+            with metrics.IMAGE_SAVE.time():
+                default_storage.save(os.path.join('audit', file.name), file)
+        dedup = get_upload_dedup()
+        knd_id = None
         try:
-            result_url = decode_qr_code('.' + file_url)
-            result_knd = parse_knm_data(result_url['url'])
-            if result_knd.get('Статус КНМ') == 'Завершено':
-                return Response(
-                    {"error": "Проверка завершена. Введите другой QR Code"},
-                    status=status.HTTP_409_CONFLICT
-                )
-            # Создание объекта Knd
-            knd_data = {
-                'url_knd': result_url['url'],
-                'inspector': self.request.user,
-                'number_knd': result_knd.get('Номер КНМ'),
-                'status_knm': result_knd.get('Статус КНМ'),
-                'reg_data': parse_datetime(result_knd['Дата регистрации']),
-                'start_data': parse_date(result_knd['Дата начала']),
-                'end_data': parse_date(result_knd['Дата окончания']),
-                'adress': parse_date(result_knd['Адрес'])
-            }
-            # Проверка на существование записи
-            if Knd.objects.filter(number_knd=knd_data['number_knd']).exists():
-                return Response(
-                    {"error": "Запись с таким номером КНМ уже существует"},
-                    status=status.HTTP_409_CONFLICT
-                )
-            # Создание и сохранение объекта
-            knd_instance = Knd.objects.create(**knd_data)
+            # Повторная загрузка того же файла не распознается заново
+            file.seek(0)  # Файл мог быть прочитан при сохранении для аудита
+            url, keys, knd_id = dedup.resolve(
+                file.read(), decode_qr_code_bytes)
+            ensure_new_url(url)
+            result_knd = get_knm_data(url)
+            knd_instance = create_knd(url, result_knd, self.request.user)
+            if keys:
+                dedup.remember(keys, url, knd_instance.pk)
             # Возврат данных через сериализатор
             serializer = KndSerializer(knd_instance)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except KndConflict as e:
+            error = {"error": e.message}
+            # Архивной записи больше нет в Knd, ее id в кэше устарел
+            if knd_id and not e.archived:
+                error['knd_id'] = knd_id
+            return Response(error, status=e.status_code)
+        except PortalUnavailable as e:
+            return self._portal_unavailable(e)
         except Exception as e:
             return Response(
                 {"error": f"{KndViewSet.__name__}: Ошибка обработки данных: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='upload_qrcod_bulk',
+            parser_classes=[MultiPartParser])
+    def upload_qrcod_bulk(self, request):
+        """Загружает множество изображений или ZIP-архивов с QR-кодами.
+
+        Файлы передаются в поле 'files' (можно повторять). В ответе
+        результат по каждому изображению и каждой распознанной ссылке.
+        """
+        files = request.FILES.getlist('files') + request.FILES.getlist('file')
+        if not files:
+            return Response(
+                {"error": "Файлы не предоставлены"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            items = bulk_upload(files, self.request.user)
+        except BulkUploadError as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': items})
+
+    @staticmethod
+    def _is_async_upload(request):
+        """Фоновый режим включается настройкой или параметром ?async=1."""
+        param = request.query_params.get('async')
+        if param is not None:
+            return param.lower() in ('1', 'true', 'yes')
+        return getattr(settings, 'KND_UPLOAD_ASYNC', False)
+
+    @action(detail=False, methods=['get'], url_path=r'jobs/(?P<job_id>\d+)')
+    def job_status(self, request, job_id=None):
+        """Возвращает состояние фонового задания обработки QR-кода."""
+        job = get_object_or_404(
+            QrJob.objects.select_related('knd__inspector'),
+            pk=job_id,
+            inspector=request.user
+        )
+        return Response(QrJobSerializer(job).data)
+
+    @action(detail=False, methods=['post'], url_path='refresh')
+    def refresh(self, request):
+        """Запускает в фоне обновление статусов незавершенных проверок.
+
+        Инспектор обновляет только свои записи, сотрудник (is_staff) —
+        все. Необязательный параметр ``status`` (можно повторять) сужает
+        выборку до записей с указанными статусами. Ответ 202 возвращается
+        сразу, итоги сверки пишутся в лог.
+        """
+        statuses = request.data.getlist('status') if hasattr(
+            request.data, 'getlist') else request.data.get('status')
+        if isinstance(statuses, str):
+            statuses = [statuses]
+        queryset = open_knd_queryset(statuses or None)
+        if not request.user.is_staff:
+            queryset = queryset.filter(inspector=request.user)
+        total = queryset.count()
+        if refresh_in_background(queryset, request.user.pk) is None:
+            return Response(
+                {"error": "Обновление статусов уже выполняется"},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'total': total}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """Выгрузка проверок в CSV (по умолчанию) или XLSX.
+
+        Формат задается параметром ``export_format``, фильтры те же,
+        что у списка. Строки отдаются потоком без загрузки всей
+        выборки в память.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        queryset = self.get_queryset()
+        filename = f"knd-{date.today():%Y%m%d}"
+        if export_format == 'csv':
+            response = StreamingHttpResponse(
+                stream_csv(queryset), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = (
+                f'attachment; filename="{filename}.csv"')
+            return response
+        if export_format == 'xlsx':
+            try:
+                output = build_xlsx(queryset)
+            except ExportError as e:
+                return Response(
+                    {"error": str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+            return FileResponse(
+                output, as_attachment=True, filename=f'{filename}.xlsx',
+                content_type=('application/vnd.openxmlformats-officedocument.'
+                              'spreadsheetml.sheet'))
+        return Response(
+            {"error": "Неизвестный формат выгрузки"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """Лента смен статуса КНМ после курсора ``since``.
+
+        Параметры: ``since`` — id последнего полученного изменения,
+        ``limit`` — размер страницы, ``wait`` — сколько секунд ждать
+        новых изменений, если их пока нет. Курсор для следующего запроса
+        возвращается в поле ``next``.
+        """
+        config = change_feed_settings()
+        since = self._int_param(request, 'since', 0)
+        limit = min(self._int_param(request, 'limit', config['PAGE_SIZE']),
+                    config['MAX_PAGE_SIZE'])
+        wait = self._int_param(request, 'wait', 0)
+        changes = wait_for_changes(since, limit, wait)
+        return Response({
+            'results': KndStatusChangeSerializer(changes, many=True).data,
+            'next': changes[-1].pk if changes else since,
+        })
+
+    @staticmethod
+    def _int_param(request, name, default):
+        value = request.query_params.get(name)
+        if value is None:
+            return default
+        if not value.isdigit():
+            raise ValidationError({name: 'Ожидается неотрицательное целое.'})
+        return int(value)
+
+    @action(detail=False, methods=['get'], url_path='portal_health')
+    def portal_health(self, request):
+        """Состояние защиты портала: автомат, лимиты и счетчики."""
+        return Response(get_portal_guard().stats())
+
+    @staticmethod
+    def _portal_unavailable(exc):
+        headers = {'Retry-After': str(exc.retry_after)} if exc.retry_after else None
+        return Response(
+            {"error": exc.message, "code": "portal_unavailable"},
+            status=exc.status_code,
+            headers=headers
+        )
+
+    def handle_exception(self, exc):
+        # Обновление записи при недоступном портале: 503 вместо 500
+        if isinstance(exc, PortalUnavailable):
+            return self._portal_unavailable(exc)
+        return super().handle_exception(exc)
+
+    @action(detail=False, methods=['get'], url_path='upload_dedup')
+    def upload_dedup_stats(self, request):
+        """Статистика кэша повторных загрузок QR-кодов."""
+        return Response(get_upload_dedup().stats())
+
+    @action(detail=False, methods=['get'], url_path='scrape_cache')
+    def scrape_cache_stats(self, request):
+        """Статистика попаданий в кэш результатов парсинга."""
+        return Response(scrape_cache.cache_stats())
+
+    @action(detail=False, methods=['get'], url_path='list_cache')
+    def list_cache_stats(self, request):
+        """Статистика попаданий в кэш страниц списка проверок."""
+        return Response(conditional.list_cache_stats())
+
     def get_knd(self):
         """Возвращает проверку по id из URL или 404 если пост не найден."""
 
@@ -118,18 +303,54 @@ class KndViewSet(viewsets.ModelViewSet):
         return get_object_or_404(Knd, pk=self.kwargs['pk'])
     
 
+    def perform_destroy(self, instance):
+        get_upload_dedup().forget_knd(instance.pk)
+        if instance.url_knd:
+            scrape_cache.invalidate(instance.url_knd)
+        instance.delete()
+
+    def update(self, request, *args, **kwargs):
+        """Обновляет запись и возвращает ее вместе со сводкой изменений."""
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(
+            instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        diff = self.perform_update(serializer)
+        return Response({**serializer.data, 'changes': diff})
+
     def perform_update(self, serializer):
-        """Создает комментарий к посту с текущим пользователем, как автора."""
-        
-        content = parse_knm_data(self.get_knd().url_knd)
-        update_data = {}
-        knm_status = content['Статус КНМ']
-        db_status = getattr(self.get_knd(), self.FIELD_MAPPING['Статус КНМ'])
-        if db_status != knm_status:
-            update_data[self.FIELD_MAPPING['Статус КНМ']] = knm_status
-            logger.debug(f"Поле {self.FIELD_MAPPING['Статус КНМ']} изменено с {db_status} на {knm_status}")
-
-        if update_data:
-            serializer.save(inspektor=self.request.user, **update_data)
+        """Сверяет запись с порталом и сохраняет только изменившиеся поля.
+
+        Если клиент меняет только пользовательские поля (время выезда),
+        страница КНМ не загружается. Пустой запрос или ``?force=1``
+        сверяет все поля КНМ с порталом.
+        """
+        knd = serializer.instance
+        force = self.request.query_params.get('force') in ('1', 'true')
+        user_data = {
+            field: value for field, value in serializer.validated_data.items()
+            if field in USER_FIELDS
+        }
+        diff = {}
+        if force or not user_data:
+            content = get_knm_data(knd.url_knd, force=force)
+            diff = diff_knm(knd, content)
+        diff.update(diff_fields(knd, user_data))
+
+        if diff:
+            logger.debug(
+                'Изменены поля: %s', ', '.join(diff),
+                extra={'knm_number': knd.number_knd})
+            # Изменения и запись в ленту смены статуса фиксируются вместе
+            save_diff(knd, diff)
         else:
             logger.debug("Изменений не обнаружено")
+        return diff
+
+def metrics_view(request):
+    """Метрики процесса в текстовом формате Prometheus."""
+    if not metrics.metrics_enabled():
+        raise Http404
+    return HttpResponse(
+        metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
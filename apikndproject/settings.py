@@ -25,6 +25,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.request_id_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,10 +55,19 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'apikndproject.wsgi.application'
 
+# По умолчанию SQLite; для PostgreSQL задайте DB_ENGINE=django.db.backends.postgresql
+# и параметры подключения (нужен пакет psycopg).
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        # Постоянные соединения вместо нового подключения на каждый запрос
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -104,4 +114,155 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=365),
     'AUTH_HEADER_TYPES': ('Bearer',),
-} 
\ No newline at end of file
+} 
+
+# Пул прогретых браузеров для парсера ЕРКНМ
+ERKNM_BROWSER_POOL = {
+    'BROWSERS': int(os.getenv('ERKNM_POOL_BROWSERS', 2)),
+    'MAX_PAGES_PER_CONTEXT': 50,
+    'MAX_PAGES_PER_BROWSER': 200,
+    'LEASE_TIMEOUT': 60,
+}
+
+# Фоновая обработка загрузок QR-кодов (очередь в таблице QrJob)
+KND_UPLOAD_ASYNC = os.getenv('KND_UPLOAD_ASYNC', '0') == '1'
+KND_QR_WORKERS = int(os.getenv('KND_QR_WORKERS', 2))
+
+# Бэкенд парсера ЕРКНМ: auto (HTTP с откатом на браузер), http или browser.
+# Адрес API_URL_TEMPLATE не подтвержден на живом портале, поэтому по
+# умолчанию только браузер
+ERKNM_PARSER_BACKEND = os.getenv('ERKNM_PARSER_BACKEND', 'browser')
+ERKNM_HTTP = {
+    'API_URL_TEMPLATE': os.getenv(
+        'ERKNM_API_URL_TEMPLATE',
+        'https://proverki.gov.ru/portal/api/public-knm/link-only/{uuid}'
+    ),
+    'TIMEOUT': 10,
+    'POOL_SIZE': 10,
+}
+
+# Пакетное обновление статусов незавершенных проверок
+KND_REFRESH = {
+    'WORKERS': int(os.getenv('KND_REFRESH_WORKERS', 4)),
+    'HOST_RATE': float(os.getenv('KND_REFRESH_HOST_RATE', 2.0)),
+}
+
+# Кэш результатов парсинга страниц КНМ. По умолчанию в памяти процесса;
+# ERKNM_CACHE_DIR включает файловый кэш, общий для всех процессов.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'erknm': (
+        {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('ERKNM_CACHE_DIR'),
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+        if os.getenv('ERKNM_CACHE_DIR') else
+        {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'erknm',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    ),
+}
+
+ERKNM_CACHE = {
+    'ALIAS': 'erknm',
+    # Время жизни записи (сек.) в зависимости от статуса КНМ
+    'TTL': {
+        'Завершено': 30 * 24 * 3600,
+    },
+    'DEFAULT_TTL': 15 * 60,
+    # Сколько хранить устаревшую запись для условной перепроверки
+    'STALE_GRACE': 24 * 3600,
+}
+
+# Сохранять загруженные изображения QR-кодов в media/audit/
+KND_QR_AUDIT_UPLOADS = os.getenv('KND_QR_AUDIT_UPLOADS', '0') == '1'
+
+# Бюджет пикселей, до которого уменьшается фото перед распознаванием QR-кода
+KND_QR_PIXEL_BUDGET = 1_000_000
+
+# Пакетная загрузка изображений и ZIP-архивов с QR-кодами
+KND_BULK_UPLOAD = {
+    'DECODE_PROCESSES': int(os.getenv('KND_QR_DECODE_PROCESSES', 2)),
+    'MAX_FILES': 200,
+    'MAX_FILE_SIZE': 20 * 1024 * 1024,
+}
+
+# Облегченный профиль навигации браузера по страницам ЕРКНМ
+ERKNM_NAVIGATION = {
+    'ENABLED': os.getenv('ERKNM_NAVIGATION_PROFILE', '1') == '1',
+    'BLOCK_RESOURCE_TYPES': [
+        'image', 'media', 'font', 'stylesheet', 'texttrack', 'manifest',
+        'eventsource', 'websocket',
+    ],
+    'ALLOWED_HOSTS': ['proverki.gov.ru'],
+    'GOTO_TIMEOUT': 15000,
+    'DATA_TIMEOUT': 10000,
+    'MEASURE_BYTES': False,
+}
+
+# Уведомления о сроках проверок
+KND_NOTIFIER_BACKEND = os.getenv(
+    'KND_NOTIFIER_BACKEND', 'api.notifiers.LogNotifier')
+KND_NOTIFIER_FILE = os.getenv(
+    'KND_NOTIFIER_FILE', os.path.join(BASE_DIR, 'notifications.jsonl'))
+KND_NOTIFICATIONS_INTERVAL = 300
+
+# Кэш сериализованных страниц списка КНД по инспекторам. Он должен быть
+# общим для всех процессов, поэтому по умолчанию включается только вместе
+# с файловым кэшем ERKNM_CACHE_DIR
+KND_LIST_CACHE = {
+    'ENABLED': os.getenv(
+        'KND_LIST_CACHE', 'true' if os.getenv('ERKNM_CACHE_DIR') else 'false'
+    ).lower() in ('1', 'true', 'yes'),
+    'ALIAS': 'erknm',
+    'TTL': 300,
+}
+
+# Лента изменений статусов КНД (long-polling)
+KND_CHANGE_FEED = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 500,
+    'MAX_WAIT': 10,
+    'POLL_INTERVAL': 1.0,
+    'SAFETY_WINDOW': 2.0,
+}
+
+# Автомат и лимиты загрузок с портала ЕРКНМ, общие для всех процессов
+ERKNM_GUARD = {
+    'ENABLED': os.getenv('ERKNM_GUARD', 'true').lower() in ('1', 'true', 'yes'),
+    'STATE_PATH': os.getenv(
+        'ERKNM_GUARD_STATE', os.path.join(BASE_DIR, 'erknm_guard.sqlite3')),
+    'FAILURE_THRESHOLD': 5,
+    'RECOVERY_TIMEOUT': 30,
+    'RATE': 2.0,
+    'MAX_CONCURRENCY': 4,
+    'RETRIES': 2,
+}
+
+# Метрики горячих путей на /metrics
+KND_METRICS_ENABLED = os.getenv(
+    'KND_METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# Логирование app_logger: уровень, формат и доля отладочных записей
+KND_LOG_LEVEL = os.getenv('KND_LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO')
+KND_LOG_FORMAT = os.getenv('KND_LOG_FORMAT', 'json')
+KND_LOG_DEBUG_SAMPLE = float(os.getenv('KND_LOG_DEBUG_SAMPLE', '0.1'))
+
+# Кэш повторных загрузок одного и того же изображения с QR-кодом
+KND_UPLOAD_DEDUP = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 4096,
+    'PERCEPTUAL': False,
+    'MAX_DISTANCE': 8,
+}
+
+# Перенос завершенных проверок в архивную таблицу (команда archive_knd)
+KND_ARCHIVE = {
+    'RETENTION_DAYS': int(os.getenv('KND_ARCHIVE_RETENTION_DAYS', 30)),
+    'BATCH_SIZE': 500,
+}
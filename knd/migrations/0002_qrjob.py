@@ -0,0 +1,33 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knd', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QrJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('file_path', models.CharField(max_length=255, verbose_name='Путь к файлу')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('decoding', 'Распознавание QR-кода'), ('scraping', 'Загрузка данных КНМ'), ('done', 'Готово'), ('failed', 'Ошибка')], default='queued', max_length=10, verbose_name='Статус задания')),
+                ('url_knd', models.URLField(blank=True, null=True, verbose_name='Ссылка на проверку')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('error_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='HTTP-код ошибки')),
+                ('inspector', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='qr_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Инспектор')),
+                ('knd', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='qr_jobs', to='knd.knd', verbose_name='Проверка')),
+            ],
+            options={
+                'ordering': ['created'],
+                'indexes': [models.Index(fields=['status', 'created'], name='qrjob_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knd', '0002_qrjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='knd',
+            index=models.Index(fields=['start_data'], name='knd_start_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knd',
+            index=models.Index(fields=['end_data'], name='knd_end_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knd',
+            index=models.Index(fields=['departure_time'], name='knd_departure_time_idx'),
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=32, verbose_name='Вид уведомления')),
+                ('due_date', models.DateField(verbose_name='Дата события')),
+                ('sent_at', models.DateTimeField(auto_now_add=True, verbose_name='Отправлено')),
+                ('knd', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='knd.knd', verbose_name='Проверка')),
+            ],
+            options={
+                'ordering': ['-sent_at'],
+                'constraints': [models.UniqueConstraint(fields=('knd', 'kind', 'due_date'), name='notification_unique_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knd', '0003_knd_date_indexes_notification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='knd',
+            index=models.Index(fields=['created', 'number_knd'], name='knd_created_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knd',
+            index=models.Index(fields=['status_knm'], name='knd_status_knm_idx'),
+        ),
+    ]
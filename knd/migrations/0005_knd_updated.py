@@ -0,0 +1,26 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knd', '0004_knd_created_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knd',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='knd',
+            index=models.Index(fields=['updated'], name='knd_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knd',
+            index=models.Index(fields=['inspector', 'updated'], name='knd_inspector_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knd', '0005_knd_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KndStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('number_knd', models.CharField(blank=True, max_length=20, null=True, verbose_name='Номер КНД')),
+                ('old_status', models.CharField(blank=True, default='', max_length=20, verbose_name='Прежний статус')),
+                ('new_status', models.CharField(blank=True, default='', max_length=20, verbose_name='Новый статус')),
+                ('knd', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_changes', to='knd.knd', verbose_name='Проверка')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
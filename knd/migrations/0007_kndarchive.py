@@ -0,0 +1,37 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('knd', '0006_kndstatuschange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KndArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived', models.DateTimeField(auto_now_add=True, verbose_name='Перенесено в архив')),
+                ('knd_id', models.BigIntegerField(verbose_name='ID проверки')),
+                ('created', models.DateTimeField(verbose_name='Создано')),
+                ('updated', models.DateTimeField(verbose_name='Изменено')),
+                ('url_knd', models.URLField(blank=True, null=True, unique=True, verbose_name='Ссылка на проверку')),
+                ('number_knd', models.CharField(blank=True, max_length=20, null=True, unique=True, verbose_name='Номер КНД')),
+                ('status_knm', models.CharField(blank=True, default='', max_length=20, verbose_name='Статус КНМ')),
+                ('reg_data', models.DateTimeField(blank=True, null=True, verbose_name='Дата регистрации КНМ')),
+                ('start_data', models.DateField(blank=True, null=True, verbose_name='Начало КНМ')),
+                ('end_data', models.DateField(blank=True, null=True, verbose_name='Окончание КНМ')),
+                ('adress', models.TextField(blank=True, null=True, verbose_name='Адрес')),
+                ('departure_time', models.DateTimeField(blank=True, null=True, verbose_name='Время выезда')),
+                ('inspector', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='knd_archive', to=settings.AUTH_USER_MODEL, verbose_name='Инспектор')),
+            ],
+            options={
+                'ordering': ['archived'],
+                'indexes': [models.Index(fields=['archived'], name='kndarchive_archived_idx')],
+            },
+        ),
+    ]
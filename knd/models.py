@@ -5,6 +5,7 @@ Users = get_user_model()
 
 class Knd(models.Model):
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     inspector = models.ForeignKey(
         Users, 
         related_name='knd_inspector', 
@@ -43,3 +44,163 @@ class Knd(models.Model):
 
     class Meta:
         ordering = ['created', 'number_knd']
+        indexes = [
+            models.Index(
+                fields=['created', 'number_knd'], name='knd_created_number_idx'),
+            models.Index(fields=['status_knm'], name='knd_status_knm_idx'),
+            models.Index(fields=['updated'], name='knd_updated_idx'),
+            models.Index(
+                fields=['inspector', 'updated'],
+                name='knd_inspector_updated_idx'),
+            models.Index(fields=['start_data'], name='knd_start_data_idx'),
+            models.Index(fields=['end_data'], name='knd_end_data_idx'),
+            models.Index(
+                fields=['departure_time'], name='knd_departure_time_idx'),
+        ]
+
+
+class QrJob(models.Model):
+    """Задание фоновой обработки загруженного QR-кода."""
+
+    QUEUED = 'queued'
+    DECODING = 'decoding'
+    SCRAPING = 'scraping'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'В очереди'),
+        (DECODING, 'Распознавание QR-кода'),
+        (SCRAPING, 'Загрузка данных КНМ'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    inspector = models.ForeignKey(
+        Users,
+        related_name='qr_jobs',
+        on_delete=models.CASCADE,
+        null=True,
+        verbose_name='Инспектор'
+    )
+    file_path = models.CharField('Путь к файлу', max_length=255)
+    status = models.CharField(
+        'Статус задания',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED
+    )
+    url_knd = models.URLField('Ссылка на проверку', blank=True, null=True)
+    knd = models.ForeignKey(
+        Knd,
+        related_name='qr_jobs',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='Проверка'
+    )
+    error = models.TextField('Ошибка', blank=True, default='')
+    error_code = models.PositiveSmallIntegerField(
+        'HTTP-код ошибки', blank=True, null=True)
+
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(
+                fields=['status', 'created'], name='qrjob_status_created_idx'),
+        ]
+
+
+class Notification(models.Model):
+    """Журнал отправленных уведомлений о сроках проверки.
+
+    Уникальность (проверка, вид, дата) гарантирует, что одно уведомление
+    не будет отправлено дважды.
+    """
+
+    knd = models.ForeignKey(
+        Knd,
+        related_name='notifications',
+        on_delete=models.CASCADE,
+        verbose_name='Проверка'
+    )
+    kind = models.CharField('Вид уведомления', max_length=32)
+    due_date = models.DateField('Дата события')
+    sent_at = models.DateTimeField('Отправлено', auto_now_add=True)
+
+    class Meta:
+        ordering = ['-sent_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['knd', 'kind', 'due_date'],
+                name='notification_unique_event'),
+        ]
+
+
+class KndStatusChange(models.Model):
+    """История смены статуса КНМ для ленты изменений.
+
+    Номер КНМ копируется в запись, чтобы история оставалась понятной
+    и после удаления проверки.
+    """
+
+    created = models.DateTimeField(auto_now_add=True)
+    knd = models.ForeignKey(
+        Knd,
+        related_name='status_changes',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='Проверка'
+    )
+    number_knd = models.CharField(
+        'Номер КНД', max_length=20, blank=True, null=True)
+    old_status = models.CharField(
+        'Прежний статус', max_length=20, blank=True, default='')
+    new_status = models.CharField(
+        'Новый статус', max_length=20, blank=True, default='')
+
+    class Meta:
+        ordering = ['id']
+
+
+class KndArchive(models.Model):
+    """Завершенные проверки, перенесенные из Knd командой archive_knd.
+
+    Хранит только данные проверки без связей с уведомлениями и
+    заданиями. Уникальные индексы по ссылке и номеру КНМ позволяют
+    проверкам на дубликаты находить и архивные записи.
+    """
+
+    archived = models.DateTimeField('Перенесено в архив', auto_now_add=True)
+    knd_id = models.BigIntegerField('ID проверки')
+    created = models.DateTimeField('Создано')
+    updated = models.DateTimeField('Изменено')
+    inspector = models.ForeignKey(
+        Users,
+        related_name='knd_archive',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='Инспектор'
+    )
+    url_knd = models.URLField(
+        'Ссылка на проверку', blank=True, null=True, unique=True)
+    number_knd = models.CharField(
+        'Номер КНД', max_length=20, blank=True, null=True, unique=True)
+    status_knm = models.CharField(
+        'Статус КНМ', max_length=20, blank=True, default='')
+    reg_data = models.DateTimeField(
+        'Дата регистрации КНМ', blank=True, null=True)
+    start_data = models.DateField('Начало КНМ', blank=True, null=True)
+    end_data = models.DateField('Окончание КНМ', blank=True, null=True)
+    adress = models.TextField('Адрес', blank=True, null=True)
+    departure_time = models.DateTimeField(
+        'Время выезда', blank=True, null=True)
+
+    class Meta:
+        ordering = ['archived']
+        indexes = [
+            models.Index(fields=['archived'], name='kndarchive_archived_idx'),
+        ]